@@ -0,0 +1,2 @@
+# archive/test_files/test_setup.py is a setup check script that needs ngspice, not a test module
+collect_ignore = ['archive']
@@ -13,6 +13,8 @@ from PySpice.Unit import *
 import matplotlib.pyplot as plt
 import numpy as np
 
+from spicepilot.sweep import dc_sweep
+
 # Create circuit
 circuit = Circuit('Current Mirror Bias Circuit')
 
@@ -108,20 +110,14 @@ except Exception as e:
 # VDD sweep analysis
 print("\nRunning VDD sweep analysis (0.5V to 1.2V)...")
 try:
-    vdd_values = np.linspace(0.5, 1.2, 50)
-    vd1_values = []
-    vs2_values = []
-    vd3_values = []
-
-    for vdd_val in vdd_values:
-        # Update VDD
-        circuit.V('dd', 'vdd', circuit.gnd, vdd_val@u_V)
-        simulator = circuit.simulator(temperature=25, nominal_temperature=25)
-        analysis = simulator.operating_point()
-
-        vd1_values.append(float(analysis['vd1']))
-        vs2_values.append(float(analysis['vs2']))
-        vd3_values.append(float(analysis['vd3']))
+    # One native .dc run for all points instead of one simulator per point
+    sweep = dc_sweep(circuit, 'Vdd', np.linspace(0.5, 1.2, 50),
+                     nodes=['vd1', 'vs2', 'vd3'],
+                     temperature=25, nominal_temperature=25)
+    vdd_values = sweep.sweep
+    vd1_values = sweep['vd1']
+    vs2_values = sweep['vs2']
+    vd3_values = sweep['vd3']
 
     # Plot results
     plt.figure(figsize=(12, 8))
@@ -141,7 +137,7 @@ try:
 
     # Current through R1 vs VDD
     plt.subplot(2, 1, 2)
-    i_r1_values = [(vdd - vd3)/5.56e3*1e6 for vdd, vd3 in zip(vdd_values, vd3_values)]
+    i_r1_values = (vdd_values - vd3_values) / 5.56e3 * 1e6
     plt.plot(vdd_values, i_r1_values, 'g-', linewidth=2, label='I(R1)')
     plt.axhline(y=45, color='orange', linestyle='--', linewidth=2, label='I1=I2=45uA')
     plt.axvline(x=0.9, color='gray', linestyle=':', alpha=0.7, label='Nominal VDD=0.9V')
@@ -1,8 +1,11 @@
 from PySpice.Spice.Netlist import Circuit
 from PySpice.Unit import *
-import matplotlib.pyplot as plt
 import numpy as np
 
+from spicepilot.ac_metrics import ac_metrics
+from spicepilot.cache import CachedSimulator
+from spicepilot.plotting import Plotter
+
 # Create the Two-Stage CMOS Op-Amp circuit
 circuit = Circuit('Two-Stage CMOS Operational Amplifier - Improved')
 
@@ -122,8 +125,8 @@ print("-"*70)
 print(circuit)
 print("="*70)
 
-# Create simulator
-simulator = circuit.simulator(temperature=25, nominal_temperature=25)
+# Create simulator (results are cached on disk, keyed by the full netlist)
+simulator = CachedSimulator(circuit.simulator(temperature=25, nominal_temperature=25))
 simulator.options(reltol=1e-3, abstol=1e-12, vntol=1e-6, itl1=300, itl2=100)
 
 try:
@@ -156,32 +159,24 @@ try:
     frequency = np.array(ac_analysis.frequency)
     vout_ac = np.array(ac_analysis['vout'])
 
-    # Calculate gain and phase
-    gain_linear = np.abs(vout_ac)
-    gain_db = 20 * np.log10(gain_linear + 1e-20)  # Add small value to avoid log(0)
-    phase_deg = np.angle(vout_ac, deg=True)
-
-    # Find performance metrics
-    dc_gain_db = gain_db[0]
+    # Find performance metrics (interpolated between frequency points)
+    metrics = ac_metrics(frequency, vout_ac)
+    dc_gain_db = float(metrics.dc_gain_db)
+    bw_3db = float(metrics.bandwidth)
+    ugf = float(metrics.ugf)
+    phase_margin = float(metrics.phase_margin)
 
-    # Find 3dB bandwidth
-    gain_3db = dc_gain_db - 3
-    bw_3db_idx = np.where(gain_db <= gain_3db)[0]
-    if len(bw_3db_idx) > 0:
-        bw_3db = frequency[bw_3db_idx[0]]
-        print(f"\nDC Gain:              {dc_gain_db:.1f} dB ({10**(dc_gain_db/20):.1f} V/V)")
+    print(f"\nDC Gain:              {dc_gain_db:.1f} dB ({10**(dc_gain_db/20):.1f} V/V)")
+    if np.isfinite(bw_3db):
         print(f"3dB Bandwidth:        {bw_3db:.2e} Hz ({bw_3db/1e3:.2f} kHz)")
     else:
-        print(f"\nDC Gain:              {dc_gain_db:.1f} dB ({10**(dc_gain_db/20):.1f} V/V)")
         print("3dB Bandwidth:        >1 GHz")
 
-    # Find unity-gain frequency and phase margin
-    ugf_idx = np.where(gain_db <= 0)[0]
-    if len(ugf_idx) > 0:
-        ugf = frequency[ugf_idx[0]]
-        phase_margin = 180 + phase_deg[ugf_idx[0]]
+    if np.isfinite(ugf):
         print(f"Unity-Gain Frequency: {ugf/1e6:.2f} MHz")
         print(f"Phase Margin:         {phase_margin:.1f} degrees")
+        if np.isfinite(metrics.gain_margin):
+            print(f"Gain Margin:          {float(metrics.gain_margin):.1f} dB")
 
         if phase_margin > 45:
             print("  -> Stability: GOOD (PM > 45 degrees)")
@@ -190,36 +185,17 @@ try:
     else:
         print("Unity-Gain Frequency: Not reached")
 
-    # Create comprehensive Bode plot
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 9))
-
-    # Magnitude plot
-    ax1.semilogx(frequency, gain_db, 'b-', linewidth=2.5, label='Gain')
-    ax1.grid(True, which='both', alpha=0.3, linestyle='-', linewidth=0.5)
-    ax1.grid(True, which='minor', alpha=0.15, linestyle=':', linewidth=0.5)
-    ax1.set_ylabel('Gain (dB)', fontsize=12, fontweight='bold')
-    ax1.set_title('Two-Stage CMOS Op-Amp: Bode Plot',
-                  fontsize=14, fontweight='bold', pad=15)
-    ax1.axhline(y=0, color='r', linestyle='--', alpha=0.6, linewidth=1.5, label='0 dB')
-    ax1.axhline(y=dc_gain_db-3, color='g', linestyle=':', alpha=0.6, label='-3 dB')
-    ax1.legend(loc='upper right', fontsize=10)
-    ax1.set_ylim([min(gain_db)-10, max(gain_db)+10])
-
-    # Phase plot
-    ax2.semilogx(frequency, phase_deg, 'r-', linewidth=2.5, label='Phase')
-    ax2.grid(True, which='both', alpha=0.3, linestyle='-', linewidth=0.5)
-    ax2.grid(True, which='minor', alpha=0.15, linestyle=':', linewidth=0.5)
-    ax2.set_xlabel('Frequency (Hz)', fontsize=12, fontweight='bold')
-    ax2.set_ylabel('Phase (degrees)', fontsize=12, fontweight='bold')
-    ax2.axhline(y=-180, color='r', linestyle='--', alpha=0.6, linewidth=1.5, label='-180°')
-    ax2.axhline(y=0, color='k', linestyle='-', alpha=0.3, linewidth=1)
-    ax2.legend(loc='lower left', fontsize=10)
-    ax2.set_ylim([-200, 50])
-
-    plt.tight_layout()
-    plt.savefig('opamp_bode_improved.png', dpi=300, bbox_inches='tight')
-    print(f"\nBode plot saved: opamp_bode_improved.png")
-    plt.show()
+    # Record the Bode plot; it is drawn off the simulation path by render()
+    gain_db = 20 * np.log10(np.abs(vout_ac))
+    plots = Plotter()
+    plots.bode('opamp_bode_improved.png', frequency, {'Gain': vout_ac},
+               title='Two-Stage CMOS Op-Amp: Bode Plot', dpi='print',
+               guides=[(dc_gain_db - 3, '-3 dB')],
+               ylim=(gain_db.min() - 10, gain_db.max() + 10), phase_ylim=(-200, 50),
+               styles={'Gain': dict(color='b', linewidth=2.5)},
+               phase_styles={'Gain': dict(color='r', linewidth=2.5, label='Phase')})
+    for filename in plots.render():
+        print(f"\nBode plot saved: {filename}")
 
     print("\n" + "="*70)
     print(" "*20 + "SIMULATION COMPLETED SUCCESSFULLY")
@@ -0,0 +1,6 @@
+"""
+SPICEPilot toolkit
+
+Reusable simulation helpers shared by the examples, the archived benchmark
+scripts and the LLM generate-validate loop.
+"""
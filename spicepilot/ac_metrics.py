@@ -0,0 +1,124 @@
+"""
+AC Metrics
+
+Gain, -3 dB bandwidth, unity-gain frequency, phase margin and gain margin
+for many AC responses at once. Input is a (runs x frequency) complex
+matrix (one row per AC sweep, e.g. from a sizing loop or Monte Carlo run);
+every metric is computed for all rows in one vectorized pass.
+
+Crossings are interpolated linearly in log-frequency between the two
+bracketing points instead of taking the first grid point past the
+threshold.
+
+Phase is unwrapped along frequency and referenced to its low-frequency
+value (shifted by a multiple of 180 degrees into +/-90 at DC), so inverting
+and non-inverting outputs give the same margins. This is not the raw
+np.angle() convention of the original two-stage op-amp example, which
+reported 180 + wrapped phase and so phase margins above 300 degrees for its
+inverting output.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class AcMetrics:
+    """Per-run AC figures of merit (NaN where a crossing was not found)."""
+    dc_gain_db: np.ndarray
+    bandwidth: np.ndarray        # -3 dB frequency, Hz
+    ugf: np.ndarray              # unity-gain frequency, Hz
+    phase_margin: np.ndarray     # degrees
+    gain_margin: np.ndarray      # dB
+
+    def row(self, i):
+        """Return the metrics of one run as a plain dict."""
+        return {name: float(np.asarray(getattr(self, name)).reshape(-1)[i])
+                for name in self.__dataclass_fields__}
+
+
+def _first_falling_crossing(log_f, y, level):
+    """
+    Interpolated log-frequency where each row of `y` first falls to `level`
+
+    Args:
+        log_f: log10 frequency (points,)
+        y: (runs x points) values
+        level: (runs,) threshold per row
+
+    Returns:
+        (log_f at crossing, index of first point past it, interpolation
+        fraction) per row; NaN / -1 where there is no crossing
+    """
+    level = level[:, np.newaxis]
+    crossed = (y[:, 1:] <= level) & (y[:, :-1] > level)
+    found = crossed.any(axis=1)
+    k = np.argmax(crossed, axis=1) + 1          # first point at/below the level
+    rows = np.arange(y.shape[0])
+
+    y0 = y[rows, k - 1]
+    y1 = y[rows, k]
+    x0 = log_f[k - 1]
+    x1 = log_f[k]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = (level[:, 0] - y0) / (y1 - y0)
+    x = x0 + fraction * (x1 - x0)
+
+    x = np.where(found, x, np.nan)
+    k = np.where(found, k, -1)
+    return x, k, fraction
+
+
+def _interpolate_at(y, k, fraction):
+    """Value of each row of `y` at the crossing found by _first_falling_crossing."""
+    rows = np.arange(y.shape[0])
+    safe_k = np.where(k > 0, k, 1)
+    value = y[rows, safe_k - 1] + fraction * (y[rows, safe_k] - y[rows, safe_k - 1])
+    return np.where(k > 0, value, np.nan)
+
+
+def ac_metrics(frequency, response):
+    """
+    Compute AC figures of merit for every run
+
+    Args:
+        frequency: Frequency points in Hz (points,)
+        response: Complex response (points,) or (runs x points)
+
+    Returns:
+        AcMetrics; fields are (runs,) arrays, or 0-d arrays for 1-D input
+    """
+    frequency = np.asarray(frequency, dtype=np.float64).real
+    response = np.asarray(response, dtype=np.complex128)
+    single = response.ndim == 1
+    response = np.atleast_2d(response)
+
+    log_f = np.log10(frequency)
+    magnitude_db = 20 * np.log10(np.abs(response) + 1e-300)
+    phase = np.degrees(np.unwrap(np.angle(response), axis=1))
+    # Shift by multiples of 180 so the DC phase sits within +/-90 degrees
+    phase -= 180 * np.round(phase[:, :1] / 180)
+
+    dc_gain_db = magnitude_db[:, 0]
+
+    log_bw, _, _ = _first_falling_crossing(log_f, magnitude_db, dc_gain_db - 3)
+    log_ugf, k_ugf, fraction_ugf = _first_falling_crossing(
+        log_f, magnitude_db, np.zeros_like(dc_gain_db))
+    phase_at_ugf = _interpolate_at(phase, k_ugf, fraction_ugf)
+
+    _, k_pc, fraction_pc = _first_falling_crossing(
+        log_f, phase, np.full_like(dc_gain_db, -180.0))
+    gain_at_pc = _interpolate_at(magnitude_db, k_pc, fraction_pc)
+
+    metrics = AcMetrics(
+        dc_gain_db=dc_gain_db,
+        bandwidth=10 ** log_bw,
+        ugf=10 ** log_ugf,
+        phase_margin=180 + phase_at_ugf,
+        gain_margin=-gain_at_pc,
+    )
+    if single:
+        for name in metrics.__dataclass_fields__:
+            setattr(metrics, name, getattr(metrics, name)[0])
+    return metrics
@@ -0,0 +1,319 @@
+"""
+Benchmark Runner
+
+Finds every generated circuit script in the Easy/Medium/Hard/Extreme tiers
+and runs them headless in parallel. Each job gets its own interpreter
+process (and therefore its own ngspice), a throwaway working directory and
+a wall-time limit. Pass/fail, wall time and peak RSS are collected into one
+results table.
+
+With --fork-server the jobs are forked from one interpreter that has
+already imported PySpice, NumPy and matplotlib and loaded ngspice (see
+spicepilot.forkserver), so the import start-up is paid once per run
+instead of once per script. Linux and macOS only.
+
+Usage:
+    python -m spicepilot.benchmark archive/test_files --jobs 8 --csv results/benchmark.csv
+    python -m spicepilot.benchmark archive/test_files --fork-server
+"""
+
+import argparse
+import csv
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, fields, astuple
+from pathlib import Path
+
+TIERS = ('easy', 'medium', 'hard', 'extreme')
+
+# Resolution cap for figures the scripts save; 300-dpi renders cost more
+# than most of the simulations
+DEFAULT_MAX_DPI = 100
+
+# sitecustomize that applies SPICEPILOT_PLOTS / SPICEPILOT_MAX_DPI in the child
+# (and then imports the child's own sitecustomize, which it shadows)
+HEADLESS_DIR = Path(__file__).resolve().parent / 'headless'
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Generated scripts usually catch their own exceptions and exit 0, so the
+# output is scanned for the messages they print on failure.
+FAILURE_PATTERN = re.compile(
+    r'Traceback \(most recent call last\)|^\s*\[ERROR\]|^\s*ERROR:|Simulation failed',
+    re.MULTILINE,
+)
+
+
+@dataclass
+class JobResult:
+    """Outcome of running one benchmark script."""
+    suite: str
+    tier: str
+    script: str
+    status: str          # 'pass', 'fail' or 'timeout'
+    returncode: int
+    wall_time: float     # seconds
+    peak_rss_mb: float   # None where the platform cannot report it
+    error: str = ''
+
+
+def discover(*roots):
+    """
+    Find generated circuit scripts below the given folders
+
+    A script is picked up if it sits in a tier folder (easy, medium, hard,
+    extreme) and imports PySpice.
+
+    Returns:
+        Sorted list of script paths
+    """
+    scripts = []
+    for root in roots:
+        for path in Path(root).rglob('*.py'):
+            if path.parent.name.lower() not in TIERS:
+                continue
+            try:
+                text = path.read_text(encoding='utf-8', errors='replace')
+            except OSError:
+                continue
+            if 'PySpice' in text:
+                scripts.append(path)
+    return sorted(scripts)
+
+
+def headless_env(extra=None, plots=True, max_dpi=DEFAULT_MAX_DPI):
+    """
+    Environment for a child interpreter with plotting forced off-screen
+
+    Args:
+        extra: Additional variables
+        plots: Let scripts save figures at all
+        max_dpi: Cap on the resolution of saved figures (None: no cap)
+    """
+    env = dict(os.environ)
+    env['MPLBACKEND'] = 'Agg'
+    env['PYTHONUNBUFFERED'] = '1'
+    env['PYTHONIOENCODING'] = 'utf-8'
+    env['SPICEPILOT_PLOTS'] = '1' if plots else '0'
+    if max_dpi is not None:
+        env['SPICEPILOT_MAX_DPI'] = str(max_dpi)
+    path = [str(HEADLESS_DIR), str(REPO_ROOT)]
+    if env.get('PYTHONPATH'):
+        path.append(env['PYTHONPATH'])
+    env['PYTHONPATH'] = os.pathsep.join(path)
+    if extra:
+        env.update(extra)
+    return env
+
+
+def _wait(process, timeout):
+    """Wait for `process`, killing it after `timeout` seconds.
+
+    Returns:
+        (returncode, timed_out, peak RSS in MB or None)
+    """
+    expired = threading.Event()
+
+    def kill():
+        expired.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    try:
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            if os.WIFEXITED(status):
+                returncode = os.WEXITSTATUS(status)
+            else:
+                returncode = -os.WTERMSIG(status)
+            process.returncode = returncode
+            # ru_maxrss is in kB on Linux and bytes on macOS
+            scale = 1 if sys.platform == 'darwin' else 1024
+            peak_rss_mb = usage.ru_maxrss * scale / 2**20
+        else:
+            returncode = process.wait()
+            peak_rss_mb = None
+    finally:
+        timer.cancel()
+    return returncode, expired.is_set(), peak_rss_mb
+
+
+def _last_error(output):
+    """Return the most informative failure line from a script's output."""
+    lines = [line.strip() for line in output.splitlines() if line.strip()]
+    for line in reversed(lines):
+        if 'Error' in line or 'error' in line or 'failed' in line:
+            return line[:200]
+    return lines[-1][:200] if lines else ''
+
+
+def run_script(script, timeout=300, python=None, keep_dir=None, plots=True, max_dpi=DEFAULT_MAX_DPI,
+               server=None):
+    """
+    Run one script headless in a fresh working directory
+
+    Args:
+        script: Path of the generated script
+        timeout: Wall-time limit in seconds
+        python: Interpreter to use (default: the current one)
+        keep_dir: Folder to copy the job's outputs into (default: discard them)
+        plots: Let the script save figures (False skips every savefig call)
+        max_dpi: Resolution cap for saved figures (None: as requested by the script)
+        server: ForkServer to fork the job from (then `python`, `plots` and
+            `max_dpi` are the server's)
+
+    Returns:
+        JobResult
+    """
+    script = Path(script).resolve()
+    tier = script.parent.name.lower()
+    suite = script.parent.parent.name
+
+    workdir = tempfile.mkdtemp(prefix='spicepilot_')
+    log_path = os.path.join(workdir, 'output.log')
+    start = time.perf_counter()
+    try:
+        if server is not None:
+            job = {'script': str(script), 'workdir': workdir, 'cpu_time': None, 'memory_mb': None}
+            returncode, timed_out, peak_rss_mb = server.run(job, timeout)
+        else:
+            with open(log_path, 'wb') as log:
+                process = subprocess.Popen(
+                    [python or sys.executable, str(script)],
+                    cwd=workdir,
+                    env=headless_env(plots=plots, max_dpi=max_dpi),
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                )
+                returncode, timed_out, peak_rss_mb = _wait(process, timeout)
+        wall_time = time.perf_counter() - start
+
+        with open(log_path, encoding='utf-8', errors='replace') as f:
+            output = f.read()
+
+        if timed_out:
+            status, error = 'timeout', f'exceeded {timeout}s'
+        elif returncode != 0 or FAILURE_PATTERN.search(output):
+            status, error = 'fail', _last_error(output)
+        else:
+            status, error = 'pass', ''
+
+        if keep_dir is not None:
+            target = Path(keep_dir) / suite / tier / script.stem
+            shutil.copytree(workdir, target, dirs_exist_ok=True)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return JobResult(suite, tier, script.name, status, returncode,
+                     wall_time, peak_rss_mb, error)
+
+
+def run_benchmark(scripts, jobs=None, timeout=300, keep_dir=None, progress=True,
+                  plots=True, max_dpi=DEFAULT_MAX_DPI, fork_server=False):
+    """
+    Run scripts in parallel, one interpreter process (or fork) per job
+
+    Args:
+        scripts: Iterable of script paths (see discover())
+        jobs: Number of concurrent jobs (default: CPU count)
+        timeout: Per-job wall-time limit in seconds
+        keep_dir: Optional folder to keep each job's output files
+        progress: Print one line per finished job
+        plots: Let scripts save figures
+        max_dpi: Resolution cap for saved figures
+        fork_server: Fork every job from one pre-imported interpreter
+
+    Returns:
+        List of JobResult, in the order of `scripts`
+    """
+    scripts = list(scripts)
+    jobs = jobs or os.cpu_count() or 1
+    results = [None] * len(scripts)
+
+    server = None
+    if fork_server:
+        from .forkserver import ForkServer
+        server = ForkServer(plots=plots, max_dpi=max_dpi)
+    try:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(run_script, script, timeout, None, keep_dir, plots, max_dpi, server): i
+                       for i, script in enumerate(scripts)}
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                if progress:
+                    result = results[i]
+                    print(f"[{result.status.upper():7s}] {result.suite}/{result.tier}/{result.script}"
+                          f" ({result.wall_time:.1f}s)")
+    finally:
+        if server is not None:
+            server.close()
+
+    return results
+
+
+def write_csv(results, path):
+    """Write results to a CSV file."""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([field.name for field in fields(JobResult)])
+        for result in results:
+            writer.writerow(astuple(result))
+
+
+def format_table(results):
+    """Return the results as a fixed-width text table with a summary line."""
+    header = f"{'Suite':14s} {'Tier':8s} {'Script':28s} {'Status':8s} {'Time (s)':>9s} {'RSS (MB)':>9s}"
+    lines = [header, '-' * len(header)]
+    for r in results:
+        rss = f"{r.peak_rss_mb:9.1f}" if r.peak_rss_mb is not None else f"{'n/a':>9s}"
+        lines.append(f"{r.suite:14s} {r.tier:8s} {r.script:28s} {r.status:8s} {r.wall_time:9.2f} {rss}")
+    passed = sum(r.status == 'pass' for r in results)
+    lines.append('-' * len(header))
+    lines.append(f"{passed}/{len(results)} passed")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run generated benchmark scripts headless in parallel.')
+    parser.add_argument('roots', nargs='*', default=['archive/test_files'],
+                        help='Folders to search for tiered scripts')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Concurrent jobs (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=300, help='Per-script wall-time limit in seconds')
+    parser.add_argument('--csv', default=None, help='Write the results table to this CSV file')
+    parser.add_argument('--keep', default=None, help='Keep each job\'s output files in this folder')
+    parser.add_argument('--no-plots', action='store_true', help='Skip every savefig call in the scripts')
+    parser.add_argument('--max-dpi', type=float, default=DEFAULT_MAX_DPI,
+                        help=f'Resolution cap for saved figures (default: {DEFAULT_MAX_DPI}, 0 for none)')
+    parser.add_argument('--fork-server', action='store_true',
+                        help='Fork every script from one interpreter with PySpice and ngspice preloaded')
+    args = parser.parse_args(argv)
+
+    scripts = discover(*args.roots)
+    if not scripts:
+        print("No benchmark scripts found")
+        return 1
+
+    print(f"Running {len(scripts)} scripts...")
+    results = run_benchmark(scripts, jobs=args.jobs, timeout=args.timeout, keep_dir=args.keep,
+                            plots=not args.no_plots, max_dpi=args.max_dpi or None,
+                            fork_server=args.fork_server)
+    print()
+    print(format_table(results))
+    if args.csv:
+        write_csv(results, args.csv)
+        print(f"\nResults saved: {args.csv}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""
+Simulation Result Cache
+
+On-disk, content-addressed cache of simulation results. The key is a hash of
+the complete ngspice deck (netlist text, `.options` including TEMP/TNOM,
+`.ic`/`.nodeset`, saved vectors and the analysis line), so any change to the
+circuit, options, temperature or analysis arguments is a different entry.
+
+Waveforms are stored as uncompressed `.npz` files (raw float64/complex128)
+and the directory is trimmed to a size budget, least recently used first.
+
+Usage:
+    simulator = CachedSimulator(circuit.simulator(temperature=25, nominal_temperature=25))
+    simulator.options(reltol=1e-3)
+    analysis = simulator.ac(...)   # re-runs are loaded from disk
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from .waveforms import Waveforms
+
+DEFAULT_MAX_BYTES = 1 << 30   # 1 GiB
+
+CACHED_ANALYSES = ('operating_point', 'ac', 'dc', 'transient', 'noise')
+
+
+def default_cache_dir():
+    """Cache folder: $SPICEPILOT_CACHE or ~/.cache/spicepilot."""
+    return Path(os.environ.get('SPICEPILOT_CACHE',
+                               Path.home() / '.cache' / 'spicepilot'))
+
+
+def deck_key(deck):
+    """Hash a complete ngspice deck into a cache key."""
+    return hashlib.sha256(deck.encode('utf-8')).hexdigest()
+
+
+def analysis_deck(simulator, analyses, *args, **kwargs):
+    """
+    Return the ngspice deck a PySpice simulator would submit, without running it
+
+    Args:
+        simulator: PySpice CircuitSimulator (any backend; only its text is used)
+        analyses: Analysis method name ('ac', 'transient', ...) with its
+            arguments in *args/**kwargs, or a {name: kwargs} dict to put
+            several analysis cards in one deck
+    """
+    from PySpice.Spice.Simulation import CircuitSimulation
+
+    if isinstance(analyses, str):
+        analyses = {analyses: (args, kwargs)}
+    else:
+        analyses = {name: ((), options or {}) for name, options in analyses.items()}
+
+    simulator.reset_analysis()
+    try:
+        for analysis, (analysis_args, analysis_kwargs) in analyses.items():
+            analysis_kwargs = dict(analysis_kwargs)
+            if 'probes' in analysis_kwargs:
+                simulator.save(*analysis_kwargs.pop('probes'))
+            analysis_kwargs.pop('log_desk', None)
+            getattr(CircuitSimulation, analysis)(simulator, *analysis_args, **analysis_kwargs)
+        return str(simulator)
+    finally:
+        simulator.reset_analysis()
+
+
+class SimulationCache:
+    """Directory of cached Waveforms with an LRU size budget."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            directory: Cache folder (default: default_cache_dir())
+            max_bytes: Size budget; least recently used entries are evicted beyond it
+        """
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return self.directory / f'{key}.npz'
+
+    def get(self, key):
+        """Return cached Waveforms for `key`, or None."""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                waveforms = self._unpack(data)
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        os.utime(path)   # mark as recently used
+        self.hits += 1
+        return waveforms
+
+    def put(self, key, waveforms):
+        """Store Waveforms under `key` and enforce the size budget."""
+        arrays = self._pack(waveforms)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def get_results(self, key, analyses):
+        """
+        Return {analysis: Waveforms} for a multi-analysis deck, or None if any is missing
+
+        Args:
+            key: deck_key() of the deck
+            analyses: Analysis names the deck runs
+        """
+        results = {}
+        for analysis in analyses:
+            waveforms = self.get(f'{key}-{analysis}')
+            if waveforms is None:
+                return None
+            results[waveforms.analysis] = waveforms
+        return results
+
+    def put_results(self, key, results):
+        """Store the {analysis: Waveforms} of a multi-analysis deck."""
+        for analysis, waveforms in results.items():
+            self.put(f'{key}-{analysis}', waveforms)
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits its budget."""
+        entries = []
+        total = 0
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        """Delete every cached entry."""
+        for path in self.directory.glob('*.npz'):
+            path.unlink()
+
+    @staticmethod
+    def _pack(waveforms):
+        meta = {
+            'analysis': waveforms.analysis,
+            'abscissa': waveforms.abscissa_name,
+            'nodes': list(waveforms.nodes),
+            'branches': list(waveforms.branches),
+        }
+        arrays = {'meta': np.array(json.dumps(meta))}
+        for i, name in enumerate(meta['nodes']):
+            arrays[f'n{i}'] = waveforms.nodes[name]
+        for i, name in enumerate(meta['branches']):
+            arrays[f'b{i}'] = waveforms.branches[name]
+        if waveforms.abscissa is not None:
+            arrays['x'] = waveforms.abscissa
+        return arrays
+
+    @staticmethod
+    def _unpack(data):
+        meta = json.loads(str(data['meta']))
+        nodes = {name: data[f'n{i}'] for i, name in enumerate(meta['nodes'])}
+        branches = {name: data[f'b{i}'] for i, name in enumerate(meta['branches'])}
+        abscissa = data['x'] if 'x' in data.files else None
+        return Waveforms(meta['analysis'], nodes, branches, meta['abscissa'], abscissa)
+
+
+class CachedSimulator:
+    """
+    Wrap a PySpice simulator so operating_point, ac, dc, transient and noise
+    results are served from a SimulationCache when the deck was seen before.
+
+    Everything else (options, initial_condition, node_set, ...) is forwarded
+    to the wrapped simulator. Analyses return Waveforms.
+    """
+
+    def __init__(self, simulator, cache=None):
+        self._simulator = simulator
+        self._cache = cache if cache is not None else SimulationCache()
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @property
+    def simulator(self):
+        return self._simulator
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in CACHED_ANALYSES:
+            return lambda *args, **kwargs: self._run(name, *args, **kwargs)
+        return getattr(self._simulator, name)
+
+    def deck(self, analysis, *args, **kwargs):
+        """Return the ngspice deck an analysis call would submit."""
+        return analysis_deck(self._simulator, analysis, *args, **kwargs)
+
+    def _run(self, analysis, *args, **kwargs):
+        key = deck_key(self.deck(analysis, *args, **kwargs))
+        waveforms = self._cache.get(key)
+        if waveforms is None:
+            result = getattr(self._simulator, analysis)(*args, **kwargs)
+            waveforms = Waveforms.from_analysis(result, analysis)
+            self._cache.put(key, waveforms)
+        return waveforms
+
+
+def cached_simulator(circuit, cache=None, **kwargs):
+    """Shortcut for CachedSimulator(circuit.simulator(**kwargs), cache)."""
+    return CachedSimulator(circuit.simulator(**kwargs), cache)
@@ -0,0 +1,1070 @@
+"""
+Benchmark Catalogue
+
+archive/New_bench-mark.md describes the Easy/Medium/Hard/Extreme circuits
+in prose. This module parses it into Spec objects (ports, required
+analyses and measurable acceptance criteria) and grades generated scripts
+against them without anyone reading a plot:
+
+    with Evaluator(jobs=8) as evaluator:
+        grades = evaluator.evaluate(discover('archive/test_files'))
+    print(format_grades(grades))
+
+Every script runs in the Sandbox, is matched to a catalogue entry by its
+circuit title (or is given one) and gets these checks:
+
+    runs          the script finished without an error
+    analyses      the analyses the entry needs ran without an error
+    ports         every port of the entry is a top-level node
+    transistors   the flattened MOSFET count is in the tier's range (informative)
+    criteria      truth tables, oscillation frequency ranges, current-mirror
+                  ratios and gain floors, measured on the script's netlist
+
+Criteria re-simulate the netlist the script built inside a test bench:
+the script's sources on input ports are replaced by the stimulus and the
+supply level is read from the script's own supply source. Ports are found
+by name ('input_A', 'inputA' and 'A' all carry port A, see Port). A truth
+table is one deck whatever its size (see spicepilot.truthtable): a DC
+sweep over all rows, or for latches a PWL transient through a set/reset
+sequence. The decks of all scripts are simulated together on a process
+pool.
+
+Entries without curated criteria still get the generic checks. The whole
+catalogue can be exported as JSON:
+
+Usage:
+    python -m spicepilot.catalogue archive/test_files --jobs 8 --json results/grades.json
+    python -m spicepilot.catalogue --export results/catalogue.json
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from .benchmark import REPO_ROOT, discover
+from .measure import frequency
+from .prescreen import spice_float
+from .sandbox import Sandbox, SandboxLimits
+from .session import simulate_deck
+from .truthtable import DC, TRANSIENT, expand
+from .truthtable import stimulus as truth_stimulus
+
+CATALOGUE_PATH = REPO_ROOT / 'archive' / 'New_bench-mark.md'
+
+# Flattened transistor count of each tier (README); None is unbounded
+TIER_TRANSISTORS = {'easy': (1, 10), 'medium': (11, 25), 'hard': (26, 45), 'extreme': (46, None)}
+
+GROUND_NAMES = ('0', 'gnd')
+
+# Pins of each element type by SPICE prefix; X lines end with the subcircuit name
+PIN_COUNTS = {'b': 2, 'c': 2, 'd': 2, 'e': 4, 'f': 2, 'g': 4, 'h': 2, 'i': 2, 'j': 3, 'k': 0,
+              'l': 2, 'm': 4, 'q': 3, 'r': 2, 's': 4, 'v': 2, 'w': 2}
+
+# Words that say nothing about which circuit a title means
+STOP_WORDS = {'a', 'an', 'and', 'based', 'circuit', 'cmos', 'custom', 'design', 'for', 'gate', 'in', 'mosfet',
+              'of', 'simple', 'the', 'to', 'using', 'with'}
+
+# Prefix of the sources a test bench adds
+BENCH_SOURCE = 'vbench_'
+
+
+# -- Catalogue --------------------------------------------------------------
+
+@dataclass
+class CatalogueEntry:
+    """One circuit of the benchmark markdown."""
+    tier: str
+    number: int
+    name: str
+    description: str = ''
+
+
+_TIER_HEADING = re.compile(r'^#+\s*\**\s*(easy|medium|hard|extreme)\b', re.IGNORECASE)
+_ENTRY = re.compile(r'^(\d+)\.\s+(?:\*\*)?(.+?)(?:\*\*)?\s*$')
+_DESCRIPTION = re.compile(r'^\s*(?:-\s*)?\*\*Description:?\*\*:?\s*(.*)$')
+
+
+def parse_catalogue(path=CATALOGUE_PATH):
+    """
+    Read the entries of the benchmark markdown
+
+    Entries are numbered lines ('1. **CMOS Inverter (NOT Gate)**') under a
+    tier heading; the description is the text up to the next entry.
+
+    Returns:
+        List of CatalogueEntry in file order
+    """
+    entries = []
+    tier = None
+    for line in Path(path).read_text(encoding='utf-8').splitlines():
+        heading = _TIER_HEADING.match(line)
+        if heading:
+            tier = heading.group(1).lower()
+            continue
+        if tier is None:
+            continue
+        entry = _ENTRY.match(line)
+        if entry:
+            entries.append(CatalogueEntry(tier, int(entry.group(1)), entry.group(2).strip()))
+            continue
+        description = _DESCRIPTION.match(line)
+        text = description.group(1) if description else line.strip()
+        if entries and entries[-1].tier == tier and text and text != '---':
+            entries[-1].description = f'{entries[-1].description} {text}'.strip()
+    return entries
+
+
+def _normal(node):
+    """Node name as compared with port aliases: lower case, no '_', no 'input'/'select' prefix."""
+    name = str(node).lower().replace('_', '')
+    for prefix in ('input', 'select'):
+        if name.startswith(prefix) and len(name) > len(prefix):
+            return name[len(prefix):]
+    return name
+
+
+def _criterion_dict(criterion):
+    """Criterion as a plain dict tagged with its type (options of AnyOf included)."""
+    data = {'type': type(criterion).__name__, **asdict(criterion)}
+    if hasattr(criterion, 'options'):
+        data['options'] = [_criterion_dict(option) for option in criterion.options]
+    return data
+
+
+@dataclass
+class Port:
+    """A circuit terminal that a criterion drives or reads."""
+    name: str
+    aliases: tuple = ()        # other node names that carry the port
+    optional: bool = False     # criteria work without it
+
+    def matches(self):
+        """Normalised node names that carry the port, most specific first."""
+        return (_normal(self.name),) + tuple(_normal(alias) for alias in self.aliases)
+
+
+@dataclass
+class Spec:
+    """A catalogue entry with what a generated circuit has to show."""
+    tier: str
+    number: int
+    name: str
+    description: str = ''
+    ports: list = field(default_factory=list)
+    analyses: tuple = ()       # required analyses; 'dc|operating_point' accepts either
+    criteria: list = field(default_factory=list)
+    keywords: tuple = ()       # further words that match circuit titles
+
+    @property
+    def transistors(self):
+        return TIER_TRANSISTORS[self.tier]
+
+    def port(self, name):
+        for port in self.ports:
+            if port.name == name:
+                return port
+        raise KeyError(f"{self.name} has no port {name}")
+
+    def to_dict(self):
+        """Plain dict for JSON, criteria tagged with their type."""
+        data = asdict(self)
+        data['transistors'] = list(self.transistors)
+        data['criteria'] = [_criterion_dict(criterion) for criterion in self.criteria]
+        return data
+
+
+# -- Test benches -----------------------------------------------------------
+
+def _pins(tokens):
+    """Node names of one element line."""
+    prefix = tokens[0][0].lower()
+    if prefix == 'x':
+        arguments = [token for token in tokens[1:] if '=' not in token]
+        return arguments[:-1]
+    return tokens[1:1 + PIN_COUNTS.get(prefix, 2)]
+
+
+_WAVEFORM = re.compile(r'\b(pulse|sin|pwl|exp)\s*\(([^)]*)\)', re.IGNORECASE)
+
+
+def source_levels(value):
+    """
+    Levels of a SPICE source value such as '5V' or 'DC 0V PULSE(0V 3.3V 0ns ...)'
+
+    Returns:
+        (bias, lowest, highest) in volts or amperes; the bias is the DC
+        value, or the offset of a SIN source
+    """
+    waveform = _WAVEFORM.search(value)
+    tokens = (value[:waveform.start()] if waveform else value).split()
+    dc = None
+    if tokens and tokens[0].lower() == 'dc' and len(tokens) > 1:
+        dc = spice_float(tokens[1])
+    elif tokens and tokens[0].lower() != 'ac':
+        dc = spice_float(tokens[0])
+
+    levels = []
+    bias = dc
+    if waveform:
+        kind = waveform.group(1).lower()
+        arguments = [spice_float(token) for token in waveform.group(2).split()]
+        if kind == 'sin' and len(arguments) >= 2:
+            bias = arguments[0]
+            levels = [arguments[0] - arguments[1], arguments[0] + arguments[1]]
+        elif kind == 'pwl':
+            levels = arguments[1::2]
+        else:
+            levels = arguments[:2]
+    if dc is None:
+        dc = levels[0] if levels else 0.0
+    if bias is None:
+        bias = dc
+    levels.append(dc)
+    return bias, min(levels), max(levels)
+
+
+def transistor_count(netlist):
+    """Flattened number of MOSFETs in a netlist text, X instances expanded."""
+    local = {None: [0, []]}
+    scope = [None]
+    for line in netlist.splitlines():
+        tokens = line.split()
+        if not tokens:
+            continue
+        head = tokens[0].lower()
+        if head == '.subckt' and len(tokens) > 1:
+            scope.append(tokens[1].lower())
+            local[scope[-1]] = [0, []]
+        elif head == '.ends':
+            if len(scope) > 1:
+                scope.pop()
+        elif head[0] == 'm':
+            local[scope[-1]][0] += 1
+        elif head[0] == 'x':
+            pins = _pins(tokens)
+            arguments = [token for token in tokens[1:] if '=' not in token]
+            if len(arguments) > len(pins):
+                local[scope[-1]][1].append(arguments[-1].lower())
+
+    counts = {}
+
+    def count(name, depth=0):
+        if name not in counts:
+            if depth > len(local):
+                raise ValueError(f"Subcircuit {name} instantiates itself")
+            devices, instances = local.get(name, (0, ()))
+            counts[name] = devices + sum(count(child, depth + 1) for child in instances)
+        return counts[name]
+
+    return count(None)
+
+
+class Bench:
+    """The top level of a script's netlist, with the ports of a Spec resolved."""
+
+    def __init__(self, netlist, ports=()):
+        """
+        Args:
+            netlist: Netlist text (SandboxResult.netlist: no analyses, no .end)
+            ports: Ports to look for among the top-level nodes
+        """
+        self.netlist = netlist
+        self.lines = netlist.splitlines()
+        self.elements = []       # (line index, name, nodes, value text) of the top-level elements
+        depth = 0
+        for k, line in enumerate(self.lines):
+            text = line.strip()
+            head = text.split(None, 1)[0].lower() if text else ''
+            if head == '.subckt':
+                depth += 1
+            elif head == '.ends':
+                depth -= 1
+            elif depth == 0 and text and not text.startswith(('.', '*', '+')):
+                tokens = text.split()
+                pins = _pins(tokens)
+                self.elements.append((k, tokens[0], pins, ' '.join(tokens[1 + len(pins):])))
+
+        nodes = {}
+        for _, _, pins, _ in self.elements:
+            for node in pins:
+                if node.lower() not in GROUND_NAMES:
+                    nodes.setdefault(_normal(node), node)
+        self.ports = {}
+        for port in ports:
+            self.ports[port.name] = next((nodes[alias] for alias in port.matches() if alias in nodes), None)
+
+        # The supply is the ground-referenced voltage source with the highest level
+        # that does not drive a port
+        self.supply_node = None
+        self.supply_level = None
+        taken = {node.lower() for node in self.ports.values() if node}
+        for node, value in self.sources().items():
+            if node.lower() in taken:
+                continue
+            try:
+                level = source_levels(value)[2]
+            except ValueError:
+                continue
+            if self.supply_level is None or level > self.supply_level:
+                self.supply_node, self.supply_level = node, level
+
+    @property
+    def title(self):
+        for line in self.lines:
+            if line.lower().startswith('.title'):
+                return line[len('.title'):].strip()
+        return ''
+
+    def sources(self):
+        """{node: value text} of the top-level voltage sources from a node to ground."""
+        return {pins[0]: value for _, name, pins, value in self.elements
+                if name[0].lower() == 'v' and len(pins) == 2 and pins[1].lower() in GROUND_NAMES}
+
+    def source_levels(self, node):
+        """source_levels() of the script's source on `node`, or None if it has none."""
+        for source_node, value in self.sources().items():
+            if source_node.lower() == str(node).lower():
+                return source_levels(value)
+        return None
+
+    def require_supply(self):
+        if self.supply_level is None or self.supply_level <= 0:
+            raise ValueError("no supply source found")
+        return self.supply_node, self.supply_level
+
+    def drains(self):
+        """Drain nodes of the top-level MOSFETs, except ground and the supply."""
+        skip = set(GROUND_NAMES) | {str(self.supply_node).lower()}
+        drains = []
+        for _, name, pins, _ in self.elements:
+            if name[0].lower() == 'm' and pins and pins[0].lower() not in skip and pins[0] not in drains:
+                drains.append(pins[0])
+        return drains
+
+    @staticmethod
+    def source_name(node):
+        """Name of the source a test bench puts on `node`."""
+        return BENCH_SOURCE + re.sub(r'\W', '_', str(node)).lower()
+
+    def deck(self, cards, drive=None, isolate=(), free=()):
+        """
+        Test-bench deck: the netlist with some nodes driven by new sources, then `cards` and .end
+
+        Args:
+            cards: Element, analysis and control lines, e.g. ['.op']
+            drive: {node: source value text}; the script's own sources from
+                those nodes to ground are left out
+            isolate: Nodes whose top-level two-terminal elements are left out
+                (so a bench source sees only the circuit's current)
+            free: Further nodes whose sources to ground are left out (the
+                cards drive them)
+        """
+        drive = drive or {}
+        driven = {str(node).lower() for node in list(drive) + list(free)}
+        isolated = {str(node).lower() for node in isolate}
+        dropped = set()
+        for k, name, pins, _ in self.elements:
+            lowered = [pin.lower() for pin in pins]
+            if name[0].lower() == 'v' and len(pins) == 2 and lowered[1] in GROUND_NAMES and lowered[0] in driven:
+                dropped.add(k)
+            elif len(pins) == 2 and name[0].lower() in 'rclvid' and isolated.intersection(lowered):
+                dropped.add(k)
+        lines = [line for k, line in enumerate(self.lines) if k not in dropped]
+        lines += [f'{self.source_name(node)} {node} 0 {value}' for node, value in drive.items()]
+        lines += list(cards) + ['.end']
+        return '\n'.join(lines) + '\n'
+
+    def voltage(self, waveforms, node):
+        """Voltage of a node in an operating point (0 for ground)."""
+        if str(node).lower() in GROUND_NAMES:
+            return 0.0
+        return float(np.real(waveforms[node]))
+
+
+def _bits(values):
+    return ''.join('X' if value < 0 else str(value) for value in values)
+
+
+# -- Criteria ---------------------------------------------------------------
+
+@dataclass
+class TruthTable:
+    """Every row of the table settles to the expected logic outputs."""
+    inputs: tuple
+    outputs: tuple
+    rows: tuple                # ((input bits), (output bits)) per row; None outputs are don't-cares
+    sequential: bool = False   # rows are applied in order (transient), e.g. for latches
+
+    name = 'truth-table'
+
+    @classmethod
+    def of(cls, inputs, outputs, function):
+        """Table of `function` (input bits -> output bit or tuple of bits) over all input combinations."""
+        bits, expected = expand(function, len(inputs))
+        return cls(tuple(inputs), tuple(outputs),
+                   tuple((tuple(map(int, row)), tuple(map(int, out))) for row, out in zip(bits, expected)))
+
+    def ports(self):
+        return tuple(self.inputs) + tuple(self.outputs)
+
+    def applicable(self, bench):
+        """
+        (inputs found, outputs found, input bits, expected bits)
+
+        Rows that need a missing (optional) input high are dropped, so a
+        circuit that ties, say, the carry-in low is tested on the rest;
+        missing optional outputs are not read.
+        """
+        keep = [k for k, port in enumerate(self.inputs) if bench.ports.get(port)]
+        read = [k for k, port in enumerate(self.outputs) if bench.ports.get(port)]
+        rows = [(bits, expected) for bits, expected in self.rows
+                if not any(bit for k, bit in enumerate(bits) if k not in keep)]
+        if not rows:
+            raise ValueError("no applicable rows")
+        bits, expected = expand(rows, len(self.inputs))
+        return [self.inputs[k] for k in keep], [self.outputs[k] for k in read], bits[:, keep], expected[:, read]
+
+    def _stimulus(self, bench):
+        inputs, outputs, bits, expected = self.applicable(bench)
+        stimulus = truth_stimulus([bench.ports[port] for port in inputs], bits, bench.require_supply()[1],
+                                  TRANSIENT if self.sequential else DC)
+        return stimulus, inputs, outputs, expected
+
+    def decks(self, bench):
+        """One deck for the whole table: the stimulus replaces the input sources, the supply is held at DC."""
+        supply_node, supply = bench.require_supply()
+        stimulus = self._stimulus(bench)[0]
+        return [bench.deck(stimulus.lines + [stimulus.card], {supply_node: f'DC {supply!r}'}, free=stimulus.inputs)]
+
+    def check(self, bench, outcomes):
+        stimulus, inputs, outputs, expected = self._stimulus(bench)
+        outcome = outcomes[0]
+        if not outcome or stimulus.mode not in outcome:
+            return Check(self.name, False, 'simulation failed')
+        result = stimulus.read(outcome, [bench.ports[port] for port in outputs], expected)
+        rows = len(expected)
+        failed = result.failed.any(axis=1)
+        detail = f"{rows - int(failed.sum())}/{rows} rows ({','.join(inputs)} -> {','.join(outputs)})"
+        failures = [f'{_bits(result.bits[row])} -> {_bits(result.measured[row])}, expected {_bits(expected[row])}'
+                    for row in np.flatnonzero(failed)]
+        if failures:
+            detail += '; ' + '; '.join(failures[:3]) + (' ...' if len(failures) > 3 else '')
+        return Check(self.name, result.passed, detail)
+
+
+@dataclass
+class AnyOf:
+    """Passes if one of several criteria does, e.g. a NOR (active-high) or NAND (active-low) latch."""
+    options: tuple
+
+    @property
+    def name(self):
+        return self.options[0].name
+
+    def ports(self):
+        ports = []
+        for option in self.options:
+            ports += [port for port in option.ports() if port not in ports]
+        return tuple(ports)
+
+    def decks(self, bench):
+        return [deck for option in self.options for deck in option.decks(bench)]
+
+    def check(self, bench, outcomes):
+        checks = []
+        start = 0
+        for option in self.options:
+            count = len(option.decks(bench))
+            checks.append(option.check(bench, outcomes[start:start + count]))
+            start += count
+        passed = [check for check in checks if check.passed]
+        if passed:
+            return passed[0]
+        return Check(self.name, False, ' | '.join(check.detail for check in checks))
+
+
+@dataclass
+class Oscillates:
+    """The output oscillates at a frequency between `minimum` and `maximum` (Hz)."""
+    output: str
+    minimum: float
+    maximum: float
+    duration: float = 20e-6                   # transient length in seconds
+    hold: dict = field(default_factory=dict)  # {port: fraction of the supply} held constant, e.g. a VCO control
+    swing: float = 0.25                       # minimum peak-to-peak swing as a fraction of the supply
+
+    name = 'oscillates'
+
+    def ports(self):
+        return (self.output,) + tuple(self.hold)
+
+    def decks(self, bench):
+        _, supply = bench.require_supply()
+        drive = {bench.ports[port]: f'DC {fraction * supply!r}'
+                 for port, fraction in self.hold.items() if bench.ports.get(port)}
+        # The script's own supply stays: ramps and kicks are what start many ring oscillators
+        return [bench.deck([f'.tran {self.duration / 10000!r} {self.duration!r}'], drive)]
+
+    def check(self, bench, outcomes):
+        outcome = outcomes[0]
+        if not outcome or 'transient' not in outcome:
+            return Check(self.name, False, 'simulation failed')
+        waveforms = outcome['transient']
+        t = waveforms.abscissa
+        settled = t >= t[-1] / 2
+        # Without a named output, the drain that swings the most
+        nodes = [bench.ports[self.output]] if bench.ports.get(self.output) else bench.drains()
+        best = None
+        for node in nodes:
+            y = np.real(waveforms[node])[settled]
+            swing = float(y.max() - y.min()) if y.size else 0.0
+            if best is None or swing > best[1]:
+                best = (node, swing, y)
+        if best is None:
+            return Check(self.name, False, 'no output node')
+        node, swing, y = best
+        if swing < self.swing * bench.supply_level:
+            return Check(self.name, False, f'{node} swings {swing:.3g} V')
+        f = float(frequency(t[settled], y))
+        passed = not math.isnan(f) and self.minimum <= f <= self.maximum
+        return Check(self.name, passed, f'{node}: {f:.4g} Hz, swing {swing:.3g} V '
+                                        f'(expected {self.minimum:.3g}-{self.maximum:.3g} Hz)')
+
+
+@dataclass
+class Gain:
+    """Small-signal gain in dB from input to output at one frequency."""
+    input: str
+    output: str
+    minimum: float
+    maximum: float = None
+    frequency: float = 1e3
+    inverting_input: str = None     # other input of a differential stage (driven in antiphase)
+
+    name = 'gain'
+
+    def ports(self):
+        return (self.input, self.output) + ((self.inverting_input,) if self.inverting_input else ())
+
+    def decks(self, bench):
+        inputs = [self.input]
+        if self.inverting_input and bench.ports.get(self.inverting_input):
+            inputs.append(self.inverting_input)
+        amplitudes = ['AC 1'] if len(inputs) == 1 else ['AC 0.5', 'AC 0.5 180']
+        drive = {}
+        for port, amplitude in zip(inputs, amplitudes):
+            node = bench.ports[port]
+            levels = bench.source_levels(node)
+            # The script's DC bias on the input stays
+            bias = levels[0] if levels else 0.0
+            drive[node] = f'DC {bias!r} {amplitude}'
+        return [bench.deck([f'.ac lin 1 {self.frequency!r} {self.frequency!r}'], drive)]
+
+    def check(self, bench, outcomes):
+        outcome = outcomes[0]
+        if not outcome or 'ac' not in outcome:
+            return Check(self.name, False, 'simulation failed')
+        magnitude = float(np.abs(np.ravel(outcome['ac'][bench.ports[self.output]])[0]))
+        gain = 20 * math.log10(magnitude) if magnitude > 0 else -math.inf
+        passed = gain >= self.minimum and (self.maximum is None or gain <= self.maximum)
+        expected = f'>= {self.minimum:g} dB' if self.maximum is None else f'{self.minimum:g} to {self.maximum:g} dB'
+        return Check(self.name, passed, f'{gain:.2f} dB at {self.frequency:g} Hz (expected {expected})')
+
+
+@dataclass
+class MirrorRatio:
+    """Output current of a current mirror over its reference current."""
+    output: str
+    minimum: float = 0.8
+    maximum: float = 1.25
+    bias: float = 0.5       # output held at this fraction of the supply
+
+    name = 'mirror-ratio'
+
+    def ports(self):
+        return (self.output,)
+
+    @staticmethod
+    def reference(bench):
+        """
+        Drain of the diode-connected top-level MOSFET whose gate drives
+        another MOSFET and whose drain is fed by a resistor or source
+        """
+        mosfets = [pins for _, name, pins, _ in bench.elements if name[0].lower() == 'm']
+        gates = [pins[1].lower() for pins in mosfets]
+        fed = {pin.lower() for _, name, pins, _ in bench.elements if name[0].lower() in 'riv' for pin in pins}
+        for pins in mosfets:
+            drain, gate = pins[0].lower(), pins[1].lower()
+            if drain == gate and gates.count(gate) > 1 and drain in fed:
+                return pins[0]
+        raise ValueError("no diode-connected reference device at the top level")
+
+    def decks(self, bench):
+        _, supply = bench.require_supply()
+        self.reference(bench)
+        node = bench.ports[self.output]
+        return [bench.deck(['.op'], {node: f'DC {self.bias * supply!r}'}, isolate=[node])]
+
+    def check(self, bench, outcomes):
+        outcome = outcomes[0]
+        if not outcome or 'operating_point' not in outcome:
+            return Check(self.name, False, 'simulation failed')
+        op = outcome['operating_point']
+        output = abs(float(np.real(op[bench.source_name(bench.ports[self.output])])))
+
+        # Reference current: what the resistors and sources at the reference node deliver
+        node = self.reference(bench).lower()
+        reference = 0.0
+        for _, name, pins, value in bench.elements:
+            lowered = [pin.lower() for pin in pins]
+            prefix = name[0].lower()
+            if node not in lowered or prefix not in 'riv' or len(pins) != 2:
+                continue
+            side = lowered.index(node)
+            if prefix == 'r':
+                other = pins[1 - side]
+                reference += (bench.voltage(op, other) - bench.voltage(op, node)) / spice_float(value.split()[0])
+            else:
+                # Source current flows from its + node through it to its - node
+                current = source_levels(value)[0] if prefix == 'i' else float(np.real(op[name]))
+                reference += current if side == 1 else -current
+        reference = abs(reference)
+        if reference == 0:
+            return Check(self.name, False, 'no reference current')
+        ratio = output / reference
+        return Check(self.name, self.minimum <= ratio <= self.maximum,
+                     f'{ratio:.3f} ({output:.3g} A / {reference:.3g} A, expected {self.minimum:g}-{self.maximum:g})')
+
+
+# -- Curated specs ----------------------------------------------------------
+
+IN = Port('in', ('input', 'vin', 'a', 'x'))
+OUT = Port('out', ('output', 'vout', 'y', 'z'))
+A = Port('A', ('1', 'in1', 'vin1', 'ina', 'va'))
+B = Port('B', ('2', 'in2', 'vin2', 'inb', 'vb'))
+INP = Port('inp', ('inplus', 'vinp', 'vinplus', 'in1', 'vin1', 'pos', 'inpos', 'vp', 'noninverting', '1'))
+INN = Port('inn', ('inminus', 'vinn', 'vinminus', 'in2', 'vin2', 'neg', 'inneg', 'vn', 'inverting', '2'),
+           optional=True)
+OSC_OUT = Port('out', ('output', 'vout', 'oscout', 'osc', 'vcoout'), optional=True)
+MIRROR_OUT = Port('out', ('iout', 'output', 'vout', 'd2', 'drain2'))
+
+
+def _bit_ports(prefix, count, *aliases):
+    """Ports prefix0.. with aliases such as 'sum{}' filled in with the bit index."""
+    return [Port(f'{prefix}{i}', tuple(alias.format(i) for alias in aliases)) for i in range(count)]
+
+
+def _adder(a, b, cin, width):
+    total = sum(bit << i for i, bit in enumerate(a)) + sum(bit << i for i, bit in enumerate(b)) + cin
+    return tuple((total >> i) & 1 for i in range(width + 1))
+
+
+def _latch(active):
+    """(S, R) -> (Q, Qbar) rows: set, hold, reset, hold, set, with inputs active at level `active`."""
+    idle = 1 - active
+    set_, reset = (active, idle), (idle, active)
+    return ((set_, (1, 0)), ((idle, idle), (1, 0)), (reset, (0, 1)), ((idle, idle), (0, 1)), (set_, (1, 0)))
+
+
+def _curated():
+    """{entry name: Spec fields} for the entries with measurable criteria."""
+    cin = Port('Cin', ('c', 'ci', 'carryin', 'c0'), optional=True)
+    decoder_out = _bit_ports('Y', 4, 'd{}', 'out{}', 'o{}')
+    mux_in = _bit_ports('I', 4, 'd{}', 'in{}')
+    sel = [Port('S1', ('sel1',)), Port('S0', ('sel0',))]
+    ripple_a = _bit_ports('A', 3)
+    ripple_b = _bit_ports('B', 3)
+    ripple_sum = _bit_ports('S', 3, 'sum{}')
+    enable = Port('en', ('enable', 'ctrl', 'control', 'c', 'clk', 's', 'sel', 'g'))
+    enable_b = Port('enb', ('enbar', 'enn', 'nen', 'ctrlb', 'ctrlbar', 'ctrln', 'nctrl', 'controlb', 'controlbar',
+                            'cb', 'cbar', 'clkb', 'clkbar', 'sb', 'sbar', 'selb', 'gb'), optional=True)
+    logic = ('transient',)
+    amplifier = ('ac',)
+    return {
+        'CMOS Inverter (NOT Gate)': dict(
+            ports=[IN, OUT], analyses=logic, keywords=('inverter', 'not'),
+            criteria=[TruthTable.of(('in',), ('out',), lambda a: 1 - a)]),
+        'CMOS NAND Gate': dict(
+            ports=[A, B, OUT], analyses=logic,
+            criteria=[TruthTable.of(('A', 'B'), ('out',), lambda a, b: 1 - (a & b))]),
+        'CMOS NOR Gate': dict(
+            ports=[A, B, OUT], analyses=logic,
+            criteria=[TruthTable.of(('A', 'B'), ('out',), lambda a, b: 1 - (a | b))]),
+        'Transmission Gate': dict(
+            ports=[IN, OUT, enable, enable_b], analyses=logic,
+            # Only the enabled rows: a disabled gate leaves the output floating
+            criteria=[TruthTable(('in', 'en', 'enb'), ('out',), (((0, 1, 0), (0,)), ((1, 1, 0), (1,))))]),
+        'SR Latch': dict(
+            ports=[Port('S', ('set',)), Port('R', ('reset',)), Port('Q', ('out', 'output')),
+                   Port('Qbar', ('qb', 'qn', 'nq', 'qnot', 'notq'), optional=True)],
+            analyses=logic,
+            # Set, hold, reset, hold, set: NOR latches take active-high, NAND latches active-low inputs
+            criteria=[AnyOf((TruthTable(('S', 'R'), ('Q', 'Qbar'), _latch(1), sequential=True),
+                             TruthTable(('S', 'R'), ('Q', 'Qbar'), _latch(0), sequential=True)))]),
+        'CMOS Buffer': dict(
+            ports=[IN, OUT], analyses=logic,
+            criteria=[TruthTable.of(('in',), ('out',), lambda a: a)]),
+        'CMOS XOR Gate': dict(
+            ports=[A, B, OUT], analyses=logic,
+            criteria=[TruthTable.of(('A', 'B'), ('out',), lambda a, b: a ^ b)]),
+        'CMOS XNOR Gate': dict(
+            ports=[A, B, OUT], analyses=logic,
+            criteria=[TruthTable.of(('A', 'B'), ('out',), lambda a, b: 1 - (a ^ b))]),
+        'Current Mirror': dict(
+            ports=[MIRROR_OUT], analyses=('dc|operating_point',),
+            criteria=[MirrorRatio('out')]),
+        'Differential Pair': dict(
+            ports=[INP, INN, Port('out', ('outp', 'outn', 'vout', 'output', 'out1', 'out2', 'd1', 'd2'))],
+            analyses=amplifier,
+            criteria=[Gain('inp', 'out', 0.0, inverting_input='inn')]),
+        'Ring Oscillator (3-stage)': dict(
+            ports=[OSC_OUT], analyses=logic,
+            criteria=[Oscillates('out', 1e6, 1e11)]),
+        'Common Source Amplifier': dict(
+            ports=[IN, OUT], analyses=amplifier,
+            criteria=[Gain('in', 'out', 6.0)]),
+        'Half-Adder': dict(
+            ports=[A, B, Port('sum', ('s',)), Port('carry', ('cout', 'c', 'co'))], analyses=logic,
+            criteria=[TruthTable.of(('A', 'B'), ('sum', 'carry'), lambda a, b: (a ^ b, a & b))]),
+        'Simple RC Oscillator with MOSFET Switch': dict(
+            ports=[OSC_OUT], analyses=logic,
+            criteria=[Oscillates('out', 10.0, 1e8, duration=1e-3)]),
+        'Voltage Follower (Source Follower)': dict(
+            ports=[IN, OUT], analyses=amplifier, keywords=('common', 'drain'),
+            criteria=[Gain('in', 'out', -6.0, 1.0)]),
+        'Full Adder': dict(
+            ports=[A, B, cin, Port('sum', ('s',)), Port('cout', ('carry', 'co', 'carryout'))], analyses=logic,
+            criteria=[TruthTable.of(('A', 'B', 'Cin'), ('sum', 'cout'),
+                                    lambda a, b, c: (a ^ b ^ c, (a & b) | (c & (a ^ b))))]),
+        '2-to-4 Decoder': dict(
+            ports=[Port('A1', ('b', 's1', 'in1')), Port('A0', ('a', 's0', 'in0'))] + decoder_out, analyses=logic,
+            criteria=[TruthTable.of(('A1', 'A0'), tuple(port.name for port in decoder_out),
+                                    lambda a1, a0: tuple(int(2 * a1 + a0 == k) for k in range(4)))]),
+        'Current Mirror with Cascode': dict(
+            ports=[MIRROR_OUT], analyses=('dc|operating_point',),
+            criteria=[MirrorRatio('out')]),
+        'Differential Amplifier with Current Mirror Load': dict(
+            ports=[INP, INN, OUT], analyses=amplifier,
+            criteria=[Gain('inp', 'out', 20.0, inverting_input='inn')]),
+        'Ring Oscillator (5-stage)': dict(
+            ports=[OSC_OUT], analyses=logic,
+            criteria=[Oscillates('out', 1e6, 1e11)]),
+        'Operational Transconductance Amplifier (OTA)': dict(
+            ports=[INP, INN, OUT], analyses=amplifier,
+            criteria=[Gain('inp', 'out', 20.0, inverting_input='inn')]),
+        'Voltage-Controlled Oscillator (VCO)': dict(
+            ports=[OSC_OUT, Port('vctrl', ('vcontrol', 'control', 'ctrl', 'vc', 'vcont'), optional=True)],
+            analyses=logic,
+            criteria=[Oscillates('out', 1e4, 1e10, duration=200e-6, hold={'vctrl': 0.7})]),
+        'CMOS Multiplexer (4:1)': dict(
+            ports=mux_in + sel + [OUT], analyses=logic, keywords=('mux',),
+            criteria=[TruthTable.of(('I0', 'I1', 'I2', 'I3', 'S1', 'S0'), ('out',),
+                                    lambda i0, i1, i2, i3, s1, s0: (i0, i1, i2, i3)[2 * s1 + s0])]),
+        '3-bit Ripple Carry Adder': dict(
+            ports=ripple_a + ripple_b + [cin] + ripple_sum + [Port('Cout', ('carry', 'co', 'c3'))], analyses=logic,
+            criteria=[TruthTable.of(('A0', 'A1', 'A2', 'B0', 'B1', 'B2', 'Cin'), ('S0', 'S1', 'S2', 'Cout'),
+                                    lambda a0, a1, a2, b0, b1, b2, c: _adder((a0, a1, a2), (b0, b1, b2), c, 3))]),
+        'Operational Amplifier (Op-Amp)': dict(
+            ports=[INP, INN, OUT], analyses=amplifier, keywords=('opamp',),
+            criteria=[Gain('inp', 'out', 40.0, inverting_input='inn')]),
+        'Multi-Stage Operational Amplifier with Compensation': dict(
+            ports=[INP, INN, OUT], analyses=amplifier,
+            criteria=[Gain('inp', 'out', 60.0, inverting_input='inn')]),
+    }
+
+
+def load_catalogue(path=CATALOGUE_PATH):
+    """
+    The benchmark catalogue as Specs
+
+    Entries with curated criteria get their ports, analyses and criteria;
+    the others only the generic checks.
+
+    Returns:
+        List of Spec in file order
+    """
+    curated = _curated()
+    return [Spec(entry.tier, entry.number, entry.name, entry.description, **curated.get(entry.name, {}))
+            for entry in parse_catalogue(path)]
+
+
+def _words(text):
+    words = set()
+    for word in re.findall(r'[a-z0-9]+', str(text).lower()):
+        if word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith('s'):
+            word = word[:-1]
+        if word not in STOP_WORDS:
+            words.add(word)
+    return words
+
+
+def find_spec(title, specs, threshold=0.5):
+    """
+    Catalogue entry a circuit title refers to
+
+    Titles are compared by their words (Jaccard similarity, stop words such
+    as 'CMOS' or 'Gate' ignored, the Spec's keywords added).
+
+    Returns:
+        The best matching Spec, or None if none reaches `threshold`
+    """
+    words = _words(title)
+    best, best_score = None, threshold
+    for spec in specs:
+        candidate = _words(spec.name) | set(spec.keywords)
+        union = words | candidate
+        score = len(words & candidate) / len(union) if union else 0.0
+        if score > best_score or score == best_score and best is None:
+            best, best_score = spec, score
+    return best
+
+
+# -- Grading ----------------------------------------------------------------
+
+@dataclass
+class Check:
+    """Outcome of one check of a graded script."""
+    name: str
+    passed: bool
+    detail: str = ''
+    required: bool = True
+
+
+@dataclass
+class Grade:
+    """All checks of one generated script."""
+    script: str
+    spec: str = ''       # catalogue entry, '' if none matched
+    tier: str = ''
+    checks: list = field(default_factory=list)
+
+    @property
+    def passed(self):
+        return bool(self.spec) and all(check.passed for check in self.checks if check.required)
+
+    @property
+    def score(self):
+        """Fraction of the required checks passed."""
+        required = [check for check in self.checks if check.required]
+        return sum(check.passed for check in required) / len(required) if required else 0.0
+
+
+def _analyses_check(spec, records):
+    """Every required analysis (or one of its alternatives) ran without an error."""
+    ran = {record['analysis'] for record in records if not record.get('error')}
+    missing = [needed for needed in spec.analyses if not set(needed.split('|')) & ran]
+    ran_text = ', '.join(sorted(ran)) or 'none'
+    if missing:
+        return Check('analyses', False, f"missing {', '.join(missing)} (ran: {ran_text})")
+    return Check('analyses', True, f'ran: {ran_text}')
+
+
+def _transistors_check(spec, netlist):
+    try:
+        count = transistor_count(netlist)
+    except ValueError as exception:
+        return Check('transistors', False, str(exception), required=False)
+    low, high = spec.transistors
+    passed = count >= low and (high is None or count <= high)
+    limits = f'{low}+' if high is None else f'{low}-{high}'
+    return Check('transistors', passed, f'{count} MOSFETs ({spec.tier}: {limits})', required=False)
+
+
+def _outcome(call, *args):
+    """call(*args), or None if it raises (e.g. a worker that cannot load ngspice)."""
+    try:
+        return call(*args)
+    except Exception:
+        return None
+
+
+class Evaluator:
+    """Runs generated scripts in a Sandbox and grades them against the catalogue."""
+
+    def __init__(self, specs=None, jobs=None, limits=None, fork_server=False):
+        """
+        Args:
+            specs: Specs to grade against (default: load_catalogue())
+            jobs: Concurrent scripts and simulations (default: CPU count)
+            limits: SandboxLimits of the scripts
+            fork_server: Fork the scripts from one warm zygote (Linux/macOS)
+        """
+        self.specs = list(specs) if specs is not None else load_catalogue()
+        self.jobs = jobs or os.cpu_count() or 1
+        self.sandbox = Sandbox(self.jobs, limits, fork_server=fork_server)
+
+    def spec(self, name):
+        """Spec by entry name (case-insensitive)."""
+        for spec in self.specs:
+            if spec.name.lower() == str(name).lower():
+                return spec
+        raise KeyError(f"No catalogue entry {name}")
+
+    def evaluate(self, scripts, specs=None, progress=False):
+        """
+        Run scripts and grade them
+
+        Args:
+            scripts: Paths and/or (name, source) pairs, as for Sandbox.run()
+            specs: One Spec, entry name or None (match by title) per script
+            progress: Print one line per finished script
+
+        Returns:
+            List of Grade, in the order of `scripts`
+        """
+        return self.grade(self.sandbox.run(scripts, progress=progress), specs)
+
+    def grade(self, results, specs=None):
+        """
+        Grade SandboxResults
+
+        The test-bench decks of every criterion of every script are
+        simulated together on a process pool.
+
+        Args:
+            results: SandboxResults
+            specs: One Spec, entry name or None (match by title) per result
+
+        Returns:
+            List of Grade, in the order of `results`
+        """
+        results = list(results)
+        specs = list(specs) if specs is not None else [None] * len(results)
+        grades = []
+        decks = []
+        pending = []        # (grade, check index, criterion, bench, first deck, deck count)
+        for result, spec in zip(results, specs):
+            bench = Bench(result.netlist)
+            if isinstance(spec, str):
+                spec = self.spec(spec)
+            elif spec is None:
+                spec = find_spec(bench.title, self.specs)
+            grade = Grade(result.name, spec.name if spec else '', spec.tier if spec else '')
+            grades.append(grade)
+            grade.checks.append(Check('runs', result.status == 'pass',
+                                      result.error or result.exception or result.status))
+            if spec is None:
+                grade.checks.append(Check('catalogue', False, f'no entry matches {bench.title!r}'))
+                continue
+            grade.checks.append(_analyses_check(spec, result.analyses))
+
+            bench = Bench(result.netlist, spec.ports)
+            missing = [port.name for port in spec.ports if not port.optional and not bench.ports[port.name]]
+            found = ', '.join(f'{name}={node}' for name, node in bench.ports.items() if node)
+            grade.checks.append(Check('ports', not missing and bool(result.netlist),
+                                      f"missing {', '.join(missing)}" if missing else found or 'no ports'))
+            grade.checks.append(_transistors_check(spec, result.netlist))
+
+            for criterion in spec.criteria:
+                absent = [port for port in criterion.ports()
+                          if not bench.ports.get(port) and not spec.port(port).optional]
+                if absent:
+                    grade.checks.append(Check(criterion.name, False, f"missing port {', '.join(absent)}"))
+                    continue
+                try:
+                    criterion_decks = criterion.decks(bench)
+                except ValueError as exception:
+                    grade.checks.append(Check(criterion.name, False, str(exception)))
+                    continue
+                pending.append((grade, len(grade.checks), criterion, bench, len(decks), len(criterion_decks)))
+                grade.checks.append(None)
+                decks.extend(criterion_decks)
+
+        outcomes = self._simulate(decks)
+        for grade, index, criterion, bench, start, count in pending:
+            try:
+                check = criterion.check(bench, outcomes[start:start + count])
+            except (KeyError, IndexError, ValueError) as exception:
+                check = Check(criterion.name, False, f'{type(exception).__name__}: {exception}')
+            grade.checks[index] = check
+        return grades
+
+    def _simulate(self, decks):
+        """{analysis: Waveforms} or None per deck (a deck whose worker fails gives None)."""
+        jobs = min(self.jobs, max(len(decks), 1))
+        if jobs == 1:
+            return [_outcome(simulate_deck, deck) for deck in decks]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(simulate_deck, deck) for deck in decks]
+            return [_outcome(future.result) for future in futures]
+
+    def close(self):
+        self.sandbox.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def format_grades(grades):
+    """Return the grades as a fixed-width text table with a summary line."""
+    header = f"{'Script':24s} {'Catalogue entry':40s} {'Tier':8s} {'Checks':>7s} {'Result':7s} Failed"
+    lines = [header, '-' * len(header)]
+    for grade in grades:
+        required = [check for check in grade.checks if check.required]
+        failed = ', '.join(check.name for check in required if not check.passed)
+        passed = sum(check.passed for check in required)
+        lines.append(f"{grade.script:24s} {grade.spec[:40]:40s} {grade.tier:8s} "
+                     f"{f'{passed}/{len(required)}':>7s} {'pass' if grade.passed else 'fail':7s} {failed}")
+    lines.append('-' * len(header))
+    lines.append(f"{sum(grade.passed for grade in grades)}/{len(grades)} passed")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Grade generated scripts against the benchmark catalogue.')
+    parser.add_argument('roots', nargs='*', default=['archive/test_files'],
+                        help='Folders to search for tiered scripts, or script files')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Concurrent jobs (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-script wall-time limit in seconds')
+    parser.add_argument('--spec', default=None, help='Grade every script against this catalogue entry')
+    parser.add_argument('--catalogue', default=str(CATALOGUE_PATH), help='Benchmark markdown to read')
+    parser.add_argument('--fork-server', action='store_true',
+                        help='Fork every script from one warm zygote (Linux/macOS)')
+    parser.add_argument('--json', default=None, help='Write the grades to this JSON file')
+    parser.add_argument('--export', default=None, help='Write the catalogue as JSON to this file and exit')
+    args = parser.parse_args(argv)
+
+    specs = load_catalogue(args.catalogue)
+    if args.export:
+        Path(args.export).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.export, 'w', encoding='utf-8') as f:
+            json.dump([spec.to_dict() for spec in specs], f, indent=2)
+        print(f"{len(specs)} catalogue entries saved: {args.export}")
+        return 0
+
+    scripts = [Path(root) for root in args.roots if Path(root).is_file()]
+    scripts += discover(*[root for root in args.roots if not Path(root).is_file()])
+    if not scripts:
+        print("No benchmark scripts found")
+        return 1
+
+    print(f"Grading {len(scripts)} scripts...")
+    limits = SandboxLimits(args.timeout, args.timeout)
+    with Evaluator(specs, args.jobs, limits, fork_server=args.fork_server) as evaluator:
+        grades = evaluator.evaluate(scripts, [args.spec] * len(scripts) if args.spec else None, progress=True)
+    print()
+    print(format_grades(grades))
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([{**asdict(grade), 'passed': grade.passed, 'score': grade.score} for grade in grades],
+                      f, indent=2)
+        print(f"\nGrades saved: {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
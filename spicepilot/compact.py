@@ -0,0 +1,580 @@
+"""
+Compact Circuits
+
+PySpice keeps one Python object per element, with pin and node objects and
+unit-wrapped values, and formats every parameter again on each str(circuit).
+For the Hard/Extreme scripts (gpt_high_1.py adds a pull-up resistor and a
+capacitor to every NAND gate) and for the thousands of variants an optimizer
+emits, that object graph dominates memory and netlist time.
+
+CompactCircuit stores the same netlist in columns:
+
+    names       element names (without the SPICE prefix)
+    states      int32, index into a table of unique element states (class,
+                pins and every parameter except the value), shared by all
+                elements that differ only in nodes and value
+    pin_start   int32, element i uses pins[pin_start[i]:pin_start[i + 1]]
+    pins        int32, interned node IDs (node 0 is ground)
+    values      float64, the primary value (R, C, L, V/I DC, gains) in SI
+                units; NaN for elements without one and for values given as
+                text ('1k', 'DC 1 AC 1'), which stay in the element state
+    formats     int32, index into a table of the unique values as they were
+                given (100@u_kOhm, 1000), -1 if none
+
+and emits each line from a cached node head and a per-state text template,
+so only the values are formatted per element:
+
+    compact = CompactCircuit.from_circuit(circuit)
+    compact.R('load', 'out', compact.gnd, 10e3)      # PySpice shortcuts work
+    variant = compact.with_values({'Rload': 20e3})   # shares everything but values
+    deck = variant.to_spice()
+    circuit = variant.to_circuit()
+
+The round trip is lossless: to_circuit() rebuilds every element with its
+class, nodes and parameters, subcircuits, models, includes, libraries and
+.param lines, and to_spice() == str(to_circuit()) == str(circuit). A value
+is written as it was given (100kOhm, 1000) until it is changed; changed
+values are written as float64 in SI units (20000.0).
+"""
+
+import math
+import os
+from array import array
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from PySpice.Spice import high_level_elements, spice_elements
+from PySpice.Spice.ElementParameter import FloatPositionalParameter
+from PySpice.Spice.Netlist import Circuit, DeviceModel, Pin, PinDefinition, SubCircuit
+from PySpice.Tools.StringTools import str_spice
+from PySpice.Unit.Unit import UnitValue
+
+GROUND = '0'
+
+# Element class by every name PySpice uses for its netlist shortcuts
+ELEMENT_CLASSES = {}
+for _cls in spice_elements + high_level_elements:
+    ELEMENT_CLASSES[_cls.__name__] = _cls
+    if _cls in spice_elements:
+        for _alias in ('ALIAS', 'LONG_ALIAS'):
+            if hasattr(_cls, _alias):
+                ELEMENT_CLASSES[getattr(_cls, _alias)] = _cls
+
+# Rendered in place of the value to find where it goes in an element line
+_SENTINEL = 1.2345678987654321e+299
+_SENTINEL_TEXT = str(_SENTINEL)
+
+# Instance attributes that are not part of an element's state
+_PRIVATE = ('_netlist', '_name', '_pins')
+
+
+@lru_cache(maxsize=None)
+def _primary(cls):
+    """Attribute name of the value stored in the values column, or None."""
+    for parameter in cls._positional_parameters.values():
+        if isinstance(parameter, FloatPositionalParameter):
+            return parameter.attribute_name
+        return None
+    return None
+
+
+def _is_value(value):
+    return isinstance(value, (int, float, UnitValue)) and not isinstance(value, bool)
+
+
+def _instance(cls):
+    return cls.PREFIX == 'X'
+
+
+class Element:
+    """View on one element of a compact netlist."""
+
+    __slots__ = ('_netlist', '_index')
+
+    def __init__(self, netlist, index):
+        self._netlist = netlist
+        self._index = index
+
+    @property
+    def name(self):
+        return self.kind.PREFIX + self._netlist.names[self._index]
+
+    @property
+    def kind(self):
+        """PySpice element class."""
+        return self._netlist._state_table[self._netlist._states[self._index]][0]
+
+    @property
+    def nodes(self):
+        netlist = self._netlist
+        start, stop = netlist._pin_start[self._index], netlist._pin_start[self._index + 1]
+        return tuple(netlist.node_names[node] for node in netlist._pins[start:stop])
+
+    @property
+    def value(self):
+        return self._netlist._values[self._index]
+
+    @value.setter
+    def value(self, value):
+        self._netlist._values[self._index] = float(value)
+
+    @property
+    def parameters(self):
+        """Element state other than name, nodes and value (shared, do not modify)."""
+        return self._netlist._state_table[self._netlist._states[self._index]][1]
+
+    def __str__(self):
+        return self._netlist._line(self._index) or ''
+
+    def __repr__(self):
+        return f'{self.kind.__name__} {self.name}'
+
+
+class CompactNetlist:
+    """Columnar element store; base of CompactCircuit and CompactSubcircuit."""
+
+    __slots__ = ('node_names', '_node_ids', 'names', '_states', '_pin_start', '_pins', '_values',
+                 '_formats', '_format_table', '_format_ids', '_state_table', '_state_ids', '_templates',
+                 '_heads', '_name_index', '_add_cache', 'subcircuits', 'models', 'raw_spice')
+
+    def __init__(self):
+        self.node_names = [GROUND]
+        self._node_ids = {GROUND: 0}
+        self.names = []
+        self._states = array('i')
+        self._pin_start = array('i', [0])
+        self._pins = array('i')
+        self._values = array('d')
+        self._formats = array('i')
+        self._format_table = []     # (float value, value as given, its SPICE text)
+        self._format_ids = {}       # (float value, SPICE text) -> index in _format_table
+        self._state_table = []      # (class, state, pin definitions, primary attribute)
+        self._state_ids = {}        # hashable state key -> index in _state_table
+        self._templates = {}        # state index -> line tail split at the value, None if disabled
+        self._heads = []            # cached 'name node node ...' per element
+        self._name_index = None
+        self._add_cache = {}
+        self.subcircuits = {}       # name -> CompactSubcircuit
+        self.models = {}            # name -> DeviceModel
+        self.raw_spice = ''
+
+    # -- Columns -----------------------------------------------------------
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def values(self):
+        """float64 view of the values column (valid until the next element is added)."""
+        return np.frombuffer(self._values, dtype=np.float64)
+
+    @property
+    def states(self):
+        return np.frombuffer(self._states, dtype=np.int32).copy()
+
+    @property
+    def pin_start(self):
+        return np.frombuffer(self._pin_start, dtype=np.int32).copy()
+
+    @property
+    def pins(self):
+        return np.frombuffer(self._pins, dtype=np.int32).copy()
+
+    @property
+    def gnd(self):
+        return GROUND
+
+    def node_id(self, name):
+        """Interned ID of a node name."""
+        name = str(name)
+        i = self._node_ids.get(name)
+        if i is None:
+            i = self._node_ids[name] = len(self.node_names)
+            self.node_names.append(name)
+        return i
+
+    def index(self, name):
+        """Position of an element given its full name (e.g. 'MP1')."""
+        if self._name_index is None or len(self._name_index) != len(self.names):
+            table = self._state_table
+            self._name_index = {table[state][0].PREFIX + short: i
+                                for i, (short, state) in enumerate(zip(self.names, self._states))}
+        return self._name_index[name]
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            key = self.index(key)
+        if not -len(self) <= key < len(self):
+            raise IndexError(key)
+        return Element(self, key % len(self))
+
+    def __iter__(self):
+        return (Element(self, i) for i in range(len(self)))
+
+    # -- Adding elements ---------------------------------------------------
+
+    def _state_id(self, cls, state, pin_definitions):
+        key = (cls, pin_definitions, tuple(sorted((k, repr(v)) for k, v in state.items())))
+        i = self._state_ids.get(key)
+        if i is None:
+            i = self._state_ids[key] = len(self._state_table)
+            self._state_table.append((cls, state, pin_definitions, _primary(cls)))
+        return i
+
+    def _format_id(self, given):
+        value = float(given)
+        text = str_spice(given)
+        key = (value, text)
+        i = self._format_ids.get(key)
+        if i is None:
+            i = self._format_ids[key] = len(self._format_table)
+            self._format_table.append((value, given, text))
+        return i
+
+    def _append(self, name, state_id, nodes, given=None):
+        self.names.append(name)
+        self._states.append(state_id)
+        for node in nodes:
+            self._pins.append(self.node_id(node))
+        self._pin_start.append(len(self._pins))
+        if given is None:
+            self._values.append(math.nan)
+            self._formats.append(-1)
+        else:
+            self._values.append(float(given))
+            self._formats.append(self._format_id(given))
+
+    def _given(self, i):
+        """The value of element i as it was given if it has not changed since, else the float."""
+        value = self._values[i]
+        f = self._formats[i]
+        if f >= 0 and self._format_table[f][0] == value:
+            return self._format_table[f][1]
+        return value
+
+    def _value_text(self, i):
+        value = self._values[i]
+        f = self._formats[i]
+        if f >= 0 and self._format_table[f][0] == value:
+            return self._format_table[f][2]
+        return repr(value)
+
+    def add_element(self, element):
+        """Append a copy of a PySpice element."""
+        cls = type(element)
+        state = {k: v for k, v in element.__dict__.items() if k not in _PRIVATE}
+        given = None
+        primary = _primary(cls)
+        if primary is not None and _is_value(state.get('_' + primary)):
+            given = state.pop('_' + primary)
+        pin_definitions = tuple((pin.position, pin.name, pin.alias) for pin in element._pins)
+        self._append(element._name, self._state_id(cls, state, pin_definitions),
+                     [str(pin.node) for pin in element._pins], given)
+
+    def add(self, kind, name, *args, **kwargs):
+        """
+        Append an element the way the PySpice shortcut would
+
+        Args:
+            kind: Element class or shortcut name ('R', 'MOSFET', 'X', ...)
+            name, args, kwargs: As for `circuit.<kind>(name, ...)`
+        """
+        cls = ELEMENT_CLASSES[kind] if isinstance(kind, str) else kind
+        if _instance(cls):
+            count = len(args) - 1
+        else:
+            count = cls.number_of_pins
+            if isinstance(count, slice):
+                count = count.start
+        if len(args) < count or (_instance(cls) and not args):
+            # Nodes passed by keyword: let PySpice sort them out
+            scratch = Circuit('')
+            self.add_element(cls(scratch, name, *args, **kwargs))
+            return
+
+        if _instance(cls):
+            nodes, rest = args[1:], args[:1]
+        else:
+            nodes, rest = args[:count], args[count:]
+        given = None
+        primary = _primary(cls)
+        if primary is not None:
+            if rest and _is_value(rest[0]):
+                given, rest = rest[0], (_SENTINEL,) + rest[1:]
+            elif _is_value(kwargs.get(primary)):
+                given = kwargs[primary]
+                kwargs = dict(kwargs, **{primary: _SENTINEL})
+        try:
+            key = (cls, len(nodes), repr(rest), repr(sorted(kwargs.items())))
+        except Exception:
+            key = None
+        state_id = self._add_cache.get(key)
+        if state_id is None:
+            # First element of this kind and parameters: build it once in a scratch netlist
+            scratch = Circuit('')
+            dummy = [f'n{i}' for i in range(len(nodes))]
+            if _instance(cls):
+                element = cls(scratch, name, *rest, *dummy, **kwargs)
+            else:
+                element = cls(scratch, name, *dummy, *rest, **kwargs)
+            state = {k: v for k, v in element.__dict__.items() if k not in _PRIVATE}
+            if given is not None:
+                state.pop('_' + primary, None)
+            pin_definitions = tuple((pin.position, pin.name, pin.alias) for pin in element._pins)
+            state_id = self._state_id(cls, state, pin_definitions)
+            if key is not None:
+                self._add_cache[key] = state_id
+        self._append(str(name), state_id, nodes, given)
+
+    def __getattr__(self, name):
+        # circuit.R(...), circuit.MOSFET(...), circuit.X(...) like PySpice
+        cls = ELEMENT_CLASSES.get(name)
+        if cls is None:
+            raise AttributeError(name)
+        return lambda element_name, *args, **kwargs: self.add(cls, element_name, *args, **kwargs)
+
+    def model(self, name, model_type, **parameters):
+        """Add a model."""
+        model = DeviceModel(name, model_type, **parameters)
+        if model.name in self.models:
+            raise NameError(f"Model name {name} is already defined")
+        self.models[model.name] = model
+        return model
+
+    def subcircuit(self, subcircuit):
+        """Add a subcircuit (CompactSubcircuit or PySpice SubCircuit)."""
+        if not isinstance(subcircuit, CompactSubcircuit):
+            subcircuit = CompactSubcircuit.from_subcircuit(subcircuit)
+        self.subcircuits[subcircuit.name] = subcircuit
+
+    def _copy_netlist(self, netlist):
+        for element in netlist.elements:
+            self.add_element(element)
+        for name in netlist.subcircuit_names:
+            self.subcircuits[str(name)] = CompactSubcircuit.from_subcircuit(netlist._subcircuits[name])
+        self.models = dict(netlist._models)
+        self.raw_spice = netlist.raw_spice
+
+    # -- Variants ----------------------------------------------------------
+
+    def with_values(self, updates):
+        """
+        Copy with new values that shares names, nodes, states and definitions
+
+        Only the values column is copied, so add every element before taking
+        variants.
+
+        Args:
+            updates: {element name: value}, or a full float64 array
+
+        Raises:
+            ValueError: for an element whose value is not in the column
+                (given as text, or without a primary value)
+        """
+        variant = object.__new__(type(self))
+        for slot in _slots(type(self)):
+            setattr(variant, slot, getattr(self, slot))
+        variant._values = array('d', self._values)
+        if isinstance(updates, dict):
+            for name, value in updates.items():
+                i = self.index(name)
+                if math.isnan(self._values[i]):
+                    raise ValueError(f"{name} has no numeric value to change")
+                variant._values[i] = float(value)
+        else:
+            variant.values[:] = updates
+        return variant
+
+    # -- Output ------------------------------------------------------------
+
+    def _template(self, state_id):
+        """Tail of the element line after the nodes, split where the value goes."""
+        try:
+            return self._templates[state_id]
+        except KeyError:
+            pass
+        cls, state, pin_definitions, primary = self._state_table[state_id]
+        template = None
+        if state.get('enabled', True):
+            scratch = Circuit('')
+            dummy = [f'n{i}' for i in range(len(pin_definitions))]
+            # A value kept in the state (given as text) is part of the tail, not a slot
+            slot = math.nan if primary is None or '_' + primary in state else _SENTINEL
+            element = _rebuild(scratch, cls, 'x', state, pin_definitions, dummy, primary, slot)
+            head = ' '.join([element.name] + dummy)
+            template = tuple(str(element)[len(head):].split(_SENTINEL_TEXT))
+        self._templates[state_id] = template
+        return template
+
+    def _line(self, i):
+        heads = self._heads
+        if len(heads) <= i:
+            names, node_names, table = self.names, self.node_names, self._state_table
+            pin_start, pins, states = self._pin_start, self._pins, self._states
+            for j in range(len(heads), len(names)):
+                heads.append(' '.join([table[states[j]][0].PREFIX + names[j]]
+                                      + [node_names[node] for node in pins[pin_start[j]:pin_start[j + 1]]]))
+        template = self._template(self._states[i])
+        if template is None:
+            return None
+        if len(template) == 1:
+            return heads[i] + template[0]
+        return heads[i] + self._value_text(i).join(template)
+
+    def _str_elements(self):
+        count = len(self)
+        if count:
+            self._line(count - 1)       # caches every node head
+        heads, states, values, formats = self._heads, self._states, self._values, self._formats
+        given = [(value, text) for value, _, text in self._format_table]
+        template_of = self._template
+        lines = []
+        for i in range(count):
+            template = template_of(states[i])
+            if template is None:
+                continue
+            if len(template) == 1:
+                lines.append(heads[i] + template[0])
+                continue
+            value, f = values[i], formats[i]
+            text = given[f][1] if f >= 0 and given[f][0] == value else repr(value)
+            lines.append(heads[i] + text.join(template))
+        return os.linesep.join(lines) + os.linesep
+
+    def _str_body(self):
+        netlist = self.raw_spice
+        if netlist and not netlist.endswith(os.linesep):
+            netlist += os.linesep
+        if self.subcircuits:
+            netlist += os.linesep.join(subcircuit.to_spice() for subcircuit in self.subcircuits.values())
+        netlist += self._str_elements()
+        if self.models:
+            netlist += os.linesep.join(str(model) for model in self.models.values()) + os.linesep
+        return netlist
+
+    def _fill(self, netlist):
+        """Add every definition and element to a PySpice netlist."""
+        netlist.raw_spice = self.raw_spice
+        for subcircuit in self.subcircuits.values():
+            netlist.subcircuit(subcircuit.to_subcircuit())
+        table, node_names = self._state_table, self.node_names
+        for i, name in enumerate(self.names):
+            cls, state, pin_definitions, primary = table[self._states[i]]
+            nodes = [node_names[node] for node in self._pins[self._pin_start[i]:self._pin_start[i + 1]]]
+            _rebuild(netlist, cls, name, state, pin_definitions, nodes, primary, self._given(i))
+        for model in self.models.values():
+            netlist._models[model.name] = model
+        return netlist
+
+    def __str__(self):
+        return self.to_spice()
+
+
+def _slots(cls):
+    return [slot for klass in cls.__mro__ for slot in getattr(klass, '__slots__', ())]
+
+
+def _rebuild(netlist, cls, name, state, pin_definitions, nodes, primary, value):
+    """Create a PySpice element from its compact state and add it to `netlist`."""
+    element = cls.__new__(cls)
+    element.__dict__.update({k: v.copy() if isinstance(v, (dict, list)) else v for k, v in state.items()})
+    element._netlist = netlist
+    element._name = str(name)
+    if primary is not None and not (isinstance(value, float) and math.isnan(value)):
+        setattr(element, primary, value)
+    element._pins = [Pin(element, PinDefinition(*definition), netlist.get_node(node, True))
+                     for definition, node in zip(pin_definitions, nodes)]
+    netlist._add_element(element)
+    return element
+
+
+class CompactSubcircuit(CompactNetlist):
+    """Compact subcircuit definition."""
+
+    __slots__ = ('name', 'external_nodes', 'parameters', 'ground')
+
+    def __init__(self, name, *nodes, **parameters):
+        super().__init__()
+        self.name = str(name)
+        self.external_nodes = tuple(str(node) for node in nodes)
+        self.ground = parameters.pop('ground', 0)
+        self.parameters = parameters
+
+    @classmethod
+    def from_subcircuit(cls, subcircuit):
+        compact = cls(subcircuit.name, *subcircuit.external_nodes, ground=subcircuit._ground,
+                      **subcircuit.parameters)
+        compact._copy_netlist(subcircuit)
+        return compact
+
+    def to_subcircuit(self):
+        """Rebuild the PySpice SubCircuit."""
+        subcircuit = SubCircuit(self.name, *self.external_nodes, ground=self.ground, **self.parameters)
+        return self._fill(subcircuit)
+
+    def to_spice(self):
+        parameters = ' '.join(f'{key}={value}' for key, value in self.parameters.items())
+        header = ' '.join(part for part in (self.name, ' '.join(self.external_nodes), parameters) if part)
+        return f'.subckt {header}{os.linesep}{self._str_body()}.ends {self.name}{os.linesep}'
+
+
+class CompactCircuit(CompactNetlist):
+    """Compact equivalent of a PySpice Circuit."""
+
+    __slots__ = ('title', 'ground', 'global_nodes', 'includes', 'libs', 'parameters')
+
+    def __init__(self, title, ground=0, global_nodes=()):
+        super().__init__()
+        self.title = str(title)
+        self.ground = ground
+        self.global_nodes = set(global_nodes)
+        self.includes = []
+        self.libs = []
+        self.parameters = {}
+
+    @classmethod
+    def from_circuit(cls, circuit):
+        """Copy a PySpice Circuit into columns."""
+        compact = cls(circuit.title, circuit._ground, circuit._global_nodes)
+        compact.includes = list(circuit._includes)
+        compact.libs = list(circuit._libs)
+        compact.parameters = dict(circuit._parameters)
+        compact._copy_netlist(circuit)
+        return compact
+
+    def include(self, path):
+        if path not in self.includes:
+            self.includes.append(path)
+
+    def lib(self, name, section=None):
+        if (name, section) not in self.libs:
+            self.libs.append((name, section))
+
+    def parameter(self, name, expression):
+        self.parameters[str(name)] = str(expression)
+
+    def to_circuit(self):
+        """Rebuild the PySpice Circuit."""
+        circuit = Circuit(self.title, self.ground, self.global_nodes)
+        for path in self.includes:
+            circuit.include(path)
+        for name, section in self.libs:
+            circuit.lib(name, section)
+        for name, expression in self.parameters.items():
+            circuit.parameter(name, expression)
+        return self._fill(circuit)
+
+    def to_spice(self):
+        """SPICE text, laid out like str(circuit) of the PySpice Circuit."""
+        netlist = f'.title {self.title}{os.linesep}'
+        if self.includes:
+            netlist += os.linesep.join(f'.include {Path(str(path)).resolve()}' for path in self.includes) + os.linesep
+        for name, section in self.libs:
+            netlist += f'.lib {Path(str(name)).resolve()}' + (f' {section}' if section else '') + os.linesep
+        if self.global_nodes:
+            netlist += '.global ' + ' '.join(str(node) for node in self.global_nodes) + os.linesep
+        for key, value in self.parameters.items():
+            netlist += f'.param {key}={value}{os.linesep}'
+        return netlist + self._str_body()
@@ -0,0 +1,269 @@
+"""
+PVT Corner Runner
+
+Simulates a circuit over the cross product of temperature, supply and
+process-corner axes in one call:
+
+    corners = CornerSweep(circuit,
+                          analyses={'operating_point': {}, 'ac': dict(start_frequency=0.1, stop_frequency=1e9,
+                                                                      number_of_points=50, variation='dec')},
+                          metrics=OpAmpMetrics('vout', reference=2.5),
+                          temperature=[-40, 0, 25, 85, 125],
+                          supplies={'Vdd': [4.5, 5.0, 5.5]},
+                          models=skew_corners('NMOS', 'PMOS'))
+    result = corners.run(jobs=8)
+    result.sel('phase_margin', temperature=125)      # (supply x model) array
+    result.worst('phase_margin')                     # ({'temperature': ..., ...}, value)
+
+Every corner becomes a complete ngspice deck; identical decks are simulated
+once, results are looked up in / stored to the SimulationCache, and the
+remaining decks run on a process pool with one ngspice per worker.
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .cache import SimulationCache, analysis_deck, deck_key
+from .session import simulate_deck
+
+
+def skew_corners(nmos, pmos, vto_shift=0.1, kp_scale=0.1):
+    """
+    Classic five process corners (TT, FF, SS, FS, SF) for one NMOS and one PMOS model
+
+    A fast device has |vto| lower by `vto_shift` volts and kp higher by the
+    fraction `kp_scale`; slow is the opposite. Values are applied relative
+    to the circuit's nominal model parameters.
+
+    Returns:
+        {corner name: {model name: {parameter: callable(nominal)}}}
+    """
+    def skew(speed):
+        return {
+            'vto': lambda vto: float(vto) - speed * vto_shift * float(np.sign(vto)),
+            'kp': lambda kp: float(kp) * (1 + speed * kp_scale),
+        }
+
+    corners = {}
+    for name, n_speed, p_speed in (('tt', 0, 0), ('ff', 1, 1), ('ss', -1, -1), ('fs', 1, -1), ('sf', -1, 1)):
+        corner = {}
+        if n_speed:
+            corner[nmos] = skew(n_speed)
+        if p_speed:
+            corner[pmos] = skew(p_speed)
+        corners[name] = corner
+    return corners
+
+
+class CornerSweep:
+    """Cross product of temperature, supply and model-corner axes for one circuit."""
+
+    def __init__(self, circuit, analyses, metrics, temperature=(25,), supplies=None, models=None,
+                 nominal_temperature=25, options=None, cache=None):
+        """
+        Args:
+            circuit: PySpice Circuit object (restored after every corner)
+            analyses: Analysis name or {name: kwargs}
+            metrics: Callable taking {analysis name: Waveforms} and returning {metric: float}
+            temperature: Temperatures in degrees C
+            supplies: {source name: dc values}; each source is one axis
+            models: {corner name: {model: {parameter: value or callable(nominal)}}}
+            nominal_temperature: Model nominal temperature in degrees C
+            options: Optional dict of simulator `.options`
+            cache: SimulationCache (default: the shared on-disk cache); False disables caching
+        """
+        self.circuit = circuit
+        self.analyses = {analyses: {}} if isinstance(analyses, str) else dict(analyses)
+        self.metrics = metrics
+        self.nominal_temperature = nominal_temperature
+        self.options = options
+        self.cache = SimulationCache() if cache is None else (cache or None)
+
+        self.axes = {'temperature': list(temperature)}
+        for source, values in (supplies or {}).items():
+            self.axes[source] = list(values)
+        self.models = models or {'nominal': {}}
+        self.axes['model'] = list(self.models)
+
+    @property
+    def shape(self):
+        return tuple(len(values) for values in self.axes.values())
+
+    def _deck(self, corner):
+        """Netlist deck for one corner {axis: value}."""
+        circuit = self.circuit
+        saved_sources = {}
+        saved_parameters = []
+        try:
+            for axis, value in corner.items():
+                if axis in ('temperature', 'model'):
+                    continue
+                element = circuit[axis]
+                saved_sources[axis] = element.dc_value
+                element.dc_value = value
+            for model_name, parameters in self.models[corner['model']].items():
+                model = circuit._models[model_name]
+                for parameter, value in parameters.items():
+                    nominal = model._parameters.get(parameter)
+                    if callable(value) and nominal is None:
+                        continue
+                    saved_parameters.append((model, parameter, nominal))
+                    model._parameters[parameter] = value(nominal) if callable(value) else value
+
+            simulator = circuit.simulator(temperature=corner['temperature'],
+                                          nominal_temperature=self.nominal_temperature,
+                                          simulator='ngspice-subprocess')
+            if self.options:
+                simulator.options(**self.options)
+            return analysis_deck(simulator, self.analyses)
+        finally:
+            for axis, value in saved_sources.items():
+                circuit[axis].dc_value = value
+            for model, parameter, nominal in reversed(saved_parameters):
+                if nominal is None:
+                    del model._parameters[parameter]
+                else:
+                    model._parameters[parameter] = nominal
+
+    def corners(self):
+        """All corners as {axis: value} dicts, in C order of the result array."""
+        names = list(self.axes)
+        return [dict(zip(names, values)) for values in itertools.product(*self.axes.values())]
+
+    def decks(self):
+        """
+        Build every corner deck and deduplicate them
+
+        Returns:
+            (unique decks {key: deck}, key of every corner in C order)
+        """
+        unique = {}
+        keys = []
+        for corner in self.corners():
+            deck = self._deck(corner)
+            key = deck_key(deck)
+            unique.setdefault(key, deck)
+            keys.append(key)
+        return unique, keys
+
+    def run(self, jobs=None, progress=False):
+        """
+        Simulate every distinct corner and evaluate the metrics
+
+        Args:
+            jobs: Worker processes (default: CPU count); 1 runs in this process
+            progress: Print how many decks were simulated vs. served from cache
+
+        Returns:
+            CornerResult
+        """
+        unique, keys = self.decks()
+        results = {}
+        pending = []
+        for key, deck in unique.items():
+            cached = self.cache.get_results(key, self.analyses) if self.cache is not None else None
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending.append(key)
+        if progress:
+            print(f"{len(keys)} corners, {len(unique)} distinct decks, "
+                  f"{len(unique) - len(pending)} cached, {len(pending)} to simulate")
+
+        jobs = min(jobs or os.cpu_count() or 1, max(len(pending), 1))
+        decks = [unique[key] for key in pending]
+        if jobs == 1:
+            outcomes = [simulate_deck(deck) for deck in decks]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                outcomes = list(executor.map(simulate_deck, decks))
+        for key, outcome in zip(pending, outcomes):
+            results[key] = outcome
+            if outcome and self.cache is not None:
+                self.cache.put_results(key, outcome)
+
+        rows = {}
+        for key, outcome in results.items():
+            try:
+                rows[key] = self.metrics(outcome) if outcome else None
+            except Exception:
+                rows[key] = None
+        metric_names = []
+        for row in rows.values():
+            for name in row or ():
+                if name not in metric_names:
+                    metric_names.append(name)
+
+        values = np.full((len(keys), len(metric_names)), np.nan)
+        for i, key in enumerate(keys):
+            row = rows.get(key)
+            if row:
+                values[i] = [row.get(name, np.nan) for name in metric_names]
+        return CornerResult(self.axes, metric_names, values.reshape(self.shape + (len(metric_names),)))
+
+
+class CornerResult:
+    """Metrics on a labelled (axis_1 x ... x axis_n x metric) array."""
+
+    def __init__(self, axes, metrics, values):
+        self.axes = dict(axes)
+        self.metrics = list(metrics)
+        self.values = values
+
+    def _index(self, axis, label):
+        labels = self.axes[axis]
+        for i, candidate in enumerate(labels):
+            if candidate == label or str(candidate) == str(label):
+                return i
+        raise KeyError(f"{label!r} is not on axis {axis}")
+
+    def sel(self, metric=None, **labels):
+        """
+        Select by label, e.g. sel('phase_margin', temperature=125, model='ss')
+
+        Returns:
+            Array over the remaining axes (and metrics if `metric` is None)
+        """
+        index = []
+        for axis in self.axes:
+            index.append(self._index(axis, labels.pop(axis)) if axis in labels else slice(None))
+        if labels:
+            raise KeyError(f"Unknown axes: {', '.join(labels)}")
+        index.append(self.metrics.index(metric) if metric is not None else slice(None))
+        return self.values[tuple(index)]
+
+    def worst(self, metric, mode='min'):
+        """
+        Corner with the lowest (mode='min') or highest (mode='max') value of `metric`
+
+        Returns:
+            ({axis: label}, value)
+        """
+        data = self.sel(metric)
+        if np.all(np.isnan(data)):
+            return None, np.nan
+        flat = np.nanargmin(data) if mode == 'min' else np.nanargmax(data)
+        position = np.unravel_index(flat, data.shape)
+        corner = {axis: self.axes[axis][i] for axis, i in zip(self.axes, position)}
+        return corner, data[position]
+
+    def table(self):
+        """Flatten to (corner dicts, values) rows, one per corner."""
+        rows = []
+        flat = self.values.reshape(-1, len(self.metrics))
+        for corner, row in zip(itertools.product(*self.axes.values()), flat):
+            rows.append((dict(zip(self.axes, corner)), dict(zip(self.metrics, row))))
+        return rows
+
+    def format_table(self):
+        """Return every corner and metric as a fixed-width text table."""
+        header = ' '.join(f'{axis:>12s}' for axis in self.axes) + ' ' + \
+            ' '.join(f'{metric:>14s}' for metric in self.metrics)
+        lines = [header, '-' * len(header)]
+        for corner, row in self.table():
+            lines.append(' '.join(f'{str(label):>12s}' for label in corner.values()) + ' ' +
+                         ' '.join(f'{value:14.4g}' for value in row.values()))
+        return '\n'.join(lines)
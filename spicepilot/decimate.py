@@ -0,0 +1,179 @@
+"""
+Plot Decimation
+
+Reduce long waveforms to screen resolution before plotting. The x axis is
+split into one bin per output pixel column (uniform in x for time axes,
+uniform in log10(x) for frequency axes) and the minimum and maximum sample
+of every bin are kept, so spikes, glitches and resonance peaks survive
+while a 1M-sample transient shrinks to a few thousand points.
+
+    x, (vout,) = decimate(time, [vout], bins=2000)
+    index = minmax_indices(frequency, gain_db, bins=1500, log=True)
+
+`lttb()` (largest triangle three buckets) is also available when a single
+smooth trace should keep its visual shape with a fixed point count.
+
+x must be sorted (as simulator abscissas are). The min/max reduction is
+O(samples) NumPy work and the inputs are only read.
+"""
+
+import numpy as np
+
+DEFAULT_BINS = 2000
+
+
+def _bin_starts(x, bins, log):
+    """First sample index of every non-empty bin."""
+    first, last = x[0], x[-1]
+    if log:
+        first, last = np.log10(first), np.log10(last)
+        edges = np.logspace(first, last, bins + 1)
+    else:
+        edges = np.linspace(first, last, bins + 1)
+    starts = np.searchsorted(x, edges[:-1], side='left')
+    return np.unique(starts)
+
+
+def _first_per_segment(hits, segment):
+    """The first of the sorted indices `hits` in every segment."""
+    first = np.ones(len(hits), dtype=bool)
+    first[1:] = segment[hits[1:]] != segment[hits[:-1]]
+    return hits[first]
+
+
+def _segment_extrema(values, starts, counts):
+    """
+    Index of the first minimum and first maximum of every segment
+
+    NaN samples (failed points, masked data) do not hide the finite extrema
+    of their segment: fmin/fmax skip them. The first NaN of each segment is
+    returned as well, so the gap still shows in the plot.
+    """
+    result = []
+    segment = np.repeat(np.arange(len(starts)), counts)
+    for reduce in (np.fmin, np.fmax):
+        extrema = reduce.reduceat(values, starts)
+        hits = np.flatnonzero(values == np.repeat(extrema, counts))
+        result.append(_first_per_segment(hits, segment))
+    missing = np.flatnonzero(np.isnan(values))
+    if missing.size:
+        result.append(_first_per_segment(missing, segment))
+    return result
+
+
+def _unwrapped_phase(rows):
+    """Unwrapped phase of complex rows; a NaN sample does not turn the rest of its row to NaN."""
+    phase = np.angle(rows)
+    finite = np.isfinite(phase)
+    if finite.all():
+        return np.unwrap(phase, axis=-1)
+    for row, mask in zip(phase, finite):
+        row[mask] = np.unwrap(row[mask])
+    return phase
+
+
+def minmax_indices(x, y, bins=DEFAULT_BINS, log=False):
+    """
+    Sample indices that keep the min and max of every bin
+
+    Args:
+        x: Sorted abscissa (samples,)
+        y: Values (samples,) or (traces x samples); complex values are
+            reduced on magnitude and phase
+        bins: Number of bins (about the plot width in pixels)
+        log: Bin uniformly in log10(x) (frequency axes)
+
+    Returns:
+        Sorted unique indices, including the first and last sample and the
+        first NaN of every bin that has one; with 2-D `y` the union over
+        all traces
+    """
+    x = np.asarray(x).real
+    n = len(x)
+    if n <= 2 * bins + 2:
+        return np.arange(n)
+
+    rows = np.asarray(y)
+    if rows.ndim == 1:
+        rows = rows[np.newaxis, :]
+    if np.iscomplexobj(rows):
+        rows = np.concatenate((np.abs(rows), _unwrapped_phase(rows)))
+
+    starts = _bin_starts(x, bins, log)
+    counts = np.diff(np.append(starts, n))
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    for row in rows:
+        for index in _segment_extrema(row, starts, counts):
+            keep[index] = True
+    return np.flatnonzero(keep)
+
+
+def decimate(x, traces, bins=DEFAULT_BINS, log=False):
+    """
+    Decimate several traces that share one abscissa
+
+    Args:
+        x: Sorted abscissa
+        traces: Sequence of arrays or a {label: array} dict
+        bins: Number of bins (about the plot width in pixels)
+        log: Bin uniformly in log10(x)
+
+    Returns:
+        (x, traces) with `traces` in the same container type as given
+    """
+    labels = list(traces) if isinstance(traces, dict) else None
+    arrays = [np.asarray(traces[label]) for label in labels] if labels else [np.asarray(t) for t in traces]
+    if not arrays:
+        return np.asarray(x), traces
+
+    keep = np.zeros(len(x), dtype=bool)
+    for array in arrays:
+        keep[minmax_indices(x, array, bins, log)] = True
+    index = np.flatnonzero(keep)
+
+    x = np.asarray(x)[index]
+    arrays = [array[..., index] for array in arrays]
+    if labels:
+        return x, dict(zip(labels, arrays))
+    return x, arrays
+
+
+def lttb(x, y, points=DEFAULT_BINS, log=False):
+    """
+    Largest-triangle-three-buckets downsampling of one real trace
+
+    Args:
+        x: Sorted abscissa
+        y: Values (samples,)
+        points: Number of output points
+        log: Measure triangle areas in log10(x)
+
+    Returns:
+        Sorted indices of the selected samples
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    xs = np.log10(x) if log else x
+
+    edges = np.linspace(1, n - 1, points - 1).astype(np.int64)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    previous = 0
+    for i in range(points - 2):
+        start, stop = edges[i], edges[i + 1]
+        # Average point of the next bucket (the last sample after the final bucket)
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = xs[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        px, py = xs[previous], y[previous]
+        area = np.abs((px - next_x) * (y[start:stop] - py)
+                      - (px - xs[start:stop]) * (next_y - py))
+        previous = start + int(np.argmax(area))
+        selected[i + 1] = previous
+    return selected
@@ -0,0 +1,233 @@
+"""
+Fork Server
+
+One zygote interpreter imports PySpice, NumPy and matplotlib and loads the
+ngspice shared library once; every script then runs in a fork of it, so a
+job starts in milliseconds instead of paying interpreter and import
+start-up (which dominates the Easy-tier scripts).
+
+    with ForkServer() as server:
+        returncode, timed_out, peak_rss_mb = server.run(
+            {'script': 'rc_filter.py', 'workdir': scratch, 'cpu_time': 60, 'memory_mb': 1024},
+            timeout=60)
+
+The benchmark runner (`--fork-server`) and Sandbox(fork_server=True) use
+it. Children are single-use, as with separate interpreters: each one runs
+spicepilot.sandbox.execute() (limits, log redirection, result file) and
+exits. Needs os.fork, i.e. Linux or macOS.
+
+Protocol: the parent writes one JSON request per line to the zygote's
+stdin ({"id": n, "job": {...}}); the zygote answers on its stdout with
+{"id": n, "pid": ...} when the child starts and {"id": n, "returncode": ...,
+"peak_rss_mb": ...} when it has been reaped.
+"""
+
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from .benchmark import headless_env
+from .sandbox import PREIMPORTS, _preimport, execute
+
+
+# -- Zygote side ------------------------------------------------------------
+
+def _load_ngspice():
+    """Load and initialise the ngspice shared library so children inherit it."""
+    try:
+        from .session import _shared_class
+        _shared_class().new_instance()
+    except Exception:
+        # PySpice declares the API on a module-level FFI before dlopen; a failed
+        # load would make every child fail with "duplicate declaration" instead
+        # of the real error, so start the children from a clean FFI
+        try:
+            from cffi import FFI
+            from PySpice.Spice.NgSpice import Shared
+            Shared.ffi = FFI()
+        except ImportError:
+            pass
+
+
+def _send(message):
+    sys.stdout.write(json.dumps(message) + '\n')
+    sys.stdout.flush()
+
+
+def _child(job):
+    """Body of a forked child: never returns."""
+    code = 1
+    try:
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        code = execute(job)
+    except BaseException:
+        pass
+    finally:
+        os._exit(code if isinstance(code, int) else 1)
+
+
+def _reap(children):
+    """Report every finished child."""
+    while children:
+        try:
+            pid, status, usage = os.wait4(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        scale = 1 if sys.platform == 'darwin' else 1024
+        _send({'id': children.pop(pid), 'returncode': returncode,
+               'peak_rss_mb': usage.ru_maxrss * scale / 2**20})
+
+
+def serve(preimports=PREIMPORTS, ngspice=True):
+    """Zygote main loop: import once, then fork one child per request until stdin closes."""
+    _preimport(preimports)
+    if ngspice:
+        _load_ngspice()
+    _send({'ready': True})
+
+    children = {}
+    stdin = sys.stdin.buffer
+    buffer = b''
+    open_input = True
+    while open_input or children:
+        readable = []
+        if open_input:
+            readable, _, _ = select.select([stdin], [], [], 0.05)
+        else:
+            select.select([], [], [], 0.05)
+        if readable:
+            chunk = os.read(stdin.fileno(), 65536)
+            if not chunk:
+                open_input = False
+            buffer += chunk
+            while b'\n' in buffer:
+                line, buffer = buffer.split(b'\n', 1)
+                request = json.loads(line)
+                sys.stdout.flush()
+                pid = os.fork()
+                if pid == 0:
+                    _child(request['job'])
+                children[pid] = request['id']
+                _send({'id': request['id'], 'pid': pid})
+        _reap(children)
+    return 0
+
+
+# -- Parent side ------------------------------------------------------------
+
+class ForkServer:
+    """Handle on a zygote process; thread-safe."""
+
+    def __init__(self, preimports=PREIMPORTS, ngspice=True, plots=False, max_dpi=None, python=None):
+        """
+        Args:
+            preimports: Modules the zygote imports once
+            ngspice: Load the ngspice shared library in the zygote
+            plots: Let scripts save figures
+            max_dpi: Resolution cap for saved figures
+            python: Interpreter to use (default: the current one)
+        """
+        if not hasattr(os, 'fork'):
+            raise RuntimeError("The fork server needs os.fork (Linux or macOS)")
+        env = headless_env(plots=plots, max_dpi=max_dpi)
+        env.setdefault('OPENBLAS_NUM_THREADS', '1')
+        env.setdefault('OMP_NUM_THREADS', '1')
+        self.process = subprocess.Popen(
+            [python or sys.executable, '-c', 'import sys; from spicepilot.forkserver import serve; '
+                                             f'sys.exit(serve({tuple(preimports)!r}, {bool(ngspice)!r}))'],
+            cwd=tempfile.gettempdir(),
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._started = {}
+        self._finished = {}
+        self._ready = Future()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self):
+        for line in self.process.stdout:
+            message = json.loads(line)
+            if 'ready' in message:
+                self._ready.set_result(True)
+            elif 'pid' in message:
+                self._started[message['id']].set_result(message['pid'])
+            else:
+                self._finished[message['id']].set_result((message['returncode'], message['peak_rss_mb']))
+        # The zygote is gone: fail everything still waiting
+        error = RuntimeError("Fork server exited")
+        for futures in (self._started, self._finished):
+            for future in list(futures.values()):
+                if not future.done():
+                    future.set_exception(error)
+        if not self._ready.done():
+            self._ready.set_exception(error)
+
+    def wait_ready(self, timeout=None):
+        """Block until the zygote has finished its imports."""
+        return self._ready.result(timeout)
+
+    def run(self, job, timeout):
+        """
+        Fork a child for one job and wait for it
+
+        Args:
+            job: {'script', 'workdir', 'cpu_time', 'memory_mb'}, see sandbox.execute()
+            timeout: Wall-time limit in seconds, counted from the fork
+
+        Returns:
+            (returncode, timed_out, peak RSS in MB)
+        """
+        self.wait_ready()
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            started = self._started[request_id] = Future()
+            finished = self._finished[request_id] = Future()
+            self.process.stdin.write((json.dumps({'id': request_id, 'job': job}) + '\n').encode())
+            self.process.stdin.flush()
+        pid = started.result()
+        timed_out = False
+        try:
+            returncode, peak_rss_mb = finished.result(timeout)
+        except TimeoutError:
+            timed_out = True
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            returncode, peak_rss_mb = finished.result()
+        finally:
+            with self._lock:
+                del self._started[request_id], self._finished[request_id]
+        return returncode, timed_out, peak_rss_mb
+
+    def close(self):
+        """Stop accepting jobs; the zygote exits once its children are done."""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+        self._reader.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
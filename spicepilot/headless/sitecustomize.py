@@ -0,0 +1,44 @@
+"""
+Imported automatically by child interpreters that have this folder on
+PYTHONPATH (see spicepilot.benchmark.headless_env). Applies
+SPICEPILOT_PLOTS / SPICEPILOT_MAX_DPI to scripts that call plt.savefig.
+
+Being first on the path, this module hides any other sitecustomize (venv or
+conda hooks, site-wide settings); the next one on sys.path is imported
+afterwards so those still run.
+"""
+
+import importlib.machinery
+import importlib.util
+import os
+import sys
+
+
+def _chain():
+    """Import the sitecustomize this one shadows, if any, in its place."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    path = [entry for entry in sys.path
+            if os.path.abspath(entry or os.curdir) != here]
+    spec = importlib.machinery.PathFinder.find_spec(__name__, path)
+    if spec is None or spec.loader is None:
+        return
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[__name__] = module
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        sys.modules[__name__] = _self
+        raise
+
+
+_self = sys.modules[__name__]
+
+if os.environ.get('SPICEPILOT_PLOTS') or os.environ.get('SPICEPILOT_MAX_DPI'):
+    try:
+        from spicepilot.plotting import install_headless
+    except ImportError:
+        pass
+    else:
+        install_headless()
+
+_chain()
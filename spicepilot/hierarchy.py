@@ -0,0 +1,318 @@
+"""
+Hierarchical Netlists
+
+Generated scripts build repeated cells in two wasteful ways: a SubCircuit
+class registered once per instance (claude_high_1.py defines FF0..FF7, eight
+identical copies of one flip-flop) or Python functions that inline every
+gate into the top level with f-string node names (gpt_high_1.py). Both make
+the netlist, and the time to build it, grow with the total transistor count.
+
+This module keys subcircuit definitions by their structure, so each unique
+cell is emitted once and everything else is an X line:
+
+    hierarchy = Hierarchy(circuit)
+    dff = hierarchy.define('DFF', ('d', 'clk', 'q', 'vdd'), build_dff)
+    hierarchy.array(dff, 'FF', 32, lambda i: (f'q{i - 1}' if i else 'din', 'clk', f'q{i}', 'vdd'))
+    print(format_hierarchy(circuit))
+
+`deduplicate(circuit)` merges identical definitions in an existing circuit
+(FF0..FF7 above become one). `instance_counts()` and `device_counts()` give
+the flattened instance and device totals by multiplying down the hierarchy,
+without expanding it.
+
+The structural key ignores element names and internal node names (internal
+nodes are numbered in order of first use) and treats ports by position;
+element order, values, models and nested subcircuits count. When
+definitions are merged the first one's names survive, so probes into a
+merged copy (v(xff1.master_1)) need the surviving names.
+"""
+
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+
+from PySpice.Spice.Netlist import SubCircuit
+
+GROUND_NAMES = ('0', 'gnd')
+
+
+def ports(subcircuit):
+    """
+    Port names of a subcircuit definition
+
+    A SubCircuit subclass that only sets `__nodes__` (ignored by PySpice,
+    which then writes a `.subckt` line without ports) gets those.
+    """
+    nodes = tuple(str(node) for node in subcircuit.external_nodes)
+    if not nodes:
+        nodes = tuple(str(node) for node in getattr(type(subcircuit), '__nodes__', ()) or ())
+    return nodes
+
+
+def _subcircuits(netlist):
+    """{lowercase name: definition} declared directly in a netlist."""
+    return {str(name).lower(): netlist._subcircuits[name] for name in netlist.subcircuit_names}
+
+
+def _is_instance(element):
+    return type(element).PREFIX == 'X'
+
+
+def structural_key(subcircuit, keys=None):
+    """
+    Hash of a subcircuit definition's structure
+
+    Args:
+        subcircuit: SubCircuit
+        keys: {lowercase subcircuit name: key} used for the X instances
+            inside the definition; nested definitions are keyed on the way
+
+    Returns:
+        Hex digest; equal for definitions that emit the same netlist up to
+        element and internal node names
+    """
+    keys = dict(keys or {})
+    for name, nested in _subcircuits(subcircuit).items():
+        keys[name] = structural_key(nested, keys)
+
+    names = {}
+    for i, port in enumerate(ports(subcircuit)):
+        names.setdefault(port.lower(), f'p{i}')
+
+    def node(name):
+        name = str(name).lower()
+        if name in GROUND_NAMES:
+            return '0'
+        if name not in names:
+            names[name] = f'n{len(names)}'
+        return names[name]
+
+    lines = [f'ports {len(ports(subcircuit))}',
+             ' '.join(f'{key}={value}' for key, value in sorted(subcircuit.parameters.items()))]
+    for element in subcircuit.elements:
+        if not element.enabled:
+            continue
+        pins = [node(pin) for pin in element.nodes]
+        rest = str(element).split()[1 + len(pins):]
+        if _is_instance(element) and rest:
+            rest[0] = keys.get(rest[0].lower(), rest[0])
+        lines.append(' '.join([type(element).PREFIX] + pins + rest))
+    lines.append(subcircuit.raw_spice.strip())
+    lines.extend(sorted(str(model).strip() for model in subcircuit.models))
+    return hashlib.sha1('\n'.join(lines).encode()).hexdigest()
+
+
+def deduplicate(circuit):
+    """
+    Merge structurally identical subcircuit definitions in place
+
+    X instances of a duplicate are pointed at the first identical
+    definition and the duplicate is dropped. Definitions whose ports come
+    from `__nodes__` get them written out (see ports()).
+
+    Returns:
+        {removed name: surviving name}
+    """
+    renamed = {}
+    definitions = _subcircuits(circuit)
+    keys = {}
+    survivors = {}
+    for name, definition in definitions.items():
+        if not definition.external_nodes and ports(definition):
+            definition._external_nodes = ports(definition)
+        key = keys[name] = structural_key(definition, keys)
+        if key in survivors:
+            renamed[str(definition.name)] = str(survivors[key].name)
+        else:
+            survivors[key] = definition
+    if not renamed:
+        return renamed
+
+    lowered = {old.lower(): new for old, new in renamed.items()}
+    for name in list(circuit._subcircuits):
+        if str(name) in renamed:
+            del circuit._subcircuits[name]
+    # Instances at the top level and inside the surviving definitions
+    for netlist in [circuit] + list(survivors.values()):
+        for element in netlist.elements:
+            if _is_instance(element):
+                new = lowered.get(str(element.subcircuit_name).lower())
+                if new is not None:
+                    element._subcircuit_name = new
+    return renamed
+
+
+def instance_counts(circuit):
+    """
+    Flattened number of instances of every subcircuit
+
+    Multiplies instance counts down the hierarchy instead of expanding it.
+
+    Returns:
+        Counter {subcircuit name: instances in the flattened circuit}
+    """
+    definitions = _subcircuits(circuit)
+    local = {name: Counter(str(element.subcircuit_name).lower()
+                           for element in definition.elements if _is_instance(element))
+             for name, definition in definitions.items()}
+    counts = Counter(str(element.subcircuit_name).lower()
+                     for element in circuit.elements if _is_instance(element))
+
+    # Topological order: a definition is expanded after everything that instantiates it
+    order, state = [], {}
+
+    def visit(name):
+        if state.get(name) == 'done':
+            return
+        if state.get(name) == 'visiting':
+            raise ValueError(f"Subcircuit {name} instantiates itself")
+        state[name] = 'visiting'
+        for child in local.get(name, ()):
+            visit(child)
+        state[name] = 'done'
+        order.append(name)
+
+    for name in definitions:
+        visit(name)
+    for name in reversed(order):
+        for child, n in local.get(name, {}).items():
+            counts[child] += counts[name] * n
+
+    return Counter({str(definitions[name].name) if name in definitions else name: n
+                    for name, n in counts.items()})
+
+
+def device_counts(circuit):
+    """
+    Flattened number of leaf devices by SPICE prefix ('M', 'R', 'C', ...)
+
+    Returns:
+        Counter, X instances excluded
+    """
+    definitions = _subcircuits(circuit)
+    totals = Counter(type(element).PREFIX for element in circuit.elements if not _is_instance(element))
+    for name, n in instance_counts(circuit).items():
+        definition = definitions.get(str(name).lower())
+        if definition is None:
+            continue
+        for element in definition.elements:
+            if not _is_instance(element):
+                totals[type(element).PREFIX] += n
+    return totals
+
+
+@dataclass
+class Cell:
+    """One unique subcircuit definition in a Hierarchy."""
+    name: str
+    ports: tuple
+    key: str
+    subcircuit: SubCircuit
+
+
+class Hierarchy:
+    """Builds a circuit from cells, emitting each unique definition once."""
+
+    def __init__(self, circuit):
+        """
+        Args:
+            circuit: Circuit to add definitions and instances to; its
+                existing subcircuits are registered as cells
+        """
+        self.circuit = circuit
+        self.cells = {}     # structural key -> Cell
+        self._names = {}    # lowercase name -> Cell
+        for definition in _subcircuits(circuit).values():
+            self._register(definition)
+
+    def _register(self, subcircuit):
+        keys = {name: cell.key for name, cell in self._names.items()}
+        key = structural_key(subcircuit, keys)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = Cell(str(subcircuit.name), ports(subcircuit), key, subcircuit)
+        self._names.setdefault(str(subcircuit.name).lower(), cell)
+        return cell
+
+    def add(self, subcircuit):
+        """
+        Register a SubCircuit definition
+
+        Returns:
+            The Cell of an identical existing definition, or a new Cell
+            whose definition has been added to the circuit
+        """
+        name = str(subcircuit.name).lower()
+        existing = self._names.get(name)
+        if existing is not None:
+            if existing.key != structural_key(subcircuit, {n: c.key for n, c in self._names.items()}):
+                raise ValueError(f"Subcircuit {subcircuit.name} is already defined differently")
+            return existing
+        if not subcircuit.external_nodes and ports(subcircuit):
+            subcircuit._external_nodes = ports(subcircuit)
+        known = len(self.cells)
+        cell = self._register(subcircuit)
+        if len(self.cells) > known:
+            self.circuit.subcircuit(subcircuit)
+        return cell
+
+    def define(self, name, ports, build, **parameters):
+        """
+        Build and register a cell
+
+        Args:
+            name: Subcircuit name
+            ports: Port node names
+            build: Called with the new SubCircuit to add its elements
+                (instances of other cells use their `.name`)
+            parameters: Subcircuit parameters (`.subckt ... w=1u`)
+
+        Returns:
+            Cell (an existing one if the structure is already defined)
+        """
+        subcircuit = SubCircuit(name, *ports, **parameters)
+        build(subcircuit)
+        return self.add(subcircuit)
+
+    def instance(self, cell, name, *nodes, **parameters):
+        """Add one X instance of a cell to the circuit."""
+        if len(nodes) != len(cell.ports):
+            raise ValueError(f"{cell.name} has {len(cell.ports)} ports, got {len(nodes)} nodes")
+        return self.circuit.X(name, cell.name, *nodes, **parameters)
+
+    def array(self, cell, prefix, count, nodes, **parameters):
+        """
+        Add `count` instances of a cell named prefix0, prefix1, ...
+
+        Args:
+            nodes: Function of the index returning the instance's nodes
+
+        Returns:
+            List of the X elements
+        """
+        return [self.instance(cell, f'{prefix}{i}', *nodes(i), **parameters) for i in range(count)]
+
+    def counts(self):
+        """Flattened instance count of every cell, see instance_counts()."""
+        return instance_counts(self.circuit)
+
+    def device_counts(self):
+        """Flattened device count by prefix, see device_counts()."""
+        return device_counts(self.circuit)
+
+
+def format_hierarchy(circuit):
+    """Return one line per subcircuit: ports, local devices, instances and flattened devices."""
+    definitions = _subcircuits(circuit)
+    counts = instance_counts(circuit)
+    header = f"{'Subcircuit':20s} {'Ports':>5s} {'Devices':>8s} {'Instances':>10s} {'Flattened':>10s}"
+    lines = [header, '-' * len(header)]
+    for definition in definitions.values():
+        local = sum(not _is_instance(element) for element in definition.elements)
+        n = counts.get(str(definition.name), 0)
+        lines.append(f"{str(definition.name):20s} {len(ports(definition)):5d} {local:8d} {n:10d} {local * n:10d}")
+    lines.append('-' * len(header))
+    totals = device_counts(circuit)
+    lines.append(f"{len(definitions)} unique subcircuit(s), {sum(totals.values())} devices flattened ("
+                 + ', '.join(f'{prefix}: {n}' for prefix, n in sorted(totals.items())) + ')')
+    return '\n'.join(lines)
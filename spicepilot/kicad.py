@@ -0,0 +1,308 @@
+"""
+KiCad Netlist Export
+
+Streaming PySpice -> KiCad 9.0 .cir exporter. The netlist is produced line
+by line from the Circuit's elements, models and subcircuits and written
+through a buffered file handle, so memory stays flat even for flattened
+netlists with hundreds of thousands of elements (no `str(circuit)`, no
+line lists, no final join).
+
+Simulation commands are added to existing .cir files in place: the file is
+scanned backwards for the final standalone `.end` line and the new block is
+written at that offset, leaving `.endc` / `.ends` lines and the rest of the
+file untouched.
+
+Usage:
+    write_kicad(circuit, 'opamp_kicad.cir')
+    add_simulation_commands('opamp_kicad.cir', ['ac', 'tran'])
+"""
+
+import io
+import os
+
+SECTION_RULE = "* ============================================"
+
+DEFAULT_BUFFER_SIZE = 1 << 20   # 1 MiB
+
+SIMULATION_COMMANDS = {
+    'ac': [
+        "* AC Analysis (Frequency Response)",
+        ".ac dec 100 0.1 1G",
+        "",
+        ".control",
+        "ac dec 100 0.1 1G",
+        "plot vdb(vout) title 'Frequency Response (Gain)'",
+        "plot vp(vout) title 'Frequency Response (Phase)'",
+        ".endc"
+    ],
+    'tran': [
+        "* Transient Analysis (Time Domain)",
+        ".tran 1n 10u",
+        "",
+        ".control",
+        "tran 1n 10u",
+        "plot v(vout) v(vin_p) title 'Transient Response'",
+        ".endc"
+    ],
+    'dc': [
+        "* DC Sweep Analysis",
+        ".dc Vin_p 0 5 0.01",
+        "",
+        ".control",
+        "dc Vin_p 0 5 0.01",
+        "plot v(vout) title 'DC Transfer Characteristic'",
+        ".endc"
+    ],
+    'all': [
+        "* Operating Point",
+        ".op",
+        "",
+        "* AC Analysis",
+        ".ac dec 100 0.1 1G",
+        "",
+        "* Transient Analysis",
+        ".tran 1n 10u",
+        "",
+        ".control",
+        "op",
+        "print all",
+        "ac dec 100 0.1 1G",
+        "plot vdb(vout)",
+        "plot vp(vout)",
+        "tran 1n 10u",
+        "plot v(vout)",
+        ".endc"
+    ]
+}
+
+SCAN_CHUNK_SIZE = 1 << 16
+
+
+def _section(title):
+    yield SECTION_RULE
+    yield f"* {title}"
+    yield SECTION_RULE
+
+
+def _split(text):
+    """Yield the non-empty lines of a short PySpice snippet."""
+    for line in text.splitlines():
+        if line.strip():
+            yield line
+
+
+def iter_subcircuit_lines(subcircuit):
+    """Yield a .subckt ... .ends definition, nested definitions first."""
+    nodes = ' '.join(str(node) for node in subcircuit.external_nodes)
+    parameters = ' '.join(f'{key}={value}' for key, value in subcircuit._parameters.items())
+    yield ' '.join(part for part in ('.subckt', subcircuit.name, nodes, parameters) if part)
+    yield from iter_netlist_lines(subcircuit)
+    yield f'.ends {subcircuit.name}'
+
+
+def iter_netlist_lines(netlist):
+    """
+    Yield the body of a PySpice Netlist (Circuit or SubCircuit) line by line
+
+    Order matches PySpice: raw SPICE, subcircuits, elements, models.
+    """
+    yield from _split(netlist.raw_spice or '')
+    for subcircuit in netlist.subcircuits:
+        yield from iter_subcircuit_lines(subcircuit)
+    for element in netlist.elements:
+        if element.enabled:
+            yield str(element)
+    for model in netlist.models:
+        yield str(model)
+
+
+def iter_kicad_lines(circuit, include_controls=True):
+    """
+    Yield a KiCad-compatible SPICE netlist for `circuit`, one line at a time
+
+    Args:
+        circuit: PySpice Circuit object
+        include_controls: Include the ngspice .control block
+    """
+    yield f"* {circuit.title}"
+    yield "* KiCad 9.0 Compatible Netlist"
+    yield "* Converted from PySpice"
+    yield ""
+    yield f".title {circuit.title}"
+    yield ""
+
+    # .include / .lib / .global / .param are a handful of lines each
+    yield from _split(circuit._str_includes())
+    yield from _split(circuit._str_libs())
+    yield from _split(circuit._str_globals())
+    yield from _split(circuit._str_parameters())
+    yield from _split(circuit.raw_spice or '')
+
+    subcircuits = iter(circuit.subcircuits)
+    first = next(subcircuits, None)
+    if first is not None:
+        yield from _section("SUBCIRCUITS")
+        for subcircuit in (first, *subcircuits):
+            yield ""
+            yield from iter_subcircuit_lines(subcircuit)
+        yield ""
+
+    elements = (element for element in circuit.elements if element.enabled)
+    first = next(elements, None)
+    if first is not None:
+        yield from _section("CIRCUIT COMPONENTS")
+        yield ""
+        yield str(first)
+        for element in elements:
+            yield str(element)
+        yield ""
+
+    models = iter(circuit.models)
+    first = next(models, None)
+    if first is not None:
+        yield from _section("TRANSISTOR MODELS")
+        for model in (first, *models):
+            yield ""
+            yield str(model)
+        yield ""
+
+    yield from _section("SIMULATION COMMANDS")
+    yield ""
+    yield "* Operating Point Analysis"
+    yield ".op"
+    yield ""
+    yield "* AC Analysis (Bode Plot)"
+    yield "* Uncomment to run:"
+    yield "*.ac dec 100 0.1 1G"
+    yield ""
+    yield "* Transient Analysis"
+    yield "* Uncomment to run:"
+    yield "*.tran 1n 10u"
+    yield ""
+
+    if include_controls:
+        yield "* ngspice control commands"
+        yield ".control"
+        yield "op"
+        yield "print all"
+        yield ""
+        yield "* Uncomment for AC analysis:"
+        yield "*ac dec 100 0.1 1G"
+        yield "*plot vdb(vout)"
+        yield "*plot vp(vout)"
+        yield ".endc"
+        yield ""
+
+    yield ".end"
+
+
+def write_lines(lines, output, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Write an iterable of lines to a path or an open text file
+
+    Returns:
+        Number of lines written
+    """
+    if isinstance(output, io.TextIOBase):
+        return _write_lines(lines, output)
+    with open(output, 'w', buffering=buffer_size, newline='\n') as f:
+        return _write_lines(lines, f)
+
+
+def _write_lines(lines, f):
+    count = 0
+    write = f.write
+    for line in lines:
+        write(line)
+        write('\n')
+        count += 1
+    return count
+
+
+def write_kicad(circuit, output_file, include_controls=True, buffer_size=DEFAULT_BUFFER_SIZE):
+    """
+    Stream a KiCad-compatible .cir netlist for `circuit` to `output_file`
+
+    Args:
+        circuit: PySpice Circuit object
+        output_file: Path (or open text file) to write
+        include_controls: Include the ngspice .control block
+        buffer_size: Write buffer size in bytes
+
+    Returns:
+        Number of lines written
+    """
+    return write_lines(iter_kicad_lines(circuit, include_controls), output_file, buffer_size)
+
+
+def find_final_end(f, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Byte offset of the last standalone `.end` line in a binary file
+
+    The file is read backwards in chunks, so only the tail is touched when
+    `.end` sits near the end (the usual case).
+
+    Returns:
+        Offset of the start of the `.end` line, or None if there is none
+    """
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    pending = b''
+    while position > 0:
+        size = min(chunk_size, position)
+        position -= size
+        f.seek(position)
+        block = f.read(size) + pending
+        lines = block.split(b'\n')
+        # The first piece may continue in the previous chunk
+        if position > 0:
+            pending = lines[0]
+            lines = lines[1:]
+        end = position + len(block)
+        for line in reversed(lines):
+            start = end - len(line)
+            if line.strip().lower() == b'.end':
+                return start
+            end = start - 1
+    return None
+
+
+def _command_block(sim_types):
+    if isinstance(sim_types, str):
+        sim_types = [sim_types]
+    blocks = ['\n'.join(SIMULATION_COMMANDS.get(sim_type, SIMULATION_COMMANDS['all']))
+              for sim_type in sim_types]
+    return '\n\n'.join(blocks).encode('utf-8')
+
+
+def _inject(cir_file, block, chunk_size):
+    with open(cir_file, 'r+b') as f:
+        offset = find_final_end(f, chunk_size)
+        if offset is None:
+            f.seek(0, os.SEEK_END)
+            f.write(b'\n\n' + block + b'\n\n.end\n')
+            return
+        f.seek(offset)
+        tail = f.read()
+        f.seek(offset)
+        f.write(block + b'\n\n' + tail)
+
+
+def add_simulation_commands(cir_files, sim_types='ac', chunk_size=SCAN_CHUNK_SIZE):
+    """
+    Insert simulation commands before the final `.end` of one or more .cir files
+
+    Each file is patched in place: only the bytes from the final `.end`
+    onwards are rewritten. Several analysis types are combined into one
+    write per file.
+
+    Args:
+        cir_files: Path or list of paths
+        sim_types: 'ac', 'tran', 'dc', 'all' (unknown names use 'all'), or a list of them
+        chunk_size: Backward scan chunk size in bytes
+    """
+    if isinstance(cir_files, (str, os.PathLike)):
+        cir_files = [cir_files]
+    block = _command_block(sim_types)
+    for cir_file in cir_files:
+        _inject(cir_file, block, chunk_size)
@@ -0,0 +1,283 @@
+"""
+Static Netlist Linter
+
+Checks a PySpice Circuit for the mistakes that otherwise only show up as
+"singular matrix" or "timestep too small" after ngspice has started, in
+one linear pass over the elements (union-find over the nodes):
+
+    issues = lint(circuit)
+    if has_errors(issues):
+        print(format_issues(issues))
+
+Checks:
+    no-dc-path            nodes with no DC path to ground (only capacitors,
+                          current sources or MOSFET gates attached)
+    voltage-loop          loops of voltage sources and inductors
+    dangling              nodes that only one element pin touches
+    shorted               two-terminal elements with both pins on one node
+    undefined-model       devices whose model is not defined
+    undefined-subcircuit  X instances of unknown subcircuits
+    pin-count             X instances whose node count does not match the
+                          subcircuit's port list (e.g. a SubCircuit subclass
+                          that sets `__nodes__`, which PySpice ignores)
+
+Subcircuit definitions are analysed once each and summarised by which of
+their ports are DC-connected to each other or to ground, so instances cost
+one union per port. This is a screen for the usual failure modes, not a
+full topological proof: voltage loops that pass through subcircuit ports
+are not followed.
+"""
+
+from dataclasses import dataclass
+
+ERROR = 'error'
+WARNING = 'warning'
+
+GROUND_NAMES = ('0', 'gnd')
+
+# Element class name -> pins that conduct at DC (one group) and the
+# pin pair that fixes a voltage. Classes not listed are treated as
+# conducting between all pins, which can hide problems but never
+# reports false ones.
+OPEN = ((), None)
+CONDUCTS = (((0, 1),), None)
+FIXES_VOLTAGE = (((0, 1),), (0, 1))
+DC_BEHAVIOUR = {
+    'Resistor': CONDUCTS,
+    'SemiconductorResistor': CONDUCTS,
+    'BehavioralResistor': CONDUCTS,
+    'Diode': CONDUCTS,
+    'VoltageControlledSwitch': CONDUCTS,
+    'CurrentControlledSwitch': CONDUCTS,
+    'Capacitor': OPEN,
+    'SemiconductorCapacitor': OPEN,
+    'BehavioralCapacitor': OPEN,
+    'CurrentSource': OPEN,
+    'VoltageControlledCurrentSource': OPEN,
+    'CurrentControlledCurrentSource': OPEN,
+    'NonLinearCurrentSource': OPEN,
+    'CoupledInductor': OPEN,
+    'Inductor': FIXES_VOLTAGE,
+    'BehavioralInductor': FIXES_VOLTAGE,
+    'VoltageSource': FIXES_VOLTAGE,
+    'VoltageControlledVoltageSource': FIXES_VOLTAGE,
+    'CurrentControlledVoltageSource': FIXES_VOLTAGE,
+    'NonLinearVoltageSource': FIXES_VOLTAGE,
+    # Drain, source and bulk are joined by the channel and the junctions
+    'Mosfet': (((0, 2, 3),), None),
+}
+
+TWO_TERMINAL = ('Resistor', 'Capacitor', 'Inductor', 'Diode', 'VoltageSource', 'CurrentSource')
+
+
+@dataclass
+class Issue:
+    """One problem found by lint()."""
+    severity: str          # 'error' or 'warning'
+    check: str             # e.g. 'no-dc-path'
+    message: str
+    element: str = ''
+    node: str = ''
+    scope: str = ''        # subcircuit name, '' for the top level
+
+    def __str__(self):
+        scope = f'[{self.scope}] ' if self.scope else ''
+        return f'{self.severity.upper():7s} {self.check:20s} {scope}{self.message}'
+
+
+class _Nodes:
+    """Union-find over node names, ground at index 0."""
+
+    def __init__(self):
+        self.index = {}
+        self.names = []
+        self.parent = []
+        self.ground = self.add('0')
+
+    def add(self, name):
+        name = str(name).lower()
+        if name in GROUND_NAMES:
+            name = '0'
+        i = self.index.get(name)
+        if i is None:
+            i = self.index[name] = len(self.names)
+            self.names.append(name)
+            self.parent.append(i)
+        return i
+
+    def find(self, i):
+        parent = self.parent
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    def union(self, a, b):
+        """Join two sets; False if they were already joined."""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return False
+        self.parent[b] = a
+        return True
+
+
+def _class_names(element):
+    return [cls.__name__ for cls in type(element).__mro__]
+
+
+def _behaviour(element, subcircuit_summaries):
+    """(conducting pin groups, voltage-fixing pin pair or None) of one element."""
+    names = _class_names(element)
+    if 'SubCircuitElement' in names:
+        summary = subcircuit_summaries.get(str(element.subcircuit_name).lower())
+        if summary is None:
+            return ((tuple(range(len(element.nodes))),), None)
+        return summary, None
+    if 'BehavioralSource' in names:
+        if getattr(element, 'voltage_expression', None) is not None:
+            return FIXES_VOLTAGE
+        return OPEN
+    for name in names:
+        if name in DC_BEHAVIOUR:
+            return DC_BEHAVIOUR[name]
+    return ((tuple(range(len(element.nodes))),), None)
+
+
+def _model_names(netlist):
+    return {str(name).lower() for name in netlist.model_names}
+
+
+def _lint_netlist(netlist, scope, ports, models, includes, subcircuits, summaries, issues):
+    """
+    Check one netlist (the circuit or a subcircuit body)
+
+    Returns:
+        Port groups: tuple of port-index tuples that are DC-connected,
+        with ground represented by the index len(ports)
+    """
+    nodes = _Nodes()
+    voltage = _Nodes()
+    connections = {}
+    for port in ports:
+        i = nodes.add(port)
+        voltage.add(port)
+        # The port connects to whatever instantiates the subcircuit
+        connections[i] = connections.get(i, 0) + 1
+
+    for element in netlist.elements:
+        pins = [nodes.add(node) for node in element.nodes]
+        for pin in pins:
+            voltage.add(nodes.names[pin])
+            connections[pin] = connections.get(pin, 0) + 1
+        names = _class_names(element)
+
+        if 'SubCircuitElement' in names:
+            subcircuit_name = str(element.subcircuit_name).lower()
+            definition = subcircuits.get(subcircuit_name)
+            if definition is None:
+                issues.append(Issue(ERROR, 'undefined-subcircuit',
+                                    f'{element.name} instantiates unknown subcircuit {element.subcircuit_name}',
+                                    element=element.name, scope=scope))
+            elif len(definition.external_nodes) != len(pins):
+                issues.append(Issue(ERROR, 'pin-count',
+                                    f'{element.name} connects {len(pins)} nodes but subcircuit '
+                                    f'{element.subcircuit_name} has {len(definition.external_nodes)} ports',
+                                    element=element.name, scope=scope))
+        else:
+            model = getattr(element, 'model', None)
+            if model is not None and str(model).lower() not in models:
+                issues.append(Issue(WARNING if includes else ERROR, 'undefined-model',
+                                    f'{element.name} uses model {model}, which is not defined'
+                                    + (' (it may come from an .include/.lib)' if includes else ''),
+                                    element=element.name, scope=scope))
+
+        if len(pins) == 2 and len(set(pins)) == 1 and any(name in TWO_TERMINAL for name in names):
+            issues.append(Issue(WARNING, 'shorted', f'{element.name} has both pins on node {nodes.names[pins[0]]}',
+                                element=element.name, node=nodes.names[pins[0]], scope=scope))
+
+        groups, fixed = _behaviour(element, summaries)
+        ground_index = len(pins)
+        for group in groups:
+            members = [pins[i] if i < ground_index else nodes.ground for i in group if i <= ground_index]
+            for other in members[1:]:
+                nodes.union(members[0], other)
+        if fixed is not None:
+            a, b = (voltage.index[nodes.names[pins[i]]] for i in fixed)
+            if not voltage.union(a, b):
+                issues.append(Issue(ERROR, 'voltage-loop',
+                                    f'{element.name} closes a loop of voltage sources/inductors '
+                                    f'between {nodes.names[pins[fixed[0]]]} and {nodes.names[pins[fixed[1]]]}',
+                                    element=element.name, scope=scope))
+
+    for i, count in connections.items():
+        if count == 1 and i != nodes.ground:
+            issues.append(Issue(WARNING, 'dangling', f'node {nodes.names[i]} is connected to a single pin',
+                                node=nodes.names[i], scope=scope))
+
+    # Components that reach neither ground nor (inside a subcircuit) a port; ports are
+    # looked up with add() so that one called GND maps to ground like the element pins
+    anchored = {nodes.find(nodes.ground)} | {nodes.find(nodes.add(port)) for port in ports}
+    floating = {}
+    for i, name in enumerate(nodes.names):
+        root = nodes.find(i)
+        if root not in anchored:
+            floating.setdefault(root, []).append(name)
+    for members in floating.values():
+        shown = ', '.join(members[:8]) + (f' (+{len(members) - 8} more)' if len(members) > 8 else '')
+        issues.append(Issue(ERROR, 'no-dc-path', f'no DC path to ground from {shown}',
+                            node=members[0], scope=scope))
+
+    groups = {}
+    for k, port in enumerate(ports):
+        groups.setdefault(nodes.find(nodes.add(port)), []).append(k)
+    ground_root = nodes.find(nodes.ground)
+    groups.setdefault(ground_root, []).append(len(ports))
+    return tuple(tuple(group) for group in groups.values() if len(group) > 1)
+
+
+def lint(circuit):
+    """
+    Statically check a PySpice Circuit
+
+    Returns:
+        List of Issue, errors first
+    """
+    issues = []
+    includes = bool(getattr(circuit, '_includes', None) or getattr(circuit, '_libs', None))
+    top_models = _model_names(circuit)
+
+    subcircuits = {str(name).lower(): circuit._subcircuits[name] for name in circuit.subcircuit_names}
+    summaries = {}
+    # Definitions are summarised before use; nested definitions are linted inside their parent
+    pending = list(subcircuits.items())
+    while pending:
+        name, definition = pending.pop(0)
+        nested = {str(n).lower(): definition._subcircuits[n] for n in definition.subcircuit_names}
+        if any(n not in summaries for n in nested):
+            pending = list(nested.items()) + [(name, definition)] + pending
+            subcircuits.update(nested)
+            continue
+        summaries[name] = _lint_netlist(definition, definition.name, list(definition.external_nodes),
+                                        top_models | _model_names(definition), includes,
+                                        {**subcircuits, **nested}, summaries, issues)
+
+    _lint_netlist(circuit, '', [], top_models, includes, subcircuits, summaries, issues)
+    issues.sort(key=lambda issue: issue.severity != ERROR)
+    return issues
+
+
+def has_errors(issues):
+    """True if any issue would make the simulation fail."""
+    return any(issue.severity == ERROR for issue in issues)
+
+
+def format_issues(issues):
+    """Return the issues as text, one per line."""
+    if not issues:
+        return 'No issues found'
+    lines = [str(issue) for issue in issues]
+    errors = sum(issue.severity == ERROR for issue in issues)
+    lines.append(f'{errors} error(s), {len(issues) - errors} warning(s)')
+    return '\n'.join(lines)
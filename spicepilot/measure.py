@@ -0,0 +1,222 @@
+"""
+Timing Measurements
+
+Vectorized threshold crossings, rise/fall time, propagation delay, period
+and duty cycle for transient waveforms. Replaces the per-sample
+`find_edges` / `find_crossings` / `analyze_timing` loops in the generated
+scripts.
+
+Every function takes a time vector `t` and either one waveform (1-D) or a
+(nodes x samples) matrix, e.g. `as_waveforms(analysis).matrix(['q0', 'q1'])`.
+1-D input returns one array; 2-D input returns a list with one array per
+row. Crossing times are linearly interpolated between samples.
+"""
+
+import numpy as np
+
+RISING = 'rising'
+FALLING = 'falling'
+BOTH = 'both'
+
+
+def _levels(y, fraction):
+    """Per-row level at `fraction` of the swing between min and max."""
+    low = y.min(axis=-1, keepdims=True)
+    high = y.max(axis=-1, keepdims=True)
+    return low + fraction * (high - low)
+
+
+def _crossings_2d(t, y, threshold, direction):
+    """Crossing times of every row of `y`, as a list of arrays."""
+    if threshold is None:
+        threshold = _levels(y, 0.5)
+    threshold = np.asarray(threshold, dtype=np.float64)
+    threshold = np.broadcast_to(threshold.reshape(-1, 1), (y.shape[0], 1))
+
+    above = y > threshold
+    step = np.diff(above.astype(np.int8), axis=-1)
+    if direction == RISING:
+        mask = step > 0
+    elif direction == FALLING:
+        mask = step < 0
+    elif direction == BOTH:
+        mask = step != 0
+    else:
+        raise ValueError(f"direction must be '{RISING}', '{FALLING}' or '{BOTH}'")
+
+    rows, index = np.nonzero(mask)
+    y0 = y[rows, index]
+    y1 = y[rows, index + 1]
+    t0 = t[index]
+    t1 = t[index + 1]
+    level = threshold[rows, 0]
+    times = t0 + (level - y0) * (t1 - t0) / (y1 - y0)
+
+    bounds = np.searchsorted(rows, np.arange(1, y.shape[0]))
+    return np.split(times, bounds)
+
+
+def _as_2d(y):
+    y = np.asarray(y, dtype=np.float64)
+    if y.ndim == 1:
+        return y[np.newaxis, :], True
+    if y.ndim == 2:
+        return y, False
+    raise ValueError("Waveforms must be 1-D or (nodes x samples)")
+
+
+def crossings(t, y, threshold=None, direction=BOTH):
+    """
+    Interpolated times where `y` crosses `threshold`
+
+    Args:
+        t: Time vector (samples,)
+        y: Waveform (samples,) or matrix (nodes x samples)
+        threshold: Level (scalar or one per row); default is mid-swing of each row
+        direction: 'rising', 'falling' or 'both'
+
+    Returns:
+        Array of crossing times, or a list of arrays for 2-D input
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y, single = _as_2d(y)
+    result = _crossings_2d(t, y, threshold, direction)
+    return result[0] if single else result
+
+
+def _transition_times(t, y, low, high, v_low, v_high, rising):
+    y, single = _as_2d(y)
+    start_level = _levels(y, low) if v_low is None else np.full((y.shape[0], 1), v_low, dtype=np.float64)
+    end_level = _levels(y, high) if v_high is None else np.full((y.shape[0], 1), v_high, dtype=np.float64)
+    if not rising:
+        start_level, end_level = end_level, start_level
+    direction = RISING if rising else FALLING
+
+    t = np.asarray(t, dtype=np.float64)
+    starts = _crossings_2d(t, y, start_level, direction)
+    ends = _crossings_2d(t, y, end_level, direction)
+
+    result = []
+    for start, end in zip(starts, ends):
+        # Pair each end crossing with the latest start crossing before it
+        index = np.searchsorted(start, end, side='right') - 1
+        valid = index >= 0
+        durations = end[valid] - start[index[valid]]
+        # Drop pairs where another end crossing sits between start and end
+        if durations.size:
+            previous_end = np.concatenate(([-np.inf], end[valid][:-1]))
+            durations = durations[start[index[valid]] > previous_end]
+        result.append(durations)
+    return result[0] if single else result
+
+
+def rise_time(t, y, low=0.1, high=0.9, v_low=None, v_high=None):
+    """
+    Rise time of every rising edge (default 10% to 90% of the swing)
+
+    Args:
+        t: Time vector
+        y: Waveform or (nodes x samples) matrix
+        low, high: Fractions of the swing that define the edge
+        v_low, v_high: Absolute levels, overriding the fractions
+
+    Returns:
+        Array of rise times, or a list of arrays for 2-D input
+    """
+    return _transition_times(t, y, low, high, v_low, v_high, rising=True)
+
+
+def fall_time(t, y, low=0.1, high=0.9, v_low=None, v_high=None):
+    """Fall time of every falling edge (default 90% to 10% of the swing), see rise_time()."""
+    return _transition_times(t, y, low, high, v_low, v_high, rising=False)
+
+
+def propagation_delay(t, vin, vout, threshold=None, input_edge=BOTH, output_edge=BOTH,
+                      output_threshold=None):
+    """
+    Delay from each input edge to the first following output edge
+
+    Input and output edges are paired with a sorted searchsorted, so the cost
+    is linear in the number of samples. Input edges with no output response
+    before the next input edge are dropped.
+
+    Args:
+        t: Time vector
+        vin: Input waveform (samples,)
+        vout: Output waveform (samples,) or matrix (nodes x samples)
+        threshold: Input threshold (default: mid-swing of vin)
+        input_edge: 'rising', 'falling' or 'both'
+        output_edge: 'rising', 'falling' or 'both'
+        output_threshold: Output threshold (default: same as `threshold`, or mid-swing)
+
+    Returns:
+        Array of delays, or a list of arrays for 2-D `vout`
+    """
+    t = np.asarray(t, dtype=np.float64)
+    tin = crossings(t, vin, threshold, input_edge)
+    if output_threshold is None:
+        output_threshold = threshold
+    vout, single = _as_2d(vout)
+    touts = _crossings_2d(t, vout, output_threshold, output_edge)
+
+    next_input = np.append(tin[1:], np.inf)
+    result = []
+    for tout in touts:
+        index = np.searchsorted(tout, tin, side='left')
+        valid = index < len(tout)
+        matched = tout[index[valid]]
+        delays = matched - tin[valid]
+        result.append(delays[matched < next_input[valid]])
+    return result[0] if single else result
+
+
+def period(t, y, threshold=None):
+    """
+    Period of every full cycle, measured between consecutive rising crossings
+
+    Returns:
+        Array of periods, or a list of arrays for 2-D input
+    """
+    edges = crossings(t, y, threshold, RISING)
+    if isinstance(edges, list):
+        return [np.diff(e) for e in edges]
+    return np.diff(edges)
+
+
+def frequency(t, y, threshold=None):
+    """Mean oscillation frequency (NaN if fewer than two rising crossings)."""
+    periods = period(t, y, threshold)
+
+    def mean_frequency(p):
+        return 1.0 / p.mean() if p.size else np.nan
+
+    if isinstance(periods, list):
+        return np.array([mean_frequency(p) for p in periods])
+    return mean_frequency(periods)
+
+
+def duty_cycle(t, y, threshold=None):
+    """
+    High-time fraction of every full cycle (rising edge to next rising edge)
+
+    Returns:
+        Array of duty cycles, or a list of arrays for 2-D input
+    """
+    t = np.asarray(t, dtype=np.float64)
+    y, single = _as_2d(y)
+    if threshold is None:
+        threshold = _levels(y, 0.5)
+    rises = _crossings_2d(t, y, threshold, RISING)
+    falls = _crossings_2d(t, y, threshold, FALLING)
+
+    result = []
+    for rise, fall in zip(rises, falls):
+        if rise.size < 2:
+            result.append(np.empty(0))
+            continue
+        index = np.searchsorted(fall, rise[:-1], side='right')
+        valid = index < len(fall)
+        high = fall[index[valid]] - rise[:-1][valid]
+        cycle = np.diff(rise)[valid]
+        result.append(np.where(high < cycle, high / cycle, np.nan))
+    return result[0] if single else result
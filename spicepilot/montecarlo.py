@@ -0,0 +1,412 @@
+"""
+Monte Carlo Mismatch Analysis
+
+Samples model parameters (global process spread) and per-device parameters
+(mismatch, e.g. on the M2/M3 differential pair) from declared
+distributions, simulates every sample and collects metric distributions.
+
+Each worker process loads the netlist into its own ngspice once. Samples
+are then applied with `altermod` / `alter` and re-run on the loaded
+circuit, so no netlist is re-generated or re-parsed per sample. Mismatch
+on a model parameter (vto, kp, ...) gives the device its own copy of the
+model in the netlist, which is altered independently.
+
+    mc = MonteCarlo(circuit,
+                    [Process('NMOS', 'vto', Normal(0.02)),
+                     Mismatch('M2', 'vto', Normal(0.005)),
+                     Mismatch('M3', 'vto', Normal(0.005))],
+                    analyses={'operating_point': {}, 'ac': dict(start_frequency=1, stop_frequency=1e9,
+                                                                number_of_points=20, variation='dec')},
+                    metrics=OpAmpMetrics('vout', reference=2.5))
+    result = mc.simulate(10000, seed=1, jobs=8)
+    print(result.format_summary())
+
+Results arrive chunk by chunk (`mc.iter_chunks(...)`), so long runs can
+report distributions while they are still running.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+
+import numpy as np
+
+from .ac_metrics import ac_metrics
+from .cache import analysis_deck
+from .netlist import find_element
+from .session import read_plot
+
+
+@dataclass
+class Normal:
+    """Gaussian spread around the nominal value."""
+    sigma: float
+    relative: bool = False     # sigma is a fraction of the nominal value
+
+    def sample(self, rng, nominal, size):
+        scale = self.sigma * (abs(nominal) if self.relative else 1.0)
+        return nominal + scale * rng.standard_normal(size)
+
+
+@dataclass
+class Uniform:
+    """Uniform spread of +/- delta around the nominal value."""
+    delta: float
+    relative: bool = False
+
+    def sample(self, rng, nominal, size):
+        scale = self.delta * (abs(nominal) if self.relative else 1.0)
+        return nominal + scale * rng.uniform(-1.0, 1.0, size)
+
+
+@dataclass
+class Process:
+    """Global variation of a model parameter, shared by every device using the model."""
+    model: str
+    parameter: str
+    distribution: object
+
+    @property
+    def name(self):
+        return f'{self.model}.{self.parameter}'
+
+
+@dataclass
+class Mismatch:
+    """Independent variation of one device's model or instance parameter."""
+    element: str
+    parameter: str
+    distribution: object
+
+    @property
+    def name(self):
+        return f'{self.element}.{self.parameter}'
+
+
+def _instance_parameter(element, parameter):
+    """(ngspice parameter name, nominal value) of an element parameter such as 'w' or 'resistance'."""
+    for descriptor in element.parameter_iterator():
+        spice_name = getattr(descriptor, 'spice_name', None)
+        if parameter in (spice_name, descriptor.attribute_name):
+            value = getattr(element, descriptor.attribute_name)
+            if value is None:
+                break
+            return spice_name or descriptor.attribute_name, float(value)
+    raise KeyError(f"{element.name} has no parameter {parameter}")
+
+
+class MonteCarlo:
+    """Monte Carlo runner for one circuit, its variations and a metric function."""
+
+    def __init__(self, circuit, variations, analyses, metrics,
+                 temperature=25, nominal_temperature=25, options=None):
+        """
+        Args:
+            circuit: PySpice Circuit object (left unchanged)
+            variations: List of Process and Mismatch declarations
+            analyses: Analysis name or {name: kwargs}, e.g.
+                {'operating_point': {}, 'ac': dict(start_frequency=1, ...)}
+            metrics: Picklable callable taking {analysis name: Waveforms} and
+                returning {metric name: float}
+            temperature: Simulation temperature in degrees C
+            nominal_temperature: Model nominal temperature in degrees C
+            options: Optional dict of simulator `.options`
+        """
+        self.variations = list(variations)
+        self.metrics = metrics
+        if isinstance(analyses, str):
+            analyses = {analyses: {}}
+
+        models = circuit._models
+        # Nominal values: (model, parameter) -> value, (element, parameter) -> value
+        self._model_nominal = {}
+        self._device_nominal = {}
+        device_models = {}          # element name -> (base model, private copy)
+        for variation in self.variations:
+            if isinstance(variation, Process):
+                model = models[variation.model]
+                self._model_nominal[(variation.model, variation.parameter)] = \
+                    float(model._parameters[variation.parameter])
+                continue
+            element = find_element(circuit, variation.element)
+            base = getattr(element, 'model', None)
+            if base is not None and variation.parameter in models[str(base)]._parameters:
+                base = str(base)
+                device_models[element.name] = (base, f'{base}_{element.name}')
+                self._device_nominal[(variation.element, variation.parameter)] = \
+                    ('model', element.name, float(models[base]._parameters[variation.parameter]))
+            else:
+                spice_name, nominal = _instance_parameter(element, variation.parameter)
+                self._device_nominal[(variation.element, variation.parameter)] = \
+                    ('instance', element.name, spice_name, nominal)
+        self._device_models = device_models
+
+        # Give each mismatched device its own model copy while building the deck
+        added = []
+        try:
+            for element_name, (base, copy) in device_models.items():
+                model = models[base]
+                circuit.model(copy, model.model_type, **model._parameters)
+                added.append(copy)
+                circuit[element_name].model = copy
+            simulator = circuit.simulator(temperature=temperature,
+                                          nominal_temperature=nominal_temperature,
+                                          simulator='ngspice-subprocess')
+            if options:
+                simulator.options(**options)
+            self.deck = analysis_deck(simulator, analyses)
+        finally:
+            for element_name, (base, copy) in device_models.items():
+                circuit[element_name].model = base
+            for copy in added:
+                del models[copy]
+
+    def sample(self, n, seed=None):
+        """
+        Draw parameter values for `n` samples
+
+        Returns:
+            {variation name: (n,) array of absolute values}, e.g. 'NMOS.vto', 'M2.vto'
+        """
+        rng = np.random.default_rng(seed)
+        samples = {}
+        for variation in self.variations:
+            if isinstance(variation, Process):
+                nominal = self._model_nominal[(variation.model, variation.parameter)]
+            else:
+                nominal = self._device_nominal[(variation.element, variation.parameter)][-1]
+            samples[variation.name] = variation.distribution.sample(rng, nominal, n)
+        return samples
+
+    def _alterations(self, samples):
+        """Per-sample (command, values) columns implementing `samples` in ngspice."""
+        process_delta = {}
+        columns = []
+        for variation in self.variations:
+            if isinstance(variation, Process):
+                key = (variation.model, variation.parameter)
+                values = samples[variation.name]
+                process_delta[key] = values - self._model_nominal[key]
+                columns.append((f'altermod {variation.model} {variation.parameter} = ', values))
+
+        for element_name, (base, copy) in self._device_models.items():
+            # A device's model copy follows the global process values of its base model
+            parameters = {parameter: self._model_nominal[(model, parameter)] + delta
+                          for (model, parameter), delta in process_delta.items() if model == base}
+            for variation in self.variations:
+                if isinstance(variation, Mismatch):
+                    entry = self._device_nominal[(variation.element, variation.parameter)]
+                    if entry[0] == 'model' and entry[1] == element_name:
+                        mismatch = samples[variation.name] - entry[2]
+                        if variation.parameter in parameters:
+                            parameters[variation.parameter] = parameters[variation.parameter] + mismatch
+                        else:
+                            parameters[variation.parameter] = samples[variation.name]
+            for parameter, values in parameters.items():
+                columns.append((f'altermod {copy} {parameter} = ', values))
+
+        for variation in self.variations:
+            if isinstance(variation, Mismatch):
+                entry = self._device_nominal[(variation.element, variation.parameter)]
+                if entry[0] == 'instance':
+                    columns.append((f'alter {entry[1]} {entry[2]} = ', samples[variation.name]))
+        return columns
+
+    def iter_chunks(self, samples, jobs=None, chunk_size=64):
+        """
+        Simulate `samples` (from sample()) and yield results as chunks finish
+
+        Args:
+            samples: {variation name: values} as returned by sample()
+            jobs: Worker processes (default: CPU count); 1 runs in this process
+            chunk_size: Samples per task
+
+        Yields:
+            (indices, rows) with one {metric: value} dict (or None on failure) per index
+        """
+        columns = self._alterations(samples)
+        n = len(next(iter(samples.values()))) if samples else 0
+        chunks = []
+        for start in range(0, n, chunk_size):
+            indices = np.arange(start, min(start + chunk_size, n))
+            commands = [[prefix + repr(float(values[i])) for prefix, values in columns] for i in indices]
+            chunks.append((indices, commands))
+
+        jobs = jobs or os.cpu_count() or 1
+        if jobs == 1:
+            _init_worker(self.deck)
+            for indices, commands in chunks:
+                yield _run_chunk(indices, commands, self.metrics)
+            return
+
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(self.deck,)) as executor:
+            futures = [executor.submit(_run_chunk, indices, commands, self.metrics)
+                       for indices, commands in chunks]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def simulate(self, n, seed=None, jobs=None, chunk_size=64, progress=False):
+        """
+        Draw `n` samples, simulate them in parallel and collect the metrics
+
+        Returns:
+            MonteCarloResult
+        """
+        samples = self.sample(n, seed)
+        result = MonteCarloResult(samples)
+        for indices, rows in self.iter_chunks(samples, jobs, chunk_size):
+            result.add(indices, rows)
+            if progress:
+                print(f"  {result.completed}/{n} samples")
+        return result
+
+
+class MonteCarloResult:
+    """Sampled parameters and metric distributions, filled in as chunks arrive."""
+
+    def __init__(self, samples):
+        self.samples = samples
+        self.n = len(next(iter(samples.values()))) if samples else 0
+        self.metrics = {}
+        self.completed = 0
+
+    def add(self, indices, rows):
+        """Store the metric rows of one finished chunk."""
+        for index, row in zip(indices, rows):
+            if row is None:
+                continue
+            for name, value in row.items():
+                if name not in self.metrics:
+                    self.metrics[name] = np.full(self.n, np.nan)
+                self.metrics[name][index] = value
+        self.completed += len(indices)
+
+    def failures(self):
+        """Number of samples with no metrics (simulation failed)."""
+        if not self.metrics:
+            return self.completed
+        return int(np.isnan(np.vstack(list(self.metrics.values()))).all(axis=0).sum())
+
+    def summary(self):
+        """{metric: {'mean', 'std', 'min', 'p1', 'median', 'p99', 'max'}} over finished samples."""
+        summary = {}
+        for name, values in self.metrics.items():
+            values = values[np.isfinite(values)]
+            if values.size == 0:
+                continue
+            p1, median, p99 = np.percentile(values, [1, 50, 99])
+            summary[name] = {
+                'mean': values.mean(), 'std': values.std(), 'min': values.min(),
+                'p1': p1, 'median': median, 'p99': p99, 'max': values.max(),
+            }
+        return summary
+
+    def yield_fraction(self, **limits):
+        """
+        Fraction of samples meeting every limit
+
+        Args:
+            **limits: metric=(low, high); use None for an open side,
+                e.g. phase_margin=(45, None)
+        """
+        passed = np.ones(self.n, dtype=bool)
+        for name, (low, high) in limits.items():
+            values = self.metrics.get(name, np.full(self.n, np.nan))
+            ok = np.isfinite(values)
+            if low is not None:
+                ok &= values >= low
+            if high is not None:
+                ok &= values <= high
+            passed &= ok
+        return passed.mean() if self.n else 0.0
+
+    def format_summary(self):
+        """Return the summary as a fixed-width text table."""
+        header = f"{'Metric':16s} {'Mean':>12s} {'Std':>12s} {'P1':>12s} {'Median':>12s} {'P99':>12s}"
+        lines = [header, '-' * len(header)]
+        for name, stats in self.summary().items():
+            lines.append(f"{name:16s} {stats['mean']:12.4g} {stats['std']:12.4g} {stats['p1']:12.4g}"
+                         f" {stats['median']:12.4g} {stats['p99']:12.4g}")
+        lines.append('-' * len(header))
+        lines.append(f"{self.completed} samples, {self.failures()} failed")
+        return '\n'.join(lines)
+
+
+class OpAmpMetrics:
+    """
+    Offset, DC gain, bandwidth, UGF and phase margin of one output
+
+    Needs an 'operating_point' and an 'ac' analysis; missing analyses leave
+    their metrics out. `output_offset` is the error of the output level;
+    `offset` is that error referred to the input (divided by the DC gain),
+    so it needs both analyses.
+    """
+
+    def __init__(self, output, reference=0.0):
+        """
+        Args:
+            output: Output node name
+            reference: Ideal output level (number) or node name, for the offset
+        """
+        self.output = output
+        self.reference = reference
+
+    def __call__(self, results):
+        row = {}
+        op = results.get('operating_point')
+        if op is not None:
+            reference = self.reference
+            if isinstance(reference, str):
+                reference = float(op[reference])
+            row['output_offset'] = float(op[self.output]) - reference
+        ac = results.get('ac')
+        if ac is not None:
+            response = ac[self.output]
+            metrics = ac_metrics(ac.frequency, response)
+            if 'output_offset' in row:
+                # Signed gain at the lowest frequency (the AC source has unit magnitude)
+                gain = float(np.real(response[0]))
+                row['offset'] = row['output_offset'] / gain if gain else float('nan')
+            row['dc_gain_db'] = float(metrics.dc_gain_db)
+            row['bandwidth'] = float(metrics.bandwidth)
+            row['ugf'] = float(metrics.ugf)
+            row['phase_margin'] = float(metrics.phase_margin)
+        return row
+
+
+# Per-process ngspice instance with the Monte Carlo netlist loaded
+_worker_session = None
+
+
+def _init_worker(deck):
+    global _worker_session
+    from PySpice.Spice.NgSpice.Shared import NgSpiceShared
+
+    session = NgSpiceShared.new_instance()
+    session.destroy()
+    session.remove_circuit()
+    session.load_circuit(deck)
+    _worker_session = session
+
+
+def _run_chunk(indices, commands, metrics):
+    session = _worker_session
+    rows = []
+    for sample_commands in commands:
+        try:
+            session.destroy()
+            for command in sample_commands:
+                session.exec_command(command)
+            session.run()
+            results = {}
+            for plot_name in session.plot_names:
+                if plot_name != 'const':
+                    waveforms = read_plot(session, plot_name)
+                    results[waveforms.analysis] = waveforms
+        except Exception:
+            # Only simulation failures count as failed samples; errors in `metrics` propagate
+            rows.append(None)
+            continue
+        rows.append(metrics(results) if results else None)
+    return indices, rows
@@ -0,0 +1,18 @@
+"""
+Netlist Helpers
+
+Small lookups on PySpice circuits shared by the Monte Carlo runner, the
+deck templates, the pre-screen and the truth-table bench.
+
+    element = find_element(circuit, 'M2')    # finds MM2 as well as M2
+"""
+
+
+def find_element(circuit, name):
+    """Look an element up by netlist name or by the name given to PySpice ('M2' -> 'MM2')."""
+    for candidate in (name, name[:1] + name):
+        try:
+            return circuit[candidate]
+        except (IndexError, KeyError):
+            continue
+    raise KeyError(f"Element {name} not found in circuit")
@@ -0,0 +1,396 @@
+"""
+Sizing Optimizer
+
+Searches transistor sizes, bias levels and compensation values for a set
+of metric targets (gain, phase margin, UGF, ...) with CMA-ES. Each
+generation is one batch of candidate netlists that is simulated in
+parallel through the on-disk cache; identical decks run once.
+
+    optimizer = SizingOptimizer(
+        circuit,
+        variables=[DesignVariable('M1.w', 2e-6, 100e-6, log=True),
+                   DesignVariable('Vbias_p', 2.5, 4.5),
+                   DesignVariable('CA', 0.5e-12, 10e-12, log=True)],
+        analyses={'operating_point': {}, 'ac': dict(start_frequency=0.1, stop_frequency=1e9,
+                                                    number_of_points=50, variation='dec')},
+        metrics=OpAmpMetrics('vout', reference=2.5),
+        targets={'dc_gain_db': (60, None), 'phase_margin': (60, None), 'ugf': (5e6, None)},
+        screen=OutputInRange('vout', 0.5, 4.5))
+    result = optimizer.run(budget=300, jobs=8)
+
+Candidates are screened on their operating point first when `screen` is
+given: a candidate whose bias point fails (output railed, devices off) is
+marked infeasible without running the remaining analyses. A `prescreen`
+(such as spicepilot.prescreen.Prescreen) goes further and rejects
+dead-on-arrival candidates analytically, before any SPICE call. With
+`warm_start`, operating points are seeded (`.nodeset`) with the solution
+of the best candidate found so far.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .cache import SimulationCache, deck_key
+from .session import simulate_deck
+from .template import DeckTemplate, accessor
+
+# Violation assigned when the simulation or the operating point screen fails
+INFEASIBLE = 1e6
+
+
+@dataclass
+class DesignVariable:
+    """
+    One tunable value
+
+    `target` is 'M1.w' / 'M1.l' (device parameter), 'NMOS.vto' (model
+    parameter) or an element name such as 'Vbias_p' or 'CA' (its DC value,
+    resistance, capacitance or inductance).
+    """
+    target: str
+    low: float
+    high: float
+    log: bool = False
+
+    def from_unit(self, u):
+        """Map [0, 1] to the variable's range."""
+        u = np.clip(u, 0.0, 1.0)
+        if self.log:
+            return float(np.exp(np.log(self.low) + u * (np.log(self.high) - np.log(self.low))))
+        return float(self.low + u * (self.high - self.low))
+
+    def to_unit(self, value):
+        """Map a value in range to [0, 1]."""
+        if self.log:
+            return float((np.log(value) - np.log(self.low)) / (np.log(self.high) - np.log(self.low)))
+        return float((value - self.low) / (self.high - self.low))
+
+
+class OutputInRange:
+    """Operating point screen: `node` must sit between `low` and `high` volts."""
+
+    def __init__(self, node, low, high):
+        self.node = node
+        self.low = low
+        self.high = high
+
+    def __call__(self, op):
+        try:
+            value = float(np.ravel(op[self.node])[0])
+        except (IndexError, KeyError):
+            return False
+        return self.low <= value <= self.high
+
+
+class CMAES:
+    """Minimal CMA-ES (ask/tell) on a box, ranking-based."""
+
+    def __init__(self, mean, sigma=0.3, popsize=None, seed=None):
+        n = len(mean)
+        self.n = n
+        self.mean = np.array(mean, dtype=np.float64)
+        self.sigma = sigma
+        self.popsize = popsize or 4 + int(3 * np.log(n))
+        self.mu = self.popsize // 2
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1.0 / np.sum(self.weights ** 2)
+
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3) ** 2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2) ** 2 + self.mueff))
+        self.damps = 1 + 2 * max(0.0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n * n))
+
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.generation = 0
+        self.rng = np.random.default_rng(seed)
+
+    def ask(self):
+        """Return a (popsize x n) batch of candidates."""
+        z = self.rng.standard_normal((self.popsize, self.n))
+        return self.mean + self.sigma * (z * self.D) @ self.B.T
+
+    def tell(self, candidates, ranks):
+        """Update from the evaluated batch; lower rank is better."""
+        order = np.argsort(ranks)
+        selected = candidates[order[:self.mu]]
+        old_mean = self.mean
+        self.mean = self.weights @ selected
+        step = (self.mean - old_mean) / self.sigma
+
+        inv_sqrt_c = self.B @ np.diag(1 / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * inv_sqrt_c @ step
+        norm_ps = np.linalg.norm(self.ps)
+        hsig = norm_ps / np.sqrt(1 - (1 - self.cs) ** (2 * (self.generation + 1))) / self.chi_n \
+            < 1.4 + 2 / (self.n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * step
+
+        deviations = (selected - old_mean) / self.sigma
+        self.C = ((1 - self.c1 - self.cmu) * self.C
+                  + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C)
+                  + self.cmu * (deviations.T * self.weights) @ deviations)
+        self.sigma *= np.exp((self.cs / self.damps) * (norm_ps / self.chi_n - 1))
+
+        self.C = (self.C + self.C.T) / 2
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        self.generation += 1
+
+
+def violation(metrics, targets):
+    """
+    Summed relative distance to the targets (0 when all are met)
+
+    Args:
+        metrics: {metric: value}
+        targets: {metric: (low, high)} with None for an open side
+    """
+    if metrics is None:
+        return INFEASIBLE
+    total = 0.0
+    for name, (low, high) in targets.items():
+        value = metrics.get(name, np.nan)
+        if not np.isfinite(value):
+            total += 10.0
+            continue
+        if low is not None and value < low:
+            total += (low - value) / max(abs(low), 1e-30)
+        if high is not None and value > high:
+            total += (value - high) / max(abs(high), 1e-30)
+    return total
+
+
+@dataclass
+class SizingResult:
+    """Best candidate found by SizingOptimizer.run()."""
+    values: dict                  # design variable target -> value
+    metrics: dict
+    violation: float              # 0 when every target is met
+    objective: float
+    evaluations: int              # candidates evaluated
+    simulations: int              # decks actually simulated (not cached, not screened out)
+    history: list = field(default_factory=list)   # (generation, best violation, best objective)
+
+    @property
+    def feasible(self):
+        return self.violation == 0
+
+
+class SizingOptimizer:
+    """CMA-ES over design variables with batched, cached, parallel evaluation."""
+
+    def __init__(self, circuit, variables, analyses, metrics, targets, minimize=None, maximize=None,
+                 screen=None, prescreen=None, warm_start=True, temperature=25, nominal_temperature=25,
+                 options=None, cache=None):
+        """
+        Args:
+            circuit: PySpice Circuit object (restored after every candidate)
+            variables: List of DesignVariable
+            analyses: Analysis name or {name: kwargs}
+            metrics: Callable taking {analysis name: Waveforms} and returning {metric: float};
+                only called for candidates whose analyses all ran (its exceptions propagate)
+            targets: {metric: (low, high)}, None for an open side
+            minimize / maximize: Optional metric to optimise once the targets are met
+            screen: Optional callable(operating point Waveforms) -> bool, run
+                before the other analyses
+            prescreen: Optional callable(list of {target: value}) -> (candidates,)
+                problem counts, 0 to simulate (e.g. a Prescreen); a TypeError or
+                ValueError from it sends the whole batch to SPICE
+            warm_start: Seed operating points with the best candidate's solution
+            temperature: Simulation temperature in degrees C
+            nominal_temperature: Model nominal temperature in degrees C
+            options: Optional dict of simulator `.options`
+            cache: SimulationCache (default: the shared on-disk cache); False disables caching
+        """
+        self.circuit = circuit
+        self.variables = list(variables)
+        self.analyses = {analyses: {}} if isinstance(analyses, str) else dict(analyses)
+        self.metrics = metrics
+        self.targets = dict(targets)
+        self.objective = (minimize, 1.0) if minimize else (maximize, -1.0) if maximize else (None, 0.0)
+        self.screen = screen
+        self.prescreen = prescreen
+        self.warm_start = warm_start
+        self.temperature = temperature
+        self.nominal_temperature = nominal_temperature
+        self.options = options
+        self.cache = SimulationCache() if cache is None else (cache or None)
+        self._accessors = [accessor(circuit, variable.target) for variable in self.variables]
+        self._templates = {}
+        self._hints = None
+        self.simulations = 0
+
+    def values(self, u):
+        """{target: value} for a point in the unit box."""
+        return {variable.target: variable.from_unit(x) for variable, x in zip(self.variables, u)}
+
+    def deck(self, values, analyses=None, hints=True):
+        """Deck for one candidate ({target: value}), with the warm-start `.nodeset` if `hints`."""
+        analyses = analyses or self.analyses
+        key = repr(analyses)
+        template = self._templates.get(key)
+        if template is None:
+            # Rendered once per analysis set; candidates only format their own values
+            template = self._templates[key] = DeckTemplate(
+                self.circuit, [variable.target for variable in self.variables], analyses,
+                self.temperature, self.nominal_temperature, self.options, node_set=True)
+        return template.render(values, node_set=self._hints if self.warm_start and hints else None)
+
+    def _simulate(self, candidates, analyses, executor):
+        """Simulate candidates (deduplicated, through the cache) -> list of results."""
+        analyses_of = {}
+        unique = {}
+        keys = []
+        for values in candidates:
+            # Keyed without the .nodeset hints: they change with the best candidate, the solution does not
+            deck = self.deck(values, analyses, hints=False)
+            key = deck_key(deck)
+            keys.append(key)
+            if key not in unique:
+                unique[key] = self.deck(values, analyses) if self.warm_start and self._hints else deck
+            analyses_of[key] = list(analyses)
+        results = {}
+        pending = []
+        for key in unique:
+            cached = self.cache.get_results(key, analyses_of[key]) if self.cache is not None else None
+            if cached is not None:
+                results[key] = cached
+            else:
+                pending.append(key)
+        decks = [unique[key] for key in pending]
+        outcomes = executor.map(simulate_deck, decks) if executor else map(simulate_deck, decks)
+        for key, outcome in zip(pending, outcomes):
+            results[key] = outcome
+            if outcome and self.cache is not None:
+                self.cache.put_results(key, outcome)
+        self.simulations += len(pending)
+        return [results[key] for key in keys]
+
+    def evaluate(self, batch, executor=None):
+        """
+        Evaluate a batch of unit-box candidates
+
+        Returns:
+            List of (violation, objective, metrics, operating point) per candidate
+        """
+        candidates = [self.values(u) for u in batch]
+        passed = list(range(len(candidates)))
+        ops = [None] * len(candidates)
+        rejected = np.full(len(candidates), INFEASIBLE)
+
+        if self.prescreen is not None:
+            try:
+                problems = np.asarray(self.prescreen(candidates))
+            except (TypeError, ValueError):
+                # Circuit or values the pre-screen cannot model: every candidate goes to SPICE
+                problems = np.zeros(len(candidates), dtype=np.int64)
+            rejected += problems
+            passed = [i for i in passed if problems[i] == 0]
+
+        if self.screen is not None and 'operating_point' in self.analyses and len(self.analyses) > 1:
+            screened = self._simulate([candidates[i] for i in passed], {'operating_point': {}}, executor)
+            survivors = []
+            for i, outcome in zip(passed, screened):
+                op = outcome.get('operating_point') if outcome else None
+                ops[i] = op
+                if op is not None and self.screen(op):
+                    survivors.append(i)
+            passed = survivors
+
+        full = self._simulate([candidates[i] for i in passed], self.analyses, executor)
+        evaluated = [(rejected[i], np.inf, None, ops[i]) for i in range(len(candidates))]
+        metric_name, sign = self.objective
+        for i, outcome in zip(passed, full):
+            op = outcome.get('operating_point') if outcome else None
+            if not outcome or any(outcome.get(name) is None for name in self.analyses):
+                # Failed or incomplete simulation; errors raised by the metrics callback are not caught
+                evaluated[i] = (INFEASIBLE, np.inf, None, op)
+                continue
+            row = self.metrics(outcome)
+            if row is None:
+                evaluated[i] = (INFEASIBLE, np.inf, None, op)
+                continue
+            objective = sign * row.get(metric_name, np.nan) if metric_name else 0.0
+            if not np.isfinite(objective):
+                objective = np.inf
+            evaluated[i] = (violation(row, self.targets), objective, row, op)
+        return evaluated
+
+    def run(self, budget=300, jobs=None, popsize=None, sigma=0.3, x0=None, seed=None, progress=False):
+        """
+        Optimise until the targets are met (and no objective is set) or the budget is used
+
+        Args:
+            budget: Maximum number of candidates to evaluate
+            jobs: Worker processes (default: CPU count); 1 runs in this process
+            popsize: Candidates per generation (default: CMA-ES default, at least `jobs`)
+            sigma: Initial step size in the unit box
+            x0: Optional starting {target: value} (default: the circuit's current values,
+                or the centre of the box where those are out of range)
+            seed: Random seed
+
+        Returns:
+            SizingResult
+        """
+        jobs = jobs or os.cpu_count() or 1
+        start = []
+        for (owner, key, is_dict), variable in zip(self._accessors, self.variables):
+            current = (x0 or {}).get(variable.target)
+            if current is None:
+                current = owner.get(key) if is_dict else getattr(owner, key)
+            try:
+                u = variable.to_unit(float(current))
+            except (TypeError, ValueError):
+                u = 0.5
+            start.append(u if 0 <= u <= 1 else 0.5)
+
+        if popsize is None:
+            popsize = max(4 + int(3 * np.log(len(start))), jobs)
+        strategy = CMAES(start, sigma, popsize, seed)
+
+        best = None
+        history = []
+        evaluations = 0
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+        try:
+            while evaluations < budget:
+                batch = np.clip(strategy.ask(), 0.0, 1.0)
+                batch = batch[:budget - evaluations]
+                evaluated = self.evaluate(batch, executor)
+                evaluations += len(batch)
+
+                scores = np.array([(v, o) for v, o, _, _ in evaluated])
+                ranks = np.empty(len(batch))
+                ranks[np.lexsort((scores[:, 1], scores[:, 0]))] = np.arange(len(batch))
+                if len(batch) == strategy.popsize:
+                    strategy.tell(batch, ranks)
+
+                i = int(np.argmin(ranks))
+                v, o, row, op = evaluated[i]
+                if best is None or (v, o) < (best[0], best[1]):
+                    best = (v, o, row, self.values(batch[i]))
+                    if op is not None:
+                        self._hints = {name: float(np.ravel(value)[0]) for name, value in op.nodes.items()
+                                       if '#' not in name}
+                history.append((strategy.generation, best[0], best[1]))
+                if progress:
+                    print(f"  generation {strategy.generation}: {evaluations} candidates, "
+                          f"violation {best[0]:.3g}, objective {best[1]:.4g}")
+                if best[0] == 0 and self.objective[0] is None:
+                    break
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        v, o, row, values = best
+        return SizingResult(values, row or {}, v, o * self.objective[1] if self.objective[0] else 0.0,
+                            evaluations, self.simulations, history)
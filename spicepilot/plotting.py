@@ -0,0 +1,391 @@
+"""
+Deferred Headless Plotting
+
+Simulation code records what to plot (Bode, transient, sweep) as small
+FigureSpec objects; the figures are drawn later, off the simulation path,
+using matplotlib's Agg canvas. Nothing touches pyplot, so no GUI backend is
+ever loaded.
+
+    plots = Plotter()
+    plots.bode('opamp_bode.png', frequency, {'vout': vout_ac})
+    plots.transient('tran.png', time, {'in': vin, 'out': vout})
+    plots.render()          # after all simulations finished
+
+Figures are rendered in the calling process unless `jobs` > 1 is asked for
+(Plotter(jobs=4) or render(jobs=4)); then a process pool draws them. Pool
+workers are spawned on Windows and re-import the calling script, so a
+script that renders with jobs > 1 must keep its top-level code under
+`if __name__ == '__main__':`.
+
+Traces are decimated to the figure's pixel width when they are recorded
+(min/max per pixel column, see spicepilot.decimate), so a spec never holds
+more than a few thousand points per trace and million-sample waveforms
+render in well under a second.
+
+Environment:
+    SPICEPILOT_PLOTS=0       every recording call returns immediately
+    SPICEPILOT_MAX_DPI=100   cap the resolution of every saved figure
+
+install_headless() applies the same settings, and the decimation, to
+scripts that call `plt.plot` / `plt.savefig` directly; the benchmark runner
+enables it for every job.
+"""
+
+import importlib.abc
+import importlib.util
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .decimate import decimate
+
+# Named resolutions for typical uses
+DPI = {
+    'preview': 72,
+    'screen': 100,
+    'report': 150,
+    'print': 300,
+}
+
+FIGURE_KINDS = ('bode', 'transient', 'sweep')
+
+
+def plots_enabled():
+    """False when SPICEPILOT_PLOTS is set to 0/false/no/off."""
+    return os.environ.get('SPICEPILOT_PLOTS', '1').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def max_dpi():
+    """DPI cap from SPICEPILOT_MAX_DPI (a number or a DPI preset name), or None."""
+    value = os.environ.get('SPICEPILOT_MAX_DPI')
+    if not value:
+        return None
+    return resolve_dpi(value)
+
+
+def resolve_dpi(dpi, cap=None):
+    """Turn a number or DPI preset name into a number, limited to `cap`."""
+    if isinstance(dpi, str):
+        dpi = DPI[dpi] if dpi in DPI else float(dpi)
+    if cap is not None:
+        dpi = min(dpi, cap)
+    return dpi
+
+
+@dataclass
+class FigureSpec:
+    """Everything needed to draw one figure, as plain data."""
+    kind: str                     # 'bode', 'transient' or 'sweep'
+    filename: str
+    x: np.ndarray
+    traces: dict                  # label -> y array (complex for 'bode')
+    title: str = ''
+    xlabel: str = ''
+    ylabel: str = ''
+    dpi: float = DPI['report']
+    figsize: tuple = (10, 6)
+    guides: list = field(default_factory=list)   # (y, label) horizontal reference lines
+    ylim: tuple = None            # y limits (of the magnitude axis for 'bode')
+    phase_ylim: tuple = None      # phase axis limits ('bode')
+    styles: dict = field(default_factory=dict)        # label -> Axes.plot keyword arguments
+    phase_styles: dict = field(default_factory=dict)  # label -> keyword arguments of the phase line ('bode')
+
+
+def _style(styles, label, linewidth):
+    """Axes.plot keyword arguments of one trace: the defaults updated with its style."""
+    return {'linewidth': linewidth, 'label': label, **styles.get(label, {})}
+
+
+def _draw_bode(figure, spec):
+    magnitude_axis, phase_axis = figure.subplots(2, 1, sharex=True)
+    for label, response in spec.traces.items():
+        response = np.asarray(response)
+        magnitude_axis.semilogx(spec.x, 20 * np.log10(np.abs(response) + 1e-20),
+                                **_style(spec.styles, label, 2))
+        phase_axis.semilogx(spec.x, np.degrees(np.unwrap(np.angle(response))),
+                            **_style(spec.phase_styles, label, 2))
+    magnitude_axis.axhline(y=0, color='r', linestyle='--', alpha=0.6, label='0 dB')
+    for y, label in spec.guides:
+        magnitude_axis.axhline(y=y, color='g', linestyle=':', alpha=0.6, label=label)
+    phase_axis.axhline(y=-180, color='r', linestyle='--', alpha=0.6, label='-180°')
+
+    magnitude_axis.set_ylabel(spec.ylabel or 'Gain (dB)')
+    magnitude_axis.set_title(spec.title)
+    phase_axis.set_ylabel('Phase (degrees)')
+    phase_axis.set_xlabel(spec.xlabel or 'Frequency (Hz)')
+    if spec.ylim is not None:
+        magnitude_axis.set_ylim(spec.ylim)
+    if spec.phase_ylim is not None:
+        phase_axis.set_ylim(spec.phase_ylim)
+    for axis in (magnitude_axis, phase_axis):
+        axis.grid(True, which='both', alpha=0.3)
+        axis.legend(loc='best', fontsize=9)
+
+
+def _draw_lines(figure, spec):
+    axis = figure.subplots()
+    for label, y in spec.traces.items():
+        axis.plot(spec.x, y, **_style(spec.styles, label, 1.5))
+    for y, label in spec.guides:
+        axis.axhline(y=y, color='k', linestyle=':', alpha=0.6, label=label)
+    axis.set_title(spec.title)
+    axis.set_xlabel(spec.xlabel)
+    axis.set_ylabel(spec.ylabel)
+    if spec.ylim is not None:
+        axis.set_ylim(spec.ylim)
+    axis.grid(True, alpha=0.3)
+    if spec.traces:
+        axis.legend(loc='best', fontsize=9)
+
+
+def render_spec(spec):
+    """
+    Draw one FigureSpec to its file with the Agg canvas
+
+    Returns:
+        Path of the written file
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure(figsize=spec.figsize)
+    FigureCanvasAgg(figure)
+    if spec.kind == 'bode':
+        _draw_bode(figure, spec)
+    else:
+        _draw_lines(figure, spec)
+    figure.tight_layout()
+    figure.savefig(spec.filename, dpi=spec.dpi)
+    return spec.filename
+
+
+class Plotter:
+    """Collects FigureSpecs and renders them, inline or in a worker pool."""
+
+    def __init__(self, enabled=None, dpi_cap=None, jobs=None, decimation=True):
+        """
+        Args:
+            enabled: Record figures at all (default: plots_enabled())
+            dpi_cap: Maximum DPI for every figure (default: max_dpi())
+            jobs: Rendering processes; None or 1 renders inline (see render())
+            decimation: Reduce traces to the figure's pixel width when recorded
+        """
+        self.enabled = plots_enabled() if enabled is None else enabled
+        self.dpi_cap = max_dpi() if dpi_cap is None else resolve_dpi(dpi_cap)
+        self.jobs = jobs
+        self.decimation = decimation
+        self.specs = []
+
+    def __len__(self):
+        return len(self.specs)
+
+    def add(self, spec):
+        """Record a FigureSpec (DPI limited to the cap, traces decimated to the pixel width)."""
+        if not self.enabled:
+            return None
+        spec.dpi = resolve_dpi(spec.dpi, self.dpi_cap)
+        if self.decimation:
+            bins = int(spec.figsize[0] * spec.dpi)
+            spec.x, spec.traces = decimate(spec.x, spec.traces, bins, log=spec.kind == 'bode')
+        self.specs.append(spec)
+        return spec
+
+    def bode(self, filename, frequency, responses, title='Bode Plot', dpi='report', guides=(),
+             ylim=None, phase_ylim=None, styles=None, phase_styles=None):
+        """
+        Record a magnitude/phase plot of complex responses ({label: array})
+
+        `styles` / `phase_styles` map a label to Axes.plot keyword arguments
+        for its magnitude / phase line, e.g. {'Gain': dict(color='b')}.
+        """
+        if not self.enabled:
+            return None
+        return self.add(FigureSpec('bode', filename, np.asarray(frequency).real, dict(responses),
+                                   title=title, dpi=dpi, figsize=(12, 9), guides=list(guides),
+                                   ylim=ylim, phase_ylim=phase_ylim, styles=dict(styles or {}),
+                                   phase_styles=dict(phase_styles or {})))
+
+    def transient(self, filename, time, signals, title='Transient Response', ylabel='Voltage (V)',
+                  dpi='report', guides=(), ylim=None, styles=None):
+        """Record a time-domain plot of signals ({label: array})."""
+        if not self.enabled:
+            return None
+        return self.add(FigureSpec('transient', filename, np.asarray(time), dict(signals),
+                                   title=title, xlabel='Time (s)', ylabel=ylabel,
+                                   dpi=dpi, guides=list(guides), ylim=ylim, styles=dict(styles or {})))
+
+    def sweep(self, filename, x, signals, title='DC Sweep', xlabel='', ylabel='Voltage (V)',
+              dpi='report', guides=(), ylim=None, styles=None):
+        """Record a swept-parameter plot of signals ({label: array})."""
+        if not self.enabled:
+            return None
+        return self.add(FigureSpec('sweep', filename, np.asarray(x), dict(signals),
+                                   title=title, xlabel=xlabel, ylabel=ylabel,
+                                   dpi=dpi, guides=list(guides), ylim=ylim, styles=dict(styles or {})))
+
+    def render(self, jobs=None):
+        """
+        Draw every recorded figure and forget the specs
+
+        Figures are drawn in this process unless more than one job is
+        requested. With jobs > 1 a process pool draws them; on Windows its
+        workers re-import the calling script, which therefore needs an
+        `if __name__ == '__main__':` guard around its top-level code.
+
+        Args:
+            jobs: Rendering processes (default: the Plotter's setting, else 1)
+
+        Returns:
+            List of written file paths
+        """
+        specs, self.specs = self.specs, []
+        if not specs:
+            return []
+        jobs = min(jobs or self.jobs or 1, len(specs))
+        if jobs == 1:
+            return [render_spec(spec) for spec in specs]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            return list(executor.map(render_spec, specs))
+
+
+def _save_dpi(figure, dpi):
+    """The DPI Figure.savefig will render at for its `dpi` argument."""
+    if dpi is None:
+        from matplotlib import rcParams
+        dpi = rcParams['savefig.dpi']
+    if dpi == 'figure':
+        dpi = figure.dpi
+    return dpi
+
+
+def _decimate_lines(figure, dpi):
+    """Reduce the recorded long traces of a figure to its pixel width at `dpi`."""
+    bins = int(figure.get_figwidth() * dpi)
+    for axes in figure.get_axes():
+        for line in axes.get_lines():
+            trace = getattr(line, '_spicepilot_trace', None)
+            if trace is None:
+                continue
+            x, y = trace
+            if len(x) > 4 * bins:
+                x, (y,) = decimate(x, [y], bins, log=axes.get_xscale() == 'log')
+            line.set_data(x, y)
+
+
+def _patch_figure(figure_module, enabled, dpi_cap, decimation):
+    """Make Figure.savefig skip (plots disabled), clamp its DPI and decimate long traces to it."""
+    Figure = figure_module.Figure
+    if getattr(Figure.savefig, '_spicepilot_headless', False):
+        return
+    savefig = Figure.savefig
+
+    def headless_savefig(self, fname, *args, **kwargs):
+        if not enabled:
+            return None
+        dpi = _save_dpi(self, kwargs.get('dpi'))
+        if dpi_cap is not None:
+            dpi = kwargs['dpi'] = min(dpi, dpi_cap)
+        if decimation:
+            _decimate_lines(self, dpi)
+        return savefig(self, fname, *args, **kwargs)
+
+    headless_savefig._spicepilot_headless = True
+    Figure.savefig = headless_savefig
+
+
+def _sorted_trace(args):
+    """(x, y) of the (x, y[, fmt]) arguments of Axes.plot when x is sorted, else None."""
+    if len(args) not in (2, 3) or (len(args) == 3 and not isinstance(args[2], str)):
+        return None
+    if isinstance(args[1], str):
+        return None
+    x = np.asarray(args[0])
+    y = np.asarray(args[1])
+    if x.ndim != 1 or y.ndim != 1 or len(x) != len(y) or np.iscomplexobj(x):
+        return None
+    if not np.all(x[1:] >= x[:-1]):
+        return None
+    return x, y
+
+
+def _patch_axes(axes_module):
+    """
+    Make Axes.plot (and semilogx/semilogy/loglog) mark long traces for decimation
+
+    The pixel width is only known when the figure is saved (savefig's dpi),
+    so the full trace is kept on the line and Figure.savefig decimates it.
+    """
+    Axes = axes_module.Axes
+    if getattr(Axes.plot, '_spicepilot_headless', False):
+        return
+    plot = Axes.plot
+
+    def decimating_plot(self, *args, **kwargs):
+        lines = plot(self, *args, **kwargs)
+        trace = _sorted_trace(args)
+        if trace is not None and len(lines) == 1:
+            lines[0]._spicepilot_trace = trace
+        return lines
+
+    decimating_plot._spicepilot_headless = True
+    Axes.plot = decimating_plot
+
+
+def _patch_matplotlib(figure_module, enabled, dpi_cap, decimation):
+    if enabled is False or dpi_cap is not None or decimation:
+        _patch_figure(figure_module, enabled, dpi_cap, decimation)
+    if decimation:
+        # matplotlib.figure imports matplotlib.axes
+        _patch_axes(sys.modules['matplotlib.axes'])
+
+
+class _PatchOnImport(importlib.abc.MetaPathFinder):
+    """Patch matplotlib.figure when (and only if) the script imports it."""
+
+    def __init__(self, *settings):
+        self.settings = settings
+
+    def find_spec(self, name, path, target=None):
+        if name != 'matplotlib.figure':
+            return None
+        sys.meta_path.remove(self)
+        spec = importlib.util.find_spec(name)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_patch(module):
+            exec_module(module)
+            _patch_matplotlib(module, *self.settings)
+
+        spec.loader.exec_module = exec_and_patch
+        return spec
+
+
+def install_headless(enabled=None, dpi_cap=None, decimation=True):
+    """
+    Apply the plot switch, DPI cap and decimation to plain matplotlib code
+
+    `Figure.savefig` (and therefore `plt.savefig`) becomes a no-op when
+    plots are disabled and otherwise clamps its DPI. Long sorted (x, y)
+    traces passed to `Axes.plot` are reduced to the figure's pixel width
+    at the DPI savefig renders with. matplotlib is not imported here; the
+    patch is applied when the script imports it.
+
+    Args:
+        enabled: Save figures at all (default: plots_enabled())
+        dpi_cap: Maximum DPI (default: max_dpi())
+        decimation: Decimate long traces passed to Axes.plot
+    """
+    enabled = plots_enabled() if enabled is None else enabled
+    dpi_cap = max_dpi() if dpi_cap is None else resolve_dpi(dpi_cap)
+    if enabled and dpi_cap is None and not decimation:
+        return
+    settings = (enabled, dpi_cap, decimation)
+    if 'matplotlib.figure' in sys.modules:
+        _patch_matplotlib(sys.modules['matplotlib.figure'], *settings)
+    else:
+        sys.meta_path.insert(0, _PatchOnImport(*settings))
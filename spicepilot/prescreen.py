@@ -0,0 +1,419 @@
+"""
+Analytic Operating-Point Pre-Screen
+
+Estimates the DC operating point of a level-1 (Shichman-Hodges) MOSFET
+circuit for many candidate designs at once, without ngspice. The circuit
+is compiled once into modified-nodal-analysis stamps; every candidate is
+one row of a batched Newton solve (a stack of small dense systems), so a
+few thousand candidates cost about as much as a single SPICE run.
+
+    screen = Prescreen(circuit, outputs=['vout'])
+    op = screen.solve({'M1.w': widths, 'Vbias_p': biases})   # arrays, one entry per candidate
+    op['vout'], op.region                                    # (candidates,), (candidates x devices)
+    problems = screen.check(op)                              # 0 = worth simulating
+
+Candidates with a device in cutoff or an output within `margin` volts of
+a supply rail (the `vout = 0.09 V` op-amp failure) are rejected before any
+SPICE call. The estimate uses the square law with channel-length
+modulation and body effect and ignores everything level 1 ignores too;
+it is a filter, not a replacement for the simulator.
+
+Supported elements: DC voltage and current sources, resistors, capacitors
+(open), inductors (short) and MOSFETs with level-1 models.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from .netlist import find_element
+
+# Region codes in OperatingPoints.region
+CUTOFF = 0
+TRIODE = 1
+SATURATION = 2
+REGIONS = ('cutoff', 'triode', 'saturation')
+
+# Level-1 parameter defaults (ngspice)
+MOSFET_DEFAULTS = {'kp': 2e-5, 'vto': 0.0, 'lambda': 0.0, 'gamma': 0.0, 'phi': 0.6,
+                   'w': 100e-6, 'l': 100e-6}
+
+SCALE_SUFFIXES = (('meg', 1e6), ('mil', 25.4e-6), ('t', 1e12), ('g', 1e9), ('k', 1e3),
+                  ('m', 1e-3), ('u', 1e-6), ('µ', 1e-6), ('n', 1e-9), ('p', 1e-12), ('f', 1e-15))
+
+GMIN = 1e-12
+MAX_STEP = 0.5            # volts per Newton iteration
+TOLERANCE = 1e-6          # volts
+MAX_ITERATIONS = 100
+SOURCE_STEPS = (0.1, 0.25, 0.5, 0.75, 1.0)
+
+
+def spice_float(value):
+    """Float of a number, PySpice unit value or SPICE value string ('2.5 AC 0.5', 'DC 1', '45u')."""
+    if value is None:
+        return 0.0
+    if not isinstance(value, str):
+        return float(value)
+    tokens = value.split()
+    if tokens and tokens[0].lower() == 'dc':
+        tokens = tokens[1:]
+    if not tokens:
+        return 0.0
+    text = tokens[0].lower()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    number = text.rstrip('abcdefghijklmnopqrstuvwxyzµ')
+    suffix = text[len(number):]
+    for name, scale in SCALE_SUFFIXES:
+        if suffix.startswith(name):
+            return float(number) * scale
+    return float(number)
+
+
+@dataclass
+class OperatingPoints:
+    """Estimated DC operating points of a batch of candidates."""
+    node_names: list
+    voltages: np.ndarray        # (candidates x nodes)
+    device_names: list
+    vgs: np.ndarray             # (candidates x devices), in the device's polarity (positive = on)
+    vds: np.ndarray
+    vth: np.ndarray
+    current: np.ndarray         # drain current in the device's polarity
+    converged: np.ndarray       # (candidates,)
+
+    def __getitem__(self, name):
+        return self.voltages[:, self.node_names.index(str(name).lower())]
+
+    @property
+    def vov(self):
+        return self.vgs - self.vth
+
+    @property
+    def region(self):
+        """(candidates x devices) array of CUTOFF / TRIODE / SATURATION."""
+        region = np.where(self.vds >= self.vov, SATURATION, TRIODE)
+        return np.where(self.vov <= 0, CUTOFF, region)
+
+    def device(self, name, candidate=0):
+        """{quantity: value} for one device of one candidate."""
+        i = self.device_names.index(name)
+        return {'vgs': self.vgs[candidate, i], 'vds': self.vds[candidate, i], 'vth': self.vth[candidate, i],
+                'vov': self.vov[candidate, i], 'id': self.current[candidate, i],
+                'region': REGIONS[self.region[candidate, i]]}
+
+
+def _square_law(vgs, vds, vbs, beta, vth0, lam, gamma, phi):
+    """Level-1 drain current and (gm, gds, gmbs) for vds >= 0, all arrays in device polarity."""
+    root = np.sqrt(np.maximum(phi - vbs, 1e-3))
+    vth = vth0 + gamma * (root - np.sqrt(phi))
+    vov = vgs - vth
+    clm = 1 + lam * vds
+    saturated = vds >= vov
+    on = vov > 0
+
+    ids_sat = 0.5 * beta * vov ** 2 * clm
+    ids_lin = beta * (vov - 0.5 * vds) * vds * clm
+    ids = np.where(on, np.where(saturated, ids_sat, ids_lin), 0.0)
+    gm = np.where(on, np.where(saturated, beta * vov * clm, beta * vds * clm), 0.0)
+    gds = np.where(on, np.where(saturated, 0.5 * beta * vov ** 2 * lam,
+                                beta * (vov - vds) * clm + beta * (vov - 0.5 * vds) * vds * lam), 0.0)
+    gmbs = gm * gamma / (2 * root)
+    return ids, gm, gds, gmbs, vth
+
+
+class Prescreen:
+    """Batched level-1 DC solver and sanity check for one circuit topology."""
+
+    def __init__(self, circuit, outputs=(), margin=0.1, allow_cutoff=()):
+        """
+        Args:
+            circuit: PySpice Circuit object (read, never modified)
+            outputs: Nodes that must not sit within `margin` volts of a rail
+            margin: Rail margin in volts
+            allow_cutoff: MOSFETs that may legitimately be off (switches, dummies)
+
+        Raises:
+            TypeError: for an element kind the pre-screen cannot model
+            ValueError: for a MOSFET whose model is undefined or not level 1
+        """
+        self.circuit = circuit
+        self.outputs = [str(node).lower() for node in outputs]
+        self.margin = margin
+        self.allow_cutoff = {find_element(circuit, name).name for name in allow_cutoff}
+
+        nodes = []
+
+        def node_index(node):
+            name = str(node).lower()
+            if name in ('0', 'gnd'):
+                return -1
+            if name not in nodes:
+                nodes.append(name)
+            return nodes.index(name)
+
+        # name -> (kind, node indexes, {parameter: nominal value})
+        self.elements = {}
+        for element in circuit.elements:
+            kind = type(element).__name__
+            pins = [node_index(node) for node in element.nodes]
+            if kind in ('VoltageSource', 'CurrentSource'):
+                values = {'dc': spice_float(element.dc_value)}
+            elif kind == 'Resistor':
+                values = {'resistance': spice_float(element.resistance)}
+            elif kind == 'Capacitor':
+                continue
+            elif kind == 'Inductor':
+                kind = 'VoltageSource'
+                values = {'dc': 0.0}
+            elif kind == 'Mosfet':
+                values = self._mosfet_parameters(element)
+            else:
+                raise TypeError(f"{element.name}: {kind} is not supported by the pre-screen")
+            self.elements[element.name] = (kind, pins, values)
+
+        self.node_names = nodes
+        self.sources = [name for name, (kind, _, _) in self.elements.items() if kind == 'VoltageSource']
+        self.devices = [name for name, (kind, _, _) in self.elements.items() if kind == 'Mosfet']
+        self.size = len(nodes) + len(self.sources)
+
+    def _mosfet_parameters(self, element):
+        model = self.circuit._models.get(str(element.model))
+        if model is None:
+            raise ValueError(f"{element.name}: model {element.model} is not defined")
+        parameters = {name.rstrip('_'): value for name, value in model._parameters.items()}
+        if int(spice_float(parameters.get('level', 1))) != 1:
+            raise ValueError(f"{element.name}: only level-1 models are supported")
+        values = {name: spice_float(parameters.get(name, default)) for name, default in MOSFET_DEFAULTS.items()}
+        for name, attribute in (('w', 'width'), ('l', 'length')):
+            instance = getattr(element, attribute, None)
+            if instance is not None:
+                values[name] = spice_float(instance)
+        values['m'] = spice_float(getattr(element, 'multiplier', None) or 1)
+        values['polarity'] = -1.0 if str(model.model_type).lower() == 'pmos' else 1.0
+        values['model'] = str(element.model)
+        return values
+
+    def _resolve(self, target):
+        """(element name, parameter) pairs a candidate value applies to."""
+        if '.' in target:
+            owner, parameter = target.rsplit('.', 1)
+            parameter = parameter.rstrip('_').lower()
+            parameter = {'width': 'w', 'length': 'l', 'multiplier': 'm'}.get(parameter, parameter)
+            if owner in self.circuit._models:
+                pairs = [(name, parameter) for name in self.devices
+                         if self.elements[name][2]['model'] == owner
+                         and not (parameter in ('w', 'l') and self._instance_set(name, parameter))]
+                return pairs
+            name = find_element(self.circuit, owner).name
+            return [(name, parameter)] if name in self.elements else []
+        element = find_element(self.circuit, target)
+        name = element.name
+        if type(element).__name__ in ('Capacitor', 'Inductor'):
+            # Capacitance and inductance do not change the DC solution
+            return []
+        kind, _, values = self.elements[name]
+        return [(name, next(iter(values)))]
+
+    def _instance_set(self, name, parameter):
+        element = find_element(self.circuit, name)
+        return getattr(element, {'w': 'width', 'l': 'length'}[parameter], None) is not None
+
+    def _parameters(self, values, count):
+        """{element: {parameter: (candidates,) array}} with the candidate values applied."""
+        parameters = {name: {key: np.full(count, value) for key, value in element[2].items() if key != 'model'}
+                      for name, element in self.elements.items()}
+        for target, value in (values or {}).items():
+            value = np.broadcast_to(np.asarray(value, dtype=np.float64), (count,))
+            for name, parameter in self._resolve(target):
+                parameters[name][parameter] = value
+        return parameters
+
+    def _stamp(self, x, parameters, scale):
+        """Jacobian (K x n x n) and residual (K x n) of the MNA equations at x."""
+        count = x.shape[0]
+        n_nodes = len(self.node_names)
+        jacobian = np.zeros((count, self.size, self.size))
+        residual = np.zeros((count, self.size))
+        diagonal = np.arange(n_nodes)
+        jacobian[:, diagonal, diagonal] += GMIN
+        residual[:, :n_nodes] += GMIN * x[:, :n_nodes]
+
+        def voltage(pin):
+            return x[:, pin] if pin >= 0 else np.zeros(count)
+
+        def add(row, column, value):
+            if row >= 0 and column >= 0:
+                jacobian[:, row, column] += value
+
+        def inject(row, value):
+            if row >= 0:
+                residual[:, row] += value
+
+        source_row = n_nodes
+        for name, (kind, pins, _) in self.elements.items():
+            p = parameters[name]
+            if kind == 'Resistor':
+                a, b = pins
+                g = 1 / p['resistance']
+                current = g * (voltage(a) - voltage(b))
+                add(a, a, g), add(b, b, g), add(a, b, -g), add(b, a, -g)
+                inject(a, current), inject(b, -current)
+            elif kind == 'CurrentSource':
+                # Current flows from the first node through the source into the second
+                a, b = pins
+                inject(a, scale * p['dc']), inject(b, -scale * p['dc'])
+            elif kind == 'VoltageSource':
+                a, b = pins
+                current = x[:, source_row]
+                add(a, source_row, 1), add(b, source_row, -1)
+                inject(a, current), inject(b, -current)
+                add(source_row, a, 1), add(source_row, b, -1)
+                residual[:, source_row] += voltage(a) - voltage(b) - scale * p['dc']
+                source_row += 1
+            elif kind == 'Mosfet':
+                current, derivatives = self._mosfet(p, [voltage(pin) for pin in pins])
+                d, s = pins[0], pins[2]
+                for column, derivative in zip(pins, derivatives):
+                    add(d, column, derivative), add(s, column, -derivative)
+                inject(d, current), inject(s, -current)
+                # Leakage across the channel keeps cut-off devices from leaving nodes floating
+                add(d, d, GMIN), add(s, s, GMIN), add(d, s, -GMIN), add(s, d, -GMIN)
+                leak = GMIN * (voltage(d) - voltage(s))
+                inject(d, leak), inject(s, -leak)
+        return jacobian, residual
+
+    @staticmethod
+    def _mosfet(p, terminals):
+        """Drain current (into the drain) and its derivatives w.r.t. (vd, vg, vs, vb)."""
+        vd, vg, vs, vb = terminals
+        polarity = p['polarity']
+        beta = p['kp'] * p['w'] / p['l'] * p['m']
+        vth0 = polarity * p['vto']
+        reverse = polarity * (vd - vs) < 0
+        # In reverse mode the physical drain acts as the source
+        source = np.where(reverse, vd, vs)
+        drain = np.where(reverse, vs, vd)
+        ids, gm, gds, gmbs, _ = _square_law(polarity * (vg - source), polarity * (drain - source),
+                                            polarity * (vb - source), beta, vth0, p['lambda'], p['gamma'], p['phi'])
+        # Partials of polarity * ids w.r.t. (drain, gate, source, bulk) of the oriented device
+        g_source = -(gm + gds + gmbs)
+        sign = np.where(reverse, -1.0, 1.0)
+        current = sign * polarity * ids
+        d_vd = sign * np.where(reverse, g_source, gds)
+        d_vs = sign * np.where(reverse, gds, g_source)
+        return current, (d_vd, sign * gm, d_vs, sign * gmbs)
+
+    def _newton(self, x, parameters, scale):
+        """Damped Newton iterations; returns (x, converged mask)."""
+        n_nodes = len(self.node_names)
+        converged = np.zeros(x.shape[0], dtype=bool)
+        for _ in range(MAX_ITERATIONS):
+            jacobian, residual = self._stamp(x, parameters, scale)
+            try:
+                step = np.linalg.solve(jacobian, -residual[..., np.newaxis])[..., 0]
+            except np.linalg.LinAlgError:
+                step = np.einsum('kij,kj->ki', np.linalg.pinv(jacobian), -residual)
+            largest = np.max(np.abs(step[:, :n_nodes]), axis=1, initial=0.0)
+            damping = np.minimum(1.0, MAX_STEP / np.maximum(largest, 1e-30))
+            x = x + damping[:, np.newaxis] * step
+            converged = largest < TOLERANCE
+            if converged.all():
+                break
+        return x, converged & np.all(np.isfinite(x), axis=1)
+
+    def solve(self, values=None, count=None):
+        """
+        Estimate the operating point of every candidate
+
+        Args:
+            values: {target: value or (candidates,) array} with targets as in
+                DesignVariable ('M1.w', 'NMOS.vto', 'Vbias_p', 'CA' ...);
+                None solves the circuit as it is
+            count: Number of candidates (default: the length of the value arrays)
+
+        Returns:
+            OperatingPoints
+        """
+        if count is None:
+            lengths = [np.size(value) for value in (values or {}).values()]
+            count = max(lengths) if lengths else 1
+        parameters = self._parameters(values, count)
+
+        x, converged = self._newton(np.zeros((count, self.size)), parameters, 1.0)
+        if not converged.all():
+            # Source stepping for the candidates a direct solve could not reach
+            retry = np.flatnonzero(~converged)
+            subset = {name: {key: value[retry] for key, value in p.items()} for name, p in parameters.items()}
+            x_retry = np.zeros((len(retry), self.size))
+            for scale in SOURCE_STEPS:
+                x_retry, ok = self._newton(x_retry, subset, scale)
+            x[retry] = x_retry
+            converged[retry] = ok
+
+        return self._operating_points(x, parameters, converged)
+
+    def _operating_points(self, x, parameters, converged):
+        count = x.shape[0]
+        shape = (count, len(self.devices))
+        vgs, vds, vth, current = (np.empty(shape) for _ in range(4))
+        for i, name in enumerate(self.devices):
+            p = parameters[name]
+            pins = self.elements[name][1]
+            vd, vg, vs, vb = (x[:, pin] if pin >= 0 else np.zeros(count) for pin in pins)
+            polarity = p['polarity']
+            reverse = polarity * (vd - vs) < 0
+            source = np.where(reverse, vd, vs)
+            drain = np.where(reverse, vs, vd)
+            beta = p['kp'] * p['w'] / p['l'] * p['m']
+            ids, _, _, _, threshold = _square_law(polarity * (vg - source), polarity * (drain - source),
+                                                  polarity * (vb - source), beta, polarity * p['vto'],
+                                                  p['lambda'], p['gamma'], p['phi'])
+            vgs[:, i] = polarity * (vg - source)
+            vds[:, i] = polarity * (drain - source)
+            vth[:, i] = threshold
+            current[:, i] = ids
+        return OperatingPoints(list(self.node_names), x[:, :len(self.node_names)], list(self.devices),
+                               vgs, vds, vth, current, converged)
+
+    def rails(self, values=None, count=1):
+        """(low, high) supply rails per candidate: the extreme voltage-source values and ground."""
+        parameters = self._parameters(values, count)
+        levels = [np.zeros(count)] + [parameters[name]['dc'] for name in self.sources]
+        levels = np.stack(levels, axis=1)
+        return levels.min(axis=1), levels.max(axis=1)
+
+    def check(self, op, values=None):
+        """
+        Count the obvious problems of every candidate
+
+        Non-convergence, every MOSFET in cutoff (except `allow_cutoff`) and
+        every output within `margin` of a rail count as one problem each.
+
+        Returns:
+            (candidates,) integer array; 0 means worth simulating
+        """
+        count = len(op.converged)
+        problems = (~op.converged).astype(np.int64)
+        checked = [i for i, name in enumerate(op.device_names) if name not in self.allow_cutoff]
+        problems += np.sum(op.region[:, checked] == CUTOFF, axis=1)
+        low, high = self.rails(values, count)
+        for node in self.outputs:
+            v = op[node]
+            problems += (v < low + self.margin) | (v > high - self.margin)
+        return problems
+
+    def __call__(self, candidates):
+        """
+        Problem counts for a list of {target: value} candidates (SizingOptimizer `prescreen`)
+
+        Returns:
+            (candidates,) integer array; 0 means worth simulating
+        """
+        values = {}
+        for target in (candidates[0] if candidates else {}):
+            values[target] = np.array([candidate[target] for candidate in candidates], dtype=np.float64)
+        op = self.solve(values, count=len(candidates))
+        return self.check(op, values)
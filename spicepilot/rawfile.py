@@ -0,0 +1,363 @@
+"""
+ngspice Rawfile I/O
+
+Batch-mode driver that has ngspice write binary rawfiles, and a reader that
+memory-maps them straight into NumPy arrays (no text parsing, no copies).
+Old ASCII logs produced with `ngspice -b ... -o results.txt` (see
+results/logs/opamp_kicad_test.log) can be read as well and converted to
+binary rawfiles.
+
+Usage:
+    plots = run_batch(str(simulator))            # list of Waveforms
+    plots = read_rawfile('results.raw')
+    plots = read_ascii_log('results/logs/opamp_kicad_test.log')
+    write_rawfile('opamp_kicad_test.raw', plots)
+
+    python -m spicepilot.rawfile results/logs/opamp_kicad_test.log opamp_kicad_test.raw
+"""
+
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from .waveforms import Waveforms
+
+# Plot name prefixes written by ngspice, mapped to PySpice analysis names
+PLOT_KINDS = (
+    ('operating point', 'operating_point'),
+    ('dc transfer', 'dc'),
+    ('ac analysis', 'ac'),
+    ('transient analysis', 'transient'),
+    ('noise', 'noise'),
+)
+
+# Abscissa column names, mapped to analysis names
+SCALE_KINDS = {
+    'time': 'transient',
+    'frequency': 'ac',
+    'v-sweep': 'dc',
+    'i-sweep': 'dc',
+    'temp-sweep': 'dc',
+    'res-sweep': 'dc',
+}
+
+
+def _plot_kind(plot_name):
+    lower = plot_name.lower()
+    for prefix, kind in PLOT_KINDS:
+        if lower.startswith(prefix):
+            return kind
+    return lower.split()[0] if lower else 'unknown'
+
+
+def _simplify(name, var_type):
+    """Turn 'v(vout)' / 'i(vdd)' / 'vdd#branch' into the PySpice vector name."""
+    lower = name.lower()
+    if lower.endswith('#branch'):
+        return name[:-len('#branch')], 'current'
+    if (lower.startswith('v(') or lower.startswith('i(')) and lower.endswith(')'):
+        inner = name[2:-1]
+        return inner, 'current' if lower[0] == 'i' else 'voltage'
+    return name, var_type
+
+
+def _to_waveforms(kind, variables, columns):
+    """Build Waveforms from (name, type) pairs and matching column arrays."""
+    nodes = {}
+    branches = {}
+    abscissa_name = abscissa = None
+    start = 0
+    if kind in ('dc', 'ac', 'transient') and variables:
+        abscissa_name = {'dc': 'sweep', 'ac': 'frequency', 'transient': 'time'}[kind]
+        abscissa = columns[0].real
+        start = 1
+    for (name, var_type), column in zip(variables[start:], columns[start:]):
+        if kind == 'operating_point':
+            column = column.reshape(())
+        name, var_type = _simplify(name, var_type)
+        if var_type == 'current':
+            branches[name] = column
+        else:
+            nodes[name] = column
+    return Waveforms(kind, nodes, branches, abscissa_name, abscissa)
+
+
+def read_rawfile(path):
+    """
+    Read every plot in an ngspice rawfile
+
+    Binary data is memory-mapped; each vector is a strided view into the
+    mapped file. ASCII rawfiles ('Values:' section) are parsed as text.
+
+    Returns:
+        List of Waveforms, one per plot, in file order
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    plots = []
+
+    with open(path, 'rb') as f:
+        while f.tell() < size:
+            header = {}
+            variables = []
+            section = None
+            while True:
+                line = f.readline()
+                if not line:
+                    break
+                text = line.decode('latin-1').rstrip('\r\n')
+                if text.startswith('Binary:') or text.startswith('Values:'):
+                    section = text[:-1]
+                    break
+                if text.startswith('Variables:'):
+                    for _ in range(int(header['No. Variables'])):
+                        fields = f.readline().decode('latin-1').split()
+                        variables.append((fields[1], fields[2] if len(fields) > 2 else ''))
+                    continue
+                if ':' in text:
+                    key, value = text.split(':', 1)
+                    header[key.strip()] = value.strip()
+
+            if section is None:
+                break
+
+            kind = _plot_kind(header.get('Plotname', ''))
+            flags = header.get('Flags', 'real').lower()
+            is_complex = 'complex' in flags
+            number_of_variables = len(variables)
+            number_of_points = int(header.get('No. Points', 0))
+            dtype = np.dtype('<c16' if is_complex else '<f8')
+
+            if section == 'Binary':
+                offset = f.tell()
+                row_bytes = dtype.itemsize * number_of_variables
+                # ngspice may stop early (e.g. aborted transient): trust the file size
+                number_of_points = min(number_of_points, (size - offset) // row_bytes)
+                if number_of_points > 0:
+                    data = np.memmap(path, dtype=dtype, mode='r', offset=offset,
+                                     shape=(number_of_points, number_of_variables))
+                else:
+                    data = np.empty((0, number_of_variables), dtype=dtype)
+                f.seek(offset + number_of_points * row_bytes)
+            else:
+                data = _read_ascii_values(f, number_of_points, number_of_variables, dtype)
+
+            columns = [data[:, i] for i in range(number_of_variables)]
+            plots.append(_to_waveforms(kind, variables, columns))
+
+    return plots
+
+
+def _read_ascii_values(f, number_of_points, number_of_variables, dtype):
+    """Parse the 'Values:' section of an ASCII rawfile."""
+    data = np.empty((number_of_points, number_of_variables), dtype=dtype)
+    for point in range(number_of_points):
+        for variable in range(number_of_variables):
+            fields = f.readline().decode('latin-1').split()
+            token = fields[-1] if variable else fields[1]
+            if ',' in token:
+                real, imag = token.split(',')
+                data[point, variable] = complex(float(real), float(imag))
+            else:
+                data[point, variable] = float(token)
+    return data
+
+
+def write_rawfile(path, plots, title='SPICEPilot'):
+    """
+    Write Waveforms as a binary ngspice rawfile
+
+    Args:
+        path: Output .raw file
+        plots: Iterable of Waveforms
+        title: Title line written in each plot header
+    """
+    names = {'operating_point': 'Operating Point', 'dc': 'DC transfer characteristic',
+             'ac': 'AC Analysis', 'transient': 'Transient Analysis', 'noise': 'Noise Spectral Density Curves'}
+    scale_names = {'sweep': 'v-sweep', 'frequency': 'frequency', 'time': 'time'}
+
+    with open(path, 'wb') as f:
+        for plot in plots:
+            columns = []
+            variables = []
+            if plot.abscissa is not None:
+                scale_type = {'time': 'time', 'frequency': 'frequency'}.get(plot.abscissa_name, 'voltage')
+                variables.append((scale_names.get(plot.abscissa_name, plot.abscissa_name), scale_type))
+                columns.append(np.atleast_1d(plot.abscissa))
+            for name, values in plot.nodes.items():
+                variables.append((f'v({name})', 'voltage'))
+                columns.append(np.atleast_1d(values))
+            for name, values in plot.branches.items():
+                variables.append((f'i({name})', 'current'))
+                columns.append(np.atleast_1d(values))
+
+            is_complex = any(np.iscomplexobj(column) for column in columns)
+            dtype = np.dtype('<c16' if is_complex else '<f8')
+            number_of_points = len(columns[0]) if columns else 0
+
+            lines = [
+                f'Title: {title}',
+                f'Plotname: {names.get(plot.analysis, plot.analysis)}',
+                f'Flags: {"complex" if is_complex else "real"}',
+                f'No. Variables: {len(variables)}',
+                f'No. Points: {number_of_points}',
+                'Variables:',
+            ]
+            lines += [f'\t{i}\t{name}\t{var_type}' for i, (name, var_type) in enumerate(variables)]
+            lines.append('Binary:')
+            f.write(('\n'.join(lines) + '\n').encode('latin-1'))
+
+            data = np.empty((number_of_points, len(variables)), dtype=dtype)
+            for i, column in enumerate(columns):
+                data[:, i] = column
+            data.tofile(f)
+
+
+_ROWS = re.compile(r'^No\. of Data Rows\s*:\s*(\d+)')
+_HEADER = re.compile(r'^Index\s+(.+)$')
+_ASSIGN = re.compile(r'^\s*(\S+)\s*=\s*(\S+)\s*$')
+
+
+def read_ascii_log(path):
+    """
+    Read the `print` output of an ngspice batch log (`ngspice -b ... -o log`)
+
+    Operating point sections ('name = value') and tabular sections (split
+    over pages and column groups) are both recognised.
+
+    Returns:
+        List of Waveforms, one per analysis, in log order
+    """
+    with open(path, encoding='utf-8', errors='replace') as f:
+        lines = f.read().replace('\f', '\n').splitlines()
+
+    plots = []
+    i = 0
+    while i < len(lines):
+        match = _ROWS.match(lines[i])
+        if not match:
+            i += 1
+            continue
+        number_of_rows = int(match.group(1))
+        i += 1
+
+        # Operating point: a run of 'name = value' lines
+        values = {}
+        while i < len(lines) and _ASSIGN.match(lines[i]):
+            name, value = _ASSIGN.match(lines[i]).groups()
+            values[name] = float(value)
+            i += 1
+        if values:
+            variables = [(name, 'voltage') for name in values]
+            columns = [np.array([value]) for value in values.values()]
+            plots.append(_to_waveforms('operating_point', variables, columns))
+            continue
+
+        # Tables: repeated 'Index <columns>' headers until the next section
+        columns = {}
+        order = []
+        current = None
+        while i < len(lines) and not _ROWS.match(lines[i]):
+            line = lines[i]
+            header = _HEADER.match(line)
+            if header:
+                current = header.group(1).split()
+                for name in current:
+                    if name not in columns:
+                        columns[name] = []
+                        order.append(name)
+            elif current and line[:1].isdigit():
+                tokens = line.replace(',', ', ').split()
+                k = 1
+                for name in current:
+                    token = tokens[k]
+                    if token.endswith(','):
+                        value = complex(float(token[:-1]), float(tokens[k + 1]))
+                        k += 2
+                    else:
+                        value = float(token)
+                        k += 1
+                    column = columns[name]
+                    if len(column) < number_of_rows:
+                        column.append(value)
+            i += 1
+
+        if not order:
+            continue
+        kind = SCALE_KINDS.get(order[0].lower(), 'unknown')
+        variables = [(name, 'voltage') for name in order]
+        arrays = [np.array(columns[name]) for name in order]
+        plots.append(_to_waveforms(kind, variables, arrays))
+
+    return plots
+
+
+def run_batch(deck, rawfile=None, ngspice='ngspice', timeout=None, log=None):
+    """
+    Run ngspice in batch mode and load its binary rawfile
+
+    Args:
+        deck: Netlist text (e.g. `str(simulator)`) or a Path to a .cir file
+        rawfile: Where to keep the rawfile (default: a temporary file, deleted after loading)
+        ngspice: ngspice executable
+        timeout: Wall-time limit in seconds
+        log: Optional path for ngspice's text output
+
+    Returns:
+        List of Waveforms, one per analysis plot
+    """
+    with tempfile.TemporaryDirectory(prefix='spicepilot_') as workdir:
+        if isinstance(deck, os.PathLike):
+            netlist = Path(deck)
+        else:
+            netlist = Path(workdir) / 'deck.cir'
+            netlist.write_text(str(deck))
+
+        keep = rawfile is not None
+        raw_path = Path(rawfile) if keep else Path(workdir) / 'deck.raw'
+        log_path = Path(log) if log is not None else Path(workdir) / 'deck.log'
+
+        env = dict(os.environ)
+        env.pop('SPICE_ASCIIRAWFILE', None)   # binary is ngspice's default
+        command = [ngspice, '-b', '-r', str(raw_path), '-o', str(log_path), str(netlist)]
+        result = subprocess.run(command, env=env, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                timeout=timeout)
+        if result.returncode != 0 or not raw_path.exists():
+            message = log_path.read_text(errors='replace') if log_path.exists() else ''
+            raise RuntimeError(f"ngspice failed ({result.returncode}):\n{message[-2000:]}")
+
+        plots = read_rawfile(raw_path)
+        if not keep:
+            # The temporary rawfile disappears with the folder: detach from the map
+            plots = [_load_into_memory(plot) for plot in plots]
+    return plots
+
+
+def _load_into_memory(plot):
+    copy = np.array
+    return Waveforms(plot.analysis,
+                     {name: copy(v) for name, v in plot.nodes.items()},
+                     {name: copy(v) for name, v in plot.branches.items()},
+                     plot.abscissa_name,
+                     None if plot.abscissa is None else copy(plot.abscissa))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Usage: python -m spicepilot.rawfile <ngspice log> <output.raw>")
+        return 1
+    plots = read_ascii_log(argv[0])
+    write_rawfile(argv[1], plots)
+    print(f"✓ Converted {len(plots)} analyses: {argv[0]} -> {argv[1]}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,441 @@
+"""
+Sandboxed Script Execution
+
+Runs LLM-generated PySpice scripts for validation: many at once, each in
+its own interpreter with CPU-time, memory and wall-time limits, plotting
+disabled and a throwaway working directory. Every job reports what the
+script actually did, not just whether it exited cleanly:
+
+    with Sandbox(jobs=8) as sandbox:
+        results = sandbox.run(['gen/opamp_v1.py', ('opamp_v2', generated_source)])
+    results[0].status          # 'pass', 'fail' or 'timeout'
+    results[0].analyses        # [{'analysis': 'ac', 'error': ''}, ...]
+    results[0].netlist         # the last simulated (or defined) circuit
+    results[0].exception       # 'NameError', 'MemoryError', 'CPUTimeExceeded', ...
+
+Interpreters are started ahead of time with PySpice, NumPy and matplotlib
+already imported, so a job only pays for its own code; each interpreter
+runs exactly one script, then exits, so no state leaks between scripts.
+With `fork_server=True` (Linux/macOS) the scripts are forked from one
+zygote that also has ngspice loaded (spicepilot.forkserver) instead, which
+starts each job in milliseconds.
+
+Usage:
+    python -m spicepilot.sandbox generated/*.py --jobs 8 --json results/validation.json
+"""
+
+import argparse
+import json
+import os
+import queue
+import runpy
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from .benchmark import FAILURE_PATTERN, _last_error, _wait, headless_env
+
+try:
+    import resource
+except ImportError:   # Windows: only the wall-time limit applies
+    resource = None
+
+# Imported by every warm interpreter before it receives a job
+PREIMPORTS = ('numpy', 'PySpice.Spice.Netlist', 'PySpice.Unit', 'matplotlib.pyplot')
+
+# CircuitSimulator methods that run an analysis
+ANALYSIS_METHODS = ('operating_point', 'dc', 'dc_sensitivity', 'ac', 'ac_sensitivity', 'transient',
+                    'noise', 'distortion', 'pole_zero', 'polezero', 'transfer_function', 'tf')
+
+RESULT_FILE = 'sandbox_result.json'
+LOG_FILE = 'output.log'
+
+
+@dataclass
+class SandboxLimits:
+    """Per-script resource limits."""
+    wall_time: float = 60.0      # seconds, enforced by the parent
+    cpu_time: float = 60.0       # seconds of CPU, on top of the warm interpreter's start-up
+    memory_mb: float = 1024.0    # MB of address space, on top of the warm interpreter
+
+
+@dataclass
+class SandboxResult:
+    """What one generated script did."""
+    name: str
+    status: str                  # 'pass', 'fail' or 'timeout'
+    returncode: int
+    wall_time: float             # seconds
+    peak_rss_mb: float           # None where the platform cannot report it
+    exception: str = ''          # class of the first uncaught or simulation exception
+    message: str = ''
+    analyses: list = field(default_factory=list)   # {'analysis': name, 'error': exception class or ''}
+    netlist: str = ''
+    error: str = ''              # most informative failure line of the output
+
+
+# -- Worker side ------------------------------------------------------------
+
+def _record_simulations(records, netlists):
+    """Wrap PySpice's CircuitSimulator so every analysis the script runs is recorded."""
+    from PySpice.Spice.Simulation import CircuitSimulator
+
+    run = CircuitSimulator._run
+
+    def recording_run(self, analysis_method, *args, **kwargs):
+        result = run(self, analysis_method, *args, **kwargs)
+        netlists.append(str(self.circuit))
+        return result
+
+    CircuitSimulator._run = recording_run
+
+    def wrap(name, method):
+        def recording_method(self, *args, **kwargs):
+            record = {'analysis': name, 'error': ''}
+            records.append(record)
+            try:
+                return method(self, *args, **kwargs)
+            except BaseException as exception:
+                record['error'] = type(exception).__name__
+                raise
+        return recording_method
+
+    for name in ANALYSIS_METHODS:
+        method = CircuitSimulator.__dict__.get(name)
+        if method is not None:
+            setattr(CircuitSimulator, name, wrap(name, method))
+
+
+def _apply_limits(cpu_time, memory_mb):
+    """Limit the remaining CPU time and additional address space of this process."""
+    if resource is None:
+        return
+    if cpu_time:
+        used = resource.getrusage(resource.RUSAGE_SELF)
+        limit = int(used.ru_utime + used.ru_stime + cpu_time) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, limit + 1))
+    if memory_mb:
+        current = 0
+        try:
+            with open('/proc/self/statm') as f:
+                current = int(f.read().split()[0]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            pass
+        limit = current + int(memory_mb * 2**20)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _defined_netlist(namespace):
+    """Netlist of the last Circuit defined at the script's top level, or ''."""
+    try:
+        from PySpice.Spice.Netlist import Circuit
+    except ImportError:
+        return ''
+    circuits = [value for value in namespace.values() if isinstance(value, Circuit)]
+    return str(circuits[-1]) if circuits else ''
+
+
+def execute(job):
+    """
+    Run one job in this (already limited) process and write its result file
+
+    Args:
+        job: {'script': path, 'workdir': path, 'cpu_time': s, 'memory_mb': MB}
+    """
+    workdir = job['workdir']
+    result_path = os.path.join(workdir, RESULT_FILE)
+    log = os.open(os.path.join(workdir, LOG_FILE), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    os.dup2(log, 1)
+    os.dup2(log, 2)
+    os.close(log)
+    os.chdir(workdir)
+
+    records, netlists = [], []
+    try:
+        _record_simulations(records, netlists)
+    except ImportError:
+        pass
+    script = job['script']
+    sys.argv = [script]
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+
+    namespace = {}
+    exception = message = ''
+    returncode = 0
+    _apply_limits(job.get('cpu_time'), job.get('memory_mb'))
+    try:
+        namespace = runpy.run_path(script, run_name='__main__')
+    except SystemExit as exit:
+        if exit.code not in (None, 0):
+            exception, message = 'SystemExit', str(exit.code)
+            returncode = exit.code if isinstance(exit.code, int) else 1
+    except BaseException as error:
+        exception, message = type(error).__name__, str(error)[:500]
+        traceback.print_exc()
+        returncode = 1
+        namespace = {}
+
+    try:
+        netlist = netlists[-1] if netlists else _defined_netlist(namespace)
+    except Exception:
+        netlist = ''
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except Exception:
+        pass
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump({'exception': exception, 'message': message, 'analyses': records, 'netlist': netlist}, f)
+    return returncode
+
+
+def _preimport(modules):
+    for module in modules:
+        try:
+            __import__(module)
+        except Exception:
+            pass
+
+
+def worker_main(preimports=PREIMPORTS):
+    """Warm interpreter: import the heavy modules, wait for one job on stdin, run it, exit."""
+    _preimport(preimports)
+    sys.stdout.write('ready\n')
+    sys.stdout.flush()
+    line = sys.stdin.readline()
+    if not line:
+        return 0
+    return execute(json.loads(line))
+
+
+# -- Parent side ------------------------------------------------------------
+
+def _status(timed_out, returncode, output, report):
+    if timed_out or (returncode < 0 and -returncode == getattr(signal, 'SIGXCPU', None)):
+        return 'timeout'
+    failed_analysis = any(record['error'] for record in report.get('analyses', ()))
+    if returncode != 0 or report.get('exception') or failed_analysis or FAILURE_PATTERN.search(output):
+        return 'fail'
+    return 'pass'
+
+
+class Sandbox:
+    """Pool of warm, single-use interpreters that run scripts under resource limits."""
+
+    def __init__(self, jobs=None, limits=None, plots=False, preimports=PREIMPORTS, python=None, keep_dir=None,
+                 fork_server=False):
+        """
+        Args:
+            jobs: Concurrent scripts (default: CPU count)
+            limits: SandboxLimits (default: 60 s wall and CPU time, 1 GB)
+            plots: Let scripts save figures (default: every savefig is skipped)
+            preimports: Modules each warm interpreter imports before its job
+            python: Interpreter to use (default: the current one)
+            keep_dir: Folder to copy each job's working directory into (default: discard)
+            fork_server: Fork every script from one warm zygote instead of
+                keeping spare interpreters
+        """
+        self.jobs = jobs or os.cpu_count() or 1
+        self.limits = limits or SandboxLimits()
+        self.plots = plots
+        self.preimports = tuple(preimports)
+        self.python = python or sys.executable
+        self.keep_dir = keep_dir
+        self.fork_server = fork_server
+        self._server = None
+        self._spares = queue.Queue()
+        self._closed = False
+
+    def _spawn(self):
+        env = headless_env(plots=self.plots)
+        # One BLAS thread per job; the parallelism comes from the pool
+        env.setdefault('OPENBLAS_NUM_THREADS', '1')
+        env.setdefault('OMP_NUM_THREADS', '1')
+        return subprocess.Popen(
+            [self.python, '-c', 'import sys; from spicepilot.sandbox import worker_main; '
+                                f'sys.exit(worker_main({self.preimports!r}))'],
+            cwd=tempfile.gettempdir(),
+            env=env,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def warm_up(self):
+        """Start `jobs` interpreters (or the fork server) now so the first scripts find them ready."""
+        if self.fork_server:
+            if self._server is None:
+                from .forkserver import ForkServer
+                self._server = ForkServer(self.preimports, plots=self.plots, python=self.python)
+            return
+        while self._spares.qsize() < self.jobs:
+            self._spares.put(self._spawn())
+
+    def _take(self):
+        try:
+            process = self._spares.get_nowait()
+        except queue.Empty:
+            process = self._spawn()
+        if not self._closed:
+            # The replacement imports while this job runs
+            self._spares.put(self._spawn())
+        return process
+
+    def _prepare(self, script, workdir):
+        """(name, script path) for a path or a (name, source) pair."""
+        if isinstance(script, tuple):
+            name, source = script
+            path = os.path.join(workdir, f'{Path(name).stem}.py')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(source)
+            return Path(name).stem, path
+        path = Path(script).resolve()
+        return path.stem, str(path)
+
+    def run_one(self, script):
+        """
+        Run one script (a path or a (name, source) pair)
+
+        Returns:
+            SandboxResult
+        """
+        workdir = tempfile.mkdtemp(prefix='spicepilot_sandbox_')
+        try:
+            name, path = self._prepare(script, workdir)
+            job = {'script': path, 'workdir': workdir,
+                   'cpu_time': self.limits.cpu_time, 'memory_mb': self.limits.memory_mb}
+            if self.fork_server:
+                self.warm_up()
+                self._server.wait_ready()
+                start = time.perf_counter()
+                returncode, timed_out, peak_rss_mb = self._server.run(job, self.limits.wall_time)
+            else:
+                process = self._take()
+                # The wall-time limit starts once the interpreter has finished its imports
+                process.stdout.readline()
+                process.stdout.close()
+                start = time.perf_counter()
+                try:
+                    process.stdin.write((json.dumps(job) + '\n').encode())
+                    process.stdin.close()
+                except OSError:
+                    pass
+                returncode, timed_out, peak_rss_mb = _wait(process, self.limits.wall_time)
+            wall_time = time.perf_counter() - start
+            return self._collect(name, workdir, returncode, timed_out, wall_time, peak_rss_mb)
+        finally:
+            if self.keep_dir is not None:
+                shutil.copytree(workdir, Path(self.keep_dir) / Path(workdir).name, dirs_exist_ok=True)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _collect(self, name, workdir, returncode, timed_out, wall_time, peak_rss_mb):
+        try:
+            with open(os.path.join(workdir, LOG_FILE), encoding='utf-8', errors='replace') as f:
+                output = f.read()
+        except OSError:
+            output = ''
+        try:
+            with open(os.path.join(workdir, RESULT_FILE), encoding='utf-8') as f:
+                report = json.load(f)
+        except (OSError, ValueError):
+            report = {}
+
+        exception = report.get('exception', '')
+        if not exception:
+            failed = [record['error'] for record in report.get('analyses', ()) if record['error']]
+            if failed:
+                exception = failed[0]
+            elif returncode < 0 and -returncode == getattr(signal, 'SIGXCPU', None):
+                exception = 'CPUTimeExceeded'
+            elif timed_out:
+                exception = 'TimeoutExpired'
+        status = _status(timed_out, returncode, output, report)
+        error = _last_error(output) if status != 'pass' else ''
+        if timed_out:
+            error = f'exceeded {self.limits.wall_time}s'
+        elif exception == 'CPUTimeExceeded':
+            error = f'exceeded {self.limits.cpu_time}s of CPU time'
+        return SandboxResult(name, status, returncode, wall_time, peak_rss_mb, exception,
+                             report.get('message', ''), report.get('analyses', []),
+                             report.get('netlist', ''), error)
+
+    def run(self, scripts, progress=False):
+        """
+        Run scripts in parallel
+
+        Args:
+            scripts: Paths and/or (name, source) pairs
+            progress: Print one line per finished script
+
+        Returns:
+            List of SandboxResult, in the order of `scripts`
+        """
+        scripts = list(scripts)
+        self.warm_up()
+
+        def job(script):
+            result = self.run_one(script)
+            if progress:
+                print(f"[{result.status.upper():7s}] {result.name} ({result.wall_time:.2f}s)"
+                      f"{' ' + result.exception if result.exception else ''}")
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            return list(executor.map(job, scripts))
+
+    def close(self):
+        """Stop the idle warm interpreters and the fork server."""
+        self._closed = True
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        while True:
+            try:
+                process = self._spares.get_nowait()
+            except queue.Empty:
+                break
+            process.kill()
+            process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate generated PySpice scripts in a sandbox.')
+    parser.add_argument('scripts', nargs='+', help='Scripts to run')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='Concurrent scripts (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-script wall-time limit in seconds')
+    parser.add_argument('--cpu', type=float, default=60, help='Per-script CPU-time limit in seconds')
+    parser.add_argument('--memory', type=float, default=1024, help='Per-script memory limit in MB')
+    parser.add_argument('--plots', action='store_true', help='Let scripts save figures')
+    parser.add_argument('--fork-server', action='store_true',
+                        help='Fork every script from one warm zygote (Linux/macOS)')
+    parser.add_argument('--json', default=None, help='Write the structured results to this JSON file')
+    args = parser.parse_args(argv)
+
+    limits = SandboxLimits(args.timeout, args.cpu, args.memory)
+    with Sandbox(args.jobs, limits, plots=args.plots, fork_server=args.fork_server) as sandbox:
+        results = sandbox.run(args.scripts, progress=True)
+    passed = sum(result.status == 'pass' for result in results)
+    print(f"\n{passed}/{len(results)} passed")
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([asdict(result) for result in results], f, indent=2)
+        print(f"Results saved: {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
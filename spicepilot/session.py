@@ -0,0 +1,313 @@
+"""
+ngspice Session Pool
+
+Keeps a fixed number of warm NgSpiceShared instances alive and hands them
+out to callers, so repeated simulations skip loading and initialising the
+ngspice shared library every time.
+
+ngspice can only run several instances in one process if each one loads its
+own copy of the library (ngspice1.dll, ngspice2.dll, ... next to
+ngspice.dll). `clone_library()` creates those copies. A pool of size 1 works
+with the stock installation checked by verify_setup.py.
+"""
+
+import ctypes.util
+import os
+import queue
+import re
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from .rawfile import SCALE_KINDS
+from .waveforms import Waveforms
+
+# ngspice plot name prefixes (op1, ac2, tran1, ...), mapped to analysis names
+SHARED_PLOT_KINDS = {
+    'op': 'operating_point',
+    'dc': 'dc',
+    'ac': 'ac',
+    'tran': 'transient',
+    'noise': 'noise',
+}
+
+
+def _shared_class():
+    from PySpice.Spice.NgSpice.Shared import NgSpiceShared
+    return NgSpiceShared
+
+
+# Folders the dynamic loader searches when PySpice gives only a library name
+LOADER_DIRECTORIES = ('/usr/local/lib', '/usr/local/lib64', '/usr/lib', '/usr/lib64', '/lib', '/lib64',
+                      '/opt/homebrew/lib')
+
+
+def find_library_file(name):
+    """
+    Path of a shared library given as a path or as a bare name
+
+    On Linux and macOS PySpice's LIBRARY_PATH is a name (libngspice.so) that
+    only the dynamic loader resolves. The name and ctypes.util.find_library()'s
+    soname are looked up in LD_LIBRARY_PATH / DYLD_LIBRARY_PATH and the
+    usual library folders.
+
+    Raises:
+        FileNotFoundError: if no such file exists
+    """
+    path = Path(name)
+    if path.is_file():
+        return path.resolve()
+    names = [path.name]
+    found = ctypes.util.find_library(re.sub(r'^lib|\..*$', '', path.name))
+    if found:
+        if Path(found).is_file():
+            return Path(found).resolve()
+        names.append(found)
+    directories = []
+    for variable in ('LD_LIBRARY_PATH', 'DYLD_LIBRARY_PATH'):
+        directories += [entry for entry in os.environ.get(variable, '').split(os.pathsep) if entry]
+    directories += LOADER_DIRECTORIES
+    # Debian-style multiarch folders (/usr/lib/x86_64-linux-gnu, ...)
+    directories += [str(path) for path in sorted(Path('/usr/lib').glob('*-linux-gnu*'))]
+    for directory in directories:
+        for candidate in names:
+            path = Path(directory) / candidate
+            if path.is_file():
+                return path.resolve()
+    raise FileNotFoundError(f"ngspice library not found: {name}")
+
+
+def clone_library(size, directory, library=None):
+    """
+    Create per-instance copies of the ngspice shared library
+
+    Args:
+        size: Number of instances the pool will use
+        directory: Folder that receives ngspice1.dll, ngspice2.dll, ...
+        library: Path of the stock library (default: the one PySpice loads,
+            found with find_library_file())
+
+    Returns:
+        Path template that was installed as NgSpiceShared.LIBRARY_PATH
+    """
+    NgSpiceShared = _shared_class()
+    if library is None:
+        library = NgSpiceShared.LIBRARY_PATH.format('')
+    library = find_library_file(library)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # ngspice.dll -> ngspice{}.dll, libngspice.so -> libngspice{}.so
+    stem, suffix = library.name.split('.', 1)
+    new_template = str(directory / f'{stem}{{}}.{suffix}')
+
+    for ngspice_id in range(size):
+        target = Path(new_template.format(ngspice_id or ''))
+        if not target.exists():
+            shutil.copyfile(library, target)
+
+    NgSpiceShared.LIBRARY_PATH = new_template
+    return new_template
+
+
+def read_plot(session, plot_name=None):
+    """
+    Read one ngspice plot of a shared session as Waveforms
+
+    Args:
+        session: NgSpiceShared instance
+        plot_name: Plot to read, e.g. 'ac1' (default: the last plot)
+    """
+    if plot_name is None:
+        plot_name = session.last_plot
+    kind = SHARED_PLOT_KINDS.get(re.sub(r'\d+$', '', plot_name), 'unknown')
+
+    nodes = {}
+    branches = {}
+    abscissa_name = abscissa = None
+    for name, vector in session.plot(None, plot_name).items():
+        data = vector.to_waveform().as_ndarray()
+        if kind == 'operating_point':
+            data = data.reshape(())
+        if name.lower() in SCALE_KINDS:
+            abscissa_name = {'dc': 'sweep', 'ac': 'frequency', 'transient': 'time'}[SCALE_KINDS[name.lower()]]
+            abscissa = np.ascontiguousarray(data.real)
+        elif vector.is_voltage_node:
+            nodes[vector.simplified_name] = np.ascontiguousarray(data)
+        elif vector.is_branch_current:
+            branches[vector.simplified_name] = np.ascontiguousarray(data)
+    return Waveforms(kind, nodes, branches, abscissa_name, abscissa)
+
+
+def run_deck(session, deck):
+    """
+    Load a complete deck into a shared session, run it and read every plot
+
+    Returns:
+        {analysis name: Waveforms}
+    """
+    session.destroy()
+    session.remove_circuit()
+    session.load_circuit(deck)
+    try:
+        session.run()
+        results = {}
+        for plot_name in session.plot_names:
+            if plot_name != 'const':
+                waveforms = read_plot(session, plot_name)
+                results[waveforms.analysis] = waveforms
+        return results
+    finally:
+        session.destroy()
+        session.remove_circuit()
+
+
+_process_session = None
+
+
+def simulate_deck(deck):
+    """
+    Run a deck on this process's own ngspice instance (for pool workers)
+
+    Returns:
+        {analysis name: Waveforms}, or None if the simulation failed
+    """
+    global _process_session
+    try:
+        # Inside the try: a library that cannot load fails this deck, not the caller's batch
+        if _process_session is None:
+            _process_session = _shared_class().new_instance()
+        return run_deck(_process_session, deck)
+    except Exception:
+        return None
+
+
+# ngspice ids taken by pools; NgSpiceShared.new_instance() returns the cached
+# instance for an id, so two pools must never share one
+_pool_ids = set()
+_pool_ids_lock = threading.Lock()
+
+
+def _reserve_ids(size, first_id=None):
+    """Reserve `size` consecutive ngspice ids (the lowest free block if first_id is None)."""
+    with _pool_ids_lock:
+        if first_id is None:
+            first_id = 0
+            while any(first_id + i in _pool_ids for i in range(size)):
+                first_id += 1
+        ids = range(first_id, first_id + size)
+        taken = [ngspice_id for ngspice_id in ids if ngspice_id in _pool_ids]
+        if taken:
+            raise ValueError(f"ngspice id(s) {', '.join(map(str, taken))} already belong to another pool")
+        _pool_ids.update(ids)
+        return list(ids)
+
+
+class SessionPool:
+    """Pool of warm NgSpiceShared instances, handed out one caller at a time."""
+
+    def __init__(self, size=1, first_id=None):
+        """
+        Args:
+            size: Number of ngspice instances to keep alive
+            first_id: ngspice_id of the first instance (0 uses the stock
+                library); default: the lowest ids no other pool uses
+
+        Raises:
+            ValueError: if another pool already uses one of the ids
+        """
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+
+        NgSpiceShared = _shared_class()
+        self.ids = _reserve_ids(size, first_id)
+        try:
+            self._sessions = [NgSpiceShared.new_instance(ngspice_id=ngspice_id) for ngspice_id in self.ids]
+        except Exception:
+            with _pool_ids_lock:
+                _pool_ids.difference_update(self.ids)
+            raise
+        self._idle = queue.LifoQueue()
+        for session in self._sessions:
+            self._idle.put(session)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    @staticmethod
+    def reset(session):
+        """Drop all plots and loaded circuits so the next job starts clean."""
+        try:
+            session.destroy()
+        except Exception:
+            pass
+        try:
+            session.remove_circuit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def session(self, timeout=None):
+        """
+        Lease one warm ngspice instance
+
+        Args:
+            timeout: Seconds to wait for a free instance (None waits forever)
+
+        Yields:
+            NgSpiceShared instance, reset when the block exits
+        """
+        try:
+            session = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No idle ngspice session available") from None
+        try:
+            yield session
+        finally:
+            self.reset(session)
+            self._idle.put(session)
+
+    def simulate(self, circuit, analysis, *args,
+                 temperature=25, nominal_temperature=25, options=None, **kwargs):
+        """
+        Run one analysis on a leased session
+
+        Args:
+            circuit: PySpice Circuit object
+            analysis: Analysis method name ('operating_point', 'ac', 'dc', 'transient', ...)
+            *args, **kwargs: Passed to the analysis method
+            temperature: Simulation temperature in degrees C
+            nominal_temperature: Model nominal temperature in degrees C
+            options: Optional dict of simulator `.options`
+
+        Returns:
+            The PySpice analysis object
+        """
+        with self.session() as session:
+            simulator = circuit.simulator(temperature=temperature,
+                                          nominal_temperature=nominal_temperature,
+                                          simulator='ngspice-shared',
+                                          ngspice_shared=session)
+            if options:
+                simulator.options(**options)
+            return getattr(simulator, analysis)(*args, **kwargs)
+
+
+_default_pool = None
+_default_lock = threading.Lock()
+
+
+def default_pool():
+    """Return the process-wide pool, creating it on first use.
+
+    The size comes from SPICEPILOT_SESSIONS (default 1).
+    """
+    global _default_pool
+    with _default_lock:
+        if _default_pool is None:
+            _default_pool = SessionPool(size=int(os.environ.get('SPICEPILOT_SESSIONS', '1')))
+        return _default_pool
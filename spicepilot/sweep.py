@@ -0,0 +1,317 @@
+"""
+DC Sweep Engine
+
+Runs a whole parameter sweep in a single ngspice session instead of
+rebuilding the netlist and restarting the simulator for every point.
+
+Uniformly spaced sweeps are emitted as one native `.dc` analysis. Arbitrary
+point lists fall back to an `alter` + `op` loop inside one loaded circuit.
+Either way the result is a single NumPy matrix with one row per sweep point
+and one column per node.
+
+OperatingPointSequence solves a series of nearby operating points (sweep
+points, optimiser candidates) and seeds each one with the previous
+solution as `.nodeset` (and optionally `.ic`) hints. Only when a point still
+fails is it retried cold and then with source stepping, instead of running
+every point with blanket `itl1` / `gmin` overrides.
+"""
+
+import numpy as np
+
+from .cache import analysis_deck
+from .session import run_deck
+from .template import TEMPERATURE, DeckTemplate
+
+# Last-resort retry: skip the direct Newton attempt and step the sources up
+FALLBACK_FLAGS = ('noopiter',)
+FALLBACK_OPTIONS = {'srcsteps': 50}
+
+
+class SweepResult:
+    """Node voltages of a sweep, stored as one (points x nodes) matrix."""
+
+    __slots__ = ('sweep', 'names', 'matrix')
+
+    def __init__(self, sweep, names, matrix):
+        self.sweep = sweep
+        self.names = list(names)
+        self.matrix = matrix
+
+    def __len__(self):
+        return len(self.sweep)
+
+    def __getitem__(self, name):
+        """Return the column for a node (case-insensitive, as ngspice lowercases names)."""
+        try:
+            index = self.names.index(name)
+        except ValueError:
+            index = self.names.index(str(name).lower())
+        return self.matrix[:, index]
+
+    def as_dict(self):
+        """Return {node name: column} views into the matrix."""
+        return {name: self.matrix[:, i] for i, name in enumerate(self.names)}
+
+
+def _uniform_step(values):
+    """Return the step if `values` is an evenly spaced ramp, else None."""
+    if len(values) < 2:
+        return None
+    steps = np.diff(values)
+    step = steps[0]
+    if step == 0 or not np.allclose(steps, step, rtol=1e-9, atol=0):
+        return None
+    return step
+
+
+def _select_nodes(names, nodes):
+    """Return column indices for the requested nodes (all nodes if None)."""
+    if nodes is None:
+        return list(range(len(names)))
+    lookup = {name.lower(): i for i, name in enumerate(names)}
+    try:
+        return [lookup[str(node).lower()] for node in nodes]
+    except KeyError as e:
+        raise KeyError(f"Node {e.args[0]} not found in sweep results") from None
+
+
+def _native_dc_sweep(simulator, source, values, step):
+    """Run one `.dc` analysis covering `values` and return (sweep, names, matrix)."""
+    start = float(values[0])
+    stop = float(values[-1])
+    analysis = simulator.dc(**{source: slice(start, stop, float(step))})
+
+    sweep = analysis.sweep.as_ndarray()
+    names = list(analysis.nodes.keys())
+    matrix = np.empty((len(sweep), len(names)), dtype=np.float64)
+    for i, name in enumerate(names):
+        matrix[:, i] = analysis.nodes[name].as_ndarray().real
+
+    # ngspice decides the last point with its own rounding, so re-grid onto
+    # the requested values if the point count does not line up exactly.
+    if len(sweep) != len(values) or not np.allclose(sweep, values):
+        order = np.argsort(sweep)
+        matrix = np.stack([np.interp(values, sweep[order], matrix[order, i])
+                           for i in range(len(names))], axis=1)
+        sweep = np.asarray(values, dtype=np.float64)
+
+    return sweep, names, matrix
+
+
+def _alter_sweep(simulator, source, values):
+    """Sweep arbitrary points with `alter` + `op` on one loaded circuit."""
+    ngspice = simulator.ngspice
+    ngspice.destroy()
+    ngspice.load_circuit(str(simulator))
+
+    # The temperature is an option of the loaded circuit, not an element
+    if source.lower() == TEMPERATURE:
+        command = 'option temp='
+    else:
+        command = f'alter {source.lower()} = '
+    names = None
+    matrix = None
+    try:
+        for row, value in enumerate(values):
+            ngspice.exec_command(command + repr(float(value)))
+            ngspice.exec_command('op')
+            plot_name = ngspice.last_plot
+            if plot_name == 'const':
+                raise RuntimeError(f"Operating point failed at {source} = {value}")
+
+            plot = ngspice.plot(simulator, plot_name)
+            vectors = {vector.simplified_name: vector for vector in plot.values()
+                       if vector.is_voltage_node}
+            if names is None:
+                names = list(vectors.keys())
+                matrix = np.empty((len(values), len(names)), dtype=np.float64)
+            for i, name in enumerate(names):
+                matrix[row, i] = vectors[name].to_waveform().as_ndarray().real[0]
+            ngspice.destroy(plot_name)
+    finally:
+        ngspice.remove_circuit()
+
+    return np.asarray(values, dtype=np.float64), names, matrix
+
+
+def _set_value(circuit, name, value):
+    """Set the main value of a source, resistor, capacitor or inductor; return the old one."""
+    element = circuit[name]
+    for attribute in ('dc_value', 'resistance', 'capacitance', 'inductance'):
+        if hasattr(element, attribute):
+            previous = getattr(element, attribute)
+            setattr(element, attribute, value)
+            return attribute, previous
+    raise TypeError(f"Don't know how to set the value of {name}")
+
+
+class OperatingPointSequence:
+    """
+    Operating points of one circuit at a series of nearby parameter values
+
+    Every converged solution becomes the `.nodeset` hint of the next call.
+    A point that fails is retried without hints and then with source
+    stepping (FALLBACK_OPTIONS) before giving up.
+    """
+
+    def __init__(self, circuit, temperature=25, nominal_temperature=25, session=None,
+                 hints='nodeset', **options):
+        """
+        Args:
+            circuit: PySpice Circuit object (restored after every point)
+            temperature: Simulation temperature in degrees C
+            nominal_temperature: Model nominal temperature in degrees C
+            session: NgSpiceShared instance (default: a new shared instance)
+            hints: 'nodeset', 'ic', 'both' or None
+            **options: Extra simulator `.options`
+        """
+        self.circuit = circuit
+        self.temperature = temperature
+        self.nominal_temperature = nominal_temperature
+        self.hints = hints
+        self.options = options
+        self._session = session
+        self.previous = None      # {node: voltage} of the last converged point
+        self.fallbacks = 0        # points that needed source stepping
+        self._templates = {}      # targets -> DeckTemplate
+
+    @property
+    def session(self):
+        if self._session is None:
+            from PySpice.Spice.NgSpice.Shared import NgSpiceShared
+            self._session = NgSpiceShared.new_instance()
+        return self._session
+
+    def deck(self, values=None, hints=None, fallback=False):
+        """Operating point deck with `values` ({element or 'temp': value}) applied."""
+        if not fallback and (not hints or self.hints == 'nodeset'):
+            # Common path: the same elements change at every point, so patch a template
+            key = tuple(values or ())
+            template = self._templates.get(key)
+            if template is None:
+                template = self._templates[key] = DeckTemplate(
+                    self.circuit, list(key), 'operating_point', self.temperature,
+                    self.nominal_temperature, self.options, node_set=True)
+            return template.render(values, node_set=hints)
+        values = dict(values or {})
+        temperature = values.pop('temp', self.temperature)
+        saved = []
+        try:
+            for name, value in values.items():
+                saved.append((name,) + _set_value(self.circuit, name, value))
+            simulator = self.circuit.simulator(temperature=temperature,
+                                               nominal_temperature=self.nominal_temperature,
+                                               simulator='ngspice-subprocess')
+            if self.options:
+                simulator.options(**self.options)
+            if fallback:
+                simulator.options(*FALLBACK_FLAGS, **FALLBACK_OPTIONS)
+            if hints:
+                if self.hints in ('nodeset', 'both'):
+                    simulator.node_set(**hints)
+                if self.hints in ('ic', 'both'):
+                    simulator.initial_condition(**hints)
+            return analysis_deck(simulator, 'operating_point')
+        finally:
+            for name, attribute, previous in reversed(saved):
+                setattr(self.circuit[name], attribute, previous)
+
+    def solve(self, values=None):
+        """
+        Solve the operating point at `values`, warm-started from the previous call
+
+        Args:
+            values: {element name or 'temp': value}, e.g. {'Vdd': 1.1}
+
+        Returns:
+            Waveforms of the operating point
+        """
+        attempts = []
+        if self.previous and self.hints:
+            attempts.append((self.previous, False))
+        attempts += [(None, False), (None, True)]
+
+        session = self.session
+        for hints, fallback in attempts:
+            # Outside the try: unknown elements or attributes in `values` are the caller's error
+            deck = self.deck(values, hints, fallback)
+            try:
+                op = run_deck(session, deck).get('operating_point')
+            except Exception:
+                op = None
+            if op is not None and op.nodes:
+                self.fallbacks += fallback
+                self.previous = {name: float(value) for name, value in op.nodes.items()
+                                 if '#' not in name}
+                return op
+        raise RuntimeError(f"Operating point failed at {values}")
+
+    def reset(self):
+        """Forget the previous solution (the next point starts cold)."""
+        self.previous = None
+
+
+def _warm_start_sweep(circuit, source, values, temperature, nominal_temperature, session, options):
+    """Sweep arbitrary points with one warm-started operating point per value."""
+    sequence = OperatingPointSequence(circuit, temperature, nominal_temperature, session, **options)
+    names = None
+    matrix = None
+    for row, value in enumerate(values):
+        op = sequence.solve({source: float(value)})
+        if names is None:
+            names = list(op.nodes)
+            matrix = np.empty((len(values), len(names)), dtype=np.float64)
+        matrix[row] = [float(op.nodes.get(name, np.nan)) for name in names]
+    return np.asarray(values, dtype=np.float64), names, matrix
+
+
+def dc_sweep(circuit, source, values, nodes=None,
+             temperature=25, nominal_temperature=25, session=None, warm_start=False, **options):
+    """
+    Sweep a source, resistor or `temp` and return every node voltage at once
+
+    Args:
+        circuit: PySpice Circuit object
+        source: Element name as it appears in the netlist (e.g. 'Vdd', 'R1', 'temp')
+        values: Sweep points; an evenly spaced ramp becomes a native `.dc`
+        nodes: Optional list of node names to keep (default: all nodes)
+        temperature: Simulation temperature in degrees C
+        nominal_temperature: Model nominal temperature in degrees C
+        session: Optional NgSpiceShared instance (e.g. leased from a SessionPool)
+        warm_start: For point lists, seed every operating point with the
+            previous solution and fall back to source stepping on failure
+            (see OperatingPointSequence); native `.dc` ramps already continue
+            from the previous point
+        **options: Extra simulator `.options` (reltol, abstol, ...)
+
+    Returns:
+        SweepResult with `sweep` (points,), `names` and `matrix` (points x nodes)
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    if values.size == 0:
+        raise ValueError("Sweep needs at least one point")
+
+    simulator_kwargs = {}
+    if session is not None:
+        simulator_kwargs = dict(simulator='ngspice-shared', ngspice_shared=session)
+    simulator = circuit.simulator(temperature=temperature,
+                                  nominal_temperature=nominal_temperature,
+                                  **simulator_kwargs)
+    if options:
+        simulator.options(**options)
+
+    step = _uniform_step(values)
+    if step is not None and step > 0:
+        sweep, names, matrix = _native_dc_sweep(simulator, source, values, step)
+    elif warm_start:
+        sweep, names, matrix = _warm_start_sweep(circuit, source, values, temperature,
+                                                 nominal_temperature, session, options)
+    else:
+        sweep, names, matrix = _alter_sweep(simulator, source, values)
+
+    columns = _select_nodes(names, nodes)
+    if len(columns) != len(names):
+        names = [names[i] for i in columns]
+        matrix = np.ascontiguousarray(matrix[:, columns])
+
+    return SweepResult(sweep, names, matrix)
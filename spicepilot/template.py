@@ -0,0 +1,284 @@
+"""
+Netlist Templates
+
+In sizing and sweep loops the decks of successive runs differ only in a few
+values (a supply `Vdd`, a device `M1.w`, a model `NMOS.vto`, a compensation
+cap `CA`), yet every run regenerates the whole netlist with str(circuit).
+
+DeckTemplate renders the deck once with a marker in place of each target
+value, records where the markers sit and from then on only formats the
+values that are given:
+
+    template = DeckTemplate(circuit, ['Vdd', 'M1.w', 'CA', 'temp'],
+                            analyses={'operating_point': {}}, node_set=True)
+    deck = template.render({'CA': 3e-12, 'M1.w': 20e-6})    # others stay nominal
+    deck = template.render({'Vdd': 1.1}, node_set={'vout': 0.9})
+
+The result is the same text PySpice would produce with those values set,
+so cache keys do not change. Formatting costs one str_spice() per given
+value; the rest is a join of the unchanged text.
+
+LiveTemplate goes one step further and keeps the deck loaded in an ngspice
+session, applying changes with `alter` / `altermod` (and `option temp`), so
+nothing is re-parsed between runs:
+
+    live = LiveTemplate(template)
+    results = live.run({'CA': 3e-12})      # {analysis name: Waveforms}
+
+Targets use the DesignVariable syntax: an element name (its DC value,
+resistance, capacitance or inductance), 'M1.w' for a device parameter,
+'NMOS.vto' for a model parameter, and 'temp' for the temperature.
+"""
+
+import os
+
+from PySpice.Tools.StringTools import join_dict, str_spice
+
+from .cache import analysis_deck
+from .netlist import find_element
+from .session import _shared_class, read_plot
+
+TEMPERATURE = 'temp'
+
+# Node name used to find where the .nodeset line goes
+_NODE_SET_MARKER = 'spicepilot_nodeset_marker'
+
+# ngspice parameter changed by `alter <element> = value` for each main value attribute
+_MAIN_VALUES = ('dc_value', 'resistance', 'capacitance', 'inductance')
+
+
+def _marker(k):
+    """Distinct float whose text will not occur anywhere else in a deck."""
+    return float(f'9.87654321{k:06d}e+297')
+
+
+def accessor(circuit, target):
+    """
+    Where a target's value lives in the circuit
+
+    Args:
+        circuit: PySpice Circuit object
+        target: Element name, 'M1.w' or 'NMOS.vto' (DesignVariable syntax, without 'temp')
+
+    Returns:
+        (object, attribute or key, is_dict): read the value with owner.get(key)
+        for model parameters (is_dict) and getattr(owner, key) otherwise
+    """
+    if '.' in target:
+        owner, parameter = target.rsplit('.', 1)
+        if owner in circuit._models:
+            return circuit._models[owner]._parameters, parameter, True
+        element = find_element(circuit, owner)
+        # Class-level descriptors, so parameters the netlist leaves unset (w/l from the model) work too
+        descriptor = getattr(type(element), '_spice_to_parameters', {}).get(parameter)
+        if descriptor is not None:
+            return element, descriptor.attribute_name, False
+        if parameter in getattr(type(element), '_optional_parameters', {}):
+            return element, parameter, False
+        raise KeyError(f"{element.name} has no parameter {parameter}")
+    element = find_element(circuit, target)
+    for attribute in _MAIN_VALUES:
+        if hasattr(element, attribute):
+            return element, attribute, False
+    raise KeyError(f"Don't know which value of {target} to vary")
+
+
+def _alter_prefix(circuit, target):
+    """ngspice command that sets `target` in a loaded circuit, up to the value."""
+    if target == TEMPERATURE:
+        return 'option temp='
+    if '.' in target:
+        owner, parameter = target.rsplit('.', 1)
+        if owner in circuit._models:
+            return f'altermod {owner} {parameter} = '
+        return f'alter {find_element(circuit, owner).name.lower()} {parameter} = '
+    return f'alter {find_element(circuit, target).name.lower()} = '
+
+
+class DeckTemplate:
+    """Deck text of one circuit and analysis set with slots for the target values."""
+
+    def __init__(self, circuit, targets, analyses, temperature=25, nominal_temperature=25,
+                 options=None, node_set=False):
+        """
+        Args:
+            circuit: PySpice Circuit object (restored after rendering)
+            targets: Values that change between runs, e.g. ['Vdd', 'M1.w', 'NMOS.vto', 'temp']
+            analyses: Analysis name or {name: kwargs}
+            temperature: Simulation temperature in degrees C
+            nominal_temperature: Model nominal temperature in degrees C
+            options: Optional dict of simulator `.options`
+            node_set: Leave a slot for a `.nodeset` line (render(node_set=...))
+        """
+        self.circuit = circuit
+        self.targets = list(targets)
+        self.analyses = {analyses: {}} if isinstance(analyses, str) else dict(analyses)
+        self.temperature = temperature
+        self.nominal_temperature = nominal_temperature
+        self.options = options
+        self._accessors = {target: accessor(circuit, target) for target in self.targets
+                           if target != TEMPERATURE}
+        self._alter = {target: _alter_prefix(circuit, target) for target in self.targets}
+
+        nominal = self._render({})
+        marked = self._render({target: _marker(k) for k, target in enumerate(self.targets)},
+                              node_set=node_set)
+        # Parameters the nominal deck leaves out (w/l taken from the model) carry their 'w=' in the slot
+        unset = {target for target, (owner, key, is_dict) in self._accessors.items()
+                 if (owner.get(key) if is_dict else getattr(owner, key)) is None}
+
+        # (position, end, slot name) of every marker in the marked deck
+        found = []
+        self._prefixes = {}
+        for k, target in enumerate(self.targets):
+            text = str_spice(_marker(k))
+            count = marked.count(text)
+            if count != 1:
+                raise ValueError(f"{target} appears {count} times in the deck, cannot template it")
+            start = marked.index(text)
+            end = start + len(text)
+            if target in unset:
+                start = marked.rindex(' ', 0, start)
+                self._prefixes[target] = marked[start:end - len(text)]
+            found.append((start, end, target))
+        if node_set:
+            start = marked.index('.nodeset ')
+            found.append((start, marked.index(os.linesep, start) + len(os.linesep), None))
+        found.sort()
+
+        # Alternate fixed text and slot tokens; slot tokens start at their nominal text
+        bounds = [0] + [i for start, end, name in found for i in (start, end)] + [len(marked)]
+        pieces = [marked[bounds[i]:bounds[i + 1]] for i in range(0, len(bounds), 2)]
+        tokens = [pieces[0]]
+        self._slots = {}
+        cursor = len(pieces[0])
+        if nominal[:cursor] != pieces[0]:
+            raise ValueError("Deck layout depends on the target values, cannot template it")
+        for (start, end, name), piece in zip(found, pieces[1:]):
+            # The nominal value runs up to the next fixed text (units such as the C of
+            # temperatures stay in the fixed text)
+            stop = nominal.find(piece, cursor) if piece else cursor
+            if stop < 0 or (name is None or name in self._prefixes) and stop != cursor:
+                raise ValueError(f"Deck layout depends on the value of {name}, cannot template it")
+            self._slots[name] = len(tokens)
+            tokens += [nominal[cursor:stop], piece]
+            cursor = stop + len(piece)
+        self._tokens = tokens
+
+    def _render(self, values, node_set=False):
+        """Deck with `values` set on the circuit (restored afterwards)."""
+        saved = []
+        try:
+            for target, value in values.items():
+                if target == TEMPERATURE:
+                    continue
+                owner, key, is_dict = self._accessors[target]
+                previous = owner.get(key) if is_dict else getattr(owner, key)
+                saved.append((owner, key, is_dict, previous))
+                if is_dict:
+                    owner[key] = value
+                else:
+                    setattr(owner, key, value)
+            simulator = self.circuit.simulator(temperature=values.get(TEMPERATURE, self.temperature),
+                                               nominal_temperature=self.nominal_temperature,
+                                               simulator='ngspice-subprocess')
+            if self.options:
+                simulator.options(**self.options)
+            if node_set:
+                simulator.node_set(**{_NODE_SET_MARKER: 0})
+            return analysis_deck(simulator, self.analyses)
+        finally:
+            for owner, key, is_dict, previous in reversed(saved):
+                if is_dict:
+                    if previous is None:
+                        owner.pop(key, None)
+                    else:
+                        owner[key] = previous
+                else:
+                    setattr(owner, key, previous)
+
+    def render(self, values=None, node_set=None):
+        """
+        Deck with some target values replaced
+
+        Args:
+            values: {target: value}; targets not given keep their nominal value
+            node_set: Optional {node: voltage} for the `.nodeset` slot
+
+        Returns:
+            Deck text
+        """
+        tokens = list(self._tokens)
+        for target, value in (values or {}).items():
+            tokens[self._slots[target]] = self._prefixes.get(target, '') + str_spice(value)
+        if node_set:
+            tokens[self._slots[None]] = ('.nodeset ' + join_dict({f'V({node})': str_spice(voltage)
+                                                                 for node, voltage in node_set.items()})
+                                         + os.linesep)
+        return ''.join(tokens)
+
+    def alterations(self, values):
+        """ngspice commands that apply `values` ({target: value}) to the loaded deck."""
+        return [self._alter[target] + repr(float(value)) for target, value in values.items()]
+
+
+class LiveTemplate:
+    """A DeckTemplate loaded once into an ngspice session and changed in place."""
+
+    def __init__(self, template, session=None):
+        """
+        Args:
+            template: DeckTemplate
+            session: NgSpiceShared instance (default: a new shared instance)
+        """
+        self.template = template
+        self._session = session
+        self._values = None       # target values currently applied in the session
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = _shared_class().new_instance()
+        return self._session
+
+    def load(self):
+        """(Re)load the nominal deck."""
+        session = self.session
+        session.destroy()
+        session.remove_circuit()
+        session.load_circuit(self.template.render())
+        self._values = {}
+
+    def run(self, values=None):
+        """
+        Apply the targets that changed since the last run and simulate
+
+        Args:
+            values: {target: value}; targets not given keep their current value
+
+        Returns:
+            {analysis name: Waveforms}
+        """
+        if self._values is None:
+            self.load()
+        changed = {target: value for target, value in (values or {}).items()
+                   if self._values.get(target) != value}
+        session = self.session
+        session.destroy()
+        for command in self.template.alterations(changed):
+            session.exec_command(command)
+        self._values.update(changed)
+        session.run()
+        results = {}
+        for plot_name in session.plot_names:
+            if plot_name != 'const':
+                waveforms = read_plot(session, plot_name)
+                results[waveforms.analysis] = waveforms
+        return results
+
+    def close(self):
+        """Unload the circuit."""
+        if self._session is not None and self._values is not None:
+            self._session.destroy()
+            self._session.remove_circuit()
+        self._values = None
@@ -0,0 +1,329 @@
+"""
+Truth-Table Verification
+
+The digital benchmark entries (inverter, NAND, NOR, XOR, XNOR, transmission
+gate, SR latch) used to be checked by running a transient with a few pulse
+sources and looking at the plot (claude_easy2.py, claude_easy3.py). Here
+one stimulus covers every row of the truth table, one simulation runs, and
+the settled level of every output in every row is read and compared at
+once:
+
+    bench = TruthTableBench(circuit, inputs=['inputA', 'inputB'], outputs=['output'], supply='Vdd')
+    result = bench.verify(lambda a, b: 1 - (a & b))
+    result.passed, result.mismatches
+    print(format_truth_table(result))
+
+Two stimuli:
+
+    dc          one .dc sweep of a row index; behavioural sources decode it
+                into the input levels, so every row is an operating point.
+                For combinational logic.
+    transient   one PWL source per input holds each row for `hold` seconds,
+                in the order given; outputs are read at the end of each row.
+                Rows may depend on earlier rows, so latches are verified
+                with a sequence (set, hold, reset, hold).
+
+Levels are read by one interpolation over the (outputs x samples) matrix
+and thresholded into 1, 0 or -1 (between LOGIC_LOW and LOGIC_HIGH of the
+supply). Expected values of -1 (or None) are don't-cares.
+"""
+
+from dataclasses import dataclass
+from itertools import product
+
+import numpy as np
+
+from .netlist import find_element
+from .session import simulate_deck
+
+DC = 'dc'
+TRANSIENT = 'transient'
+
+# Logic levels as fractions of the supply
+LOGIC_LOW = 0.3
+LOGIC_HIGH = 0.7
+
+# Transient stimulus: time each row is held and the length of each input edge
+HOLD = 100e-9
+EDGE = 1e-9
+
+# Names of the elements the stimulus adds
+SOURCE_PREFIX = 'tt_'
+INDEX_NODE = 'tt_index'
+
+
+def expand(table, count):
+    """
+    Rows of a truth table as arrays
+
+    Args:
+        table: Function of `count` input bits returning an output bit or a
+            tuple of them (evaluated over all combinations, first input
+            most significant), or a sequence of (input bits, output bits) rows
+        count: Number of inputs
+
+    Returns:
+        (bits, expected): (rows x inputs) and (rows x outputs) int8 arrays,
+        -1 marking don't-care outputs
+    """
+    if callable(table):
+        table = [(bits, table(*bits)) for bits in product((0, 1), repeat=count)]
+    bits = []
+    expected = []
+    for inputs, outputs in table:
+        if len(inputs) != count:
+            raise ValueError(f"Row {tuple(inputs)} does not have {count} inputs")
+        bits.append(inputs)
+        outputs = outputs if isinstance(outputs, (tuple, list)) else (outputs,)
+        expected.append([-1 if value is None else value for value in outputs])
+    return np.array(bits, dtype=np.int8).reshape(len(bits), count), np.array(expected, dtype=np.int8)
+
+
+def logic_levels(voltages, supply, low=LOGIC_LOW, high=LOGIC_HIGH):
+    """1 at or above high x supply, 0 at or below low x supply, -1 in between."""
+    voltages = np.asarray(voltages)
+    return np.where(voltages >= high * supply, 1, np.where(voltages <= low * supply, 0, -1)).astype(np.int8)
+
+
+def sample(abscissa, matrix, positions):
+    """
+    Linearly interpolated values of every row of `matrix` at `positions`
+
+    Args:
+        abscissa: (samples,) increasing time or sweep values
+        matrix: (outputs x samples)
+        positions: (points,)
+
+    Returns:
+        (outputs x points) array
+    """
+    abscissa = np.asarray(abscissa, dtype=np.float64)
+    matrix = np.asarray(matrix)
+    if abscissa.size == 1:
+        return np.repeat(matrix[:, :1], len(positions), axis=1)
+    upper = np.clip(np.searchsorted(abscissa, positions), 1, abscissa.size - 1)
+    lower = upper - 1
+    span = abscissa[upper] - abscissa[lower]
+    weight = np.clip((positions - abscissa[lower]) / np.where(span > 0, span, 1.0), 0.0, 1.0)
+    return matrix[:, lower] * (1.0 - weight) + matrix[:, upper] * weight
+
+
+@dataclass
+class TruthTableResult:
+    """Expected and measured levels of every output in every row."""
+    inputs: tuple
+    outputs: tuple
+    bits: np.ndarray        # (rows x inputs) applied input bits
+    expected: np.ndarray    # (rows x outputs), -1 = don't care
+    measured: np.ndarray    # (rows x outputs), -1 = between the thresholds
+    voltages: np.ndarray    # (rows x outputs) sampled output voltages
+
+    @property
+    def failed(self):
+        """(rows x outputs) mask of the outputs that differ from the table."""
+        return (self.expected >= 0) & (self.measured != self.expected)
+
+    @property
+    def passed(self):
+        return not self.failed.any()
+
+    @property
+    def mismatches(self):
+        """(row index, output name) of every failed entry."""
+        return [(int(row), self.outputs[column]) for row, column in np.argwhere(self.failed)]
+
+
+@dataclass
+class Stimulus:
+    """Sources and analysis card that apply all rows of a table in one simulation."""
+    inputs: tuple           # driven nodes
+    bits: np.ndarray        # (rows x inputs)
+    supply: float
+    mode: str
+    lines: list             # element lines to add to the deck
+    card: str               # analysis line
+    positions: np.ndarray   # abscissa value at which each row is read
+
+    def read(self, results, outputs, expected, low=LOGIC_LOW, high=LOGIC_HIGH):
+        """
+        Compare the simulated outputs with the table
+
+        Args:
+            results: {analysis name: Waveforms} of the simulation
+            outputs: Output node names
+            expected: (rows x outputs) expected bits (see expand())
+
+        Returns:
+            TruthTableResult
+        """
+        waveforms = results[self.mode]
+        voltages = sample(waveforms.abscissa, np.real(waveforms.matrix(list(outputs))), self.positions).T
+        return TruthTableResult(tuple(self.inputs), tuple(outputs), self.bits, np.asarray(expected, dtype=np.int8),
+                                logic_levels(voltages, self.supply, low, high), voltages)
+
+
+def stimulus(inputs, bits, supply, mode=DC, hold=HOLD, edge=EDGE):
+    """
+    Build the stimulus for a table
+
+    Args:
+        inputs: Input node names (their existing sources must be removed)
+        bits: (rows x inputs) bits, e.g. from expand()
+        supply: Logic high level in volts
+        mode: 'dc' (a swept row index, one operating point per row) or
+            'transient' (PWL sources, rows applied in order)
+        hold: Time each row is held (transient)
+        edge: Rise/fall time between rows (transient)
+
+    Returns:
+        Stimulus
+    """
+    bits = np.asarray(bits, dtype=np.int8)
+    rows = bits.shape[0]
+    levels = bits * float(supply)
+    names = [f'{SOURCE_PREFIX}{k}' for k in range(len(inputs))]
+    if mode == DC:
+        index = np.arange(rows, dtype=np.float64)
+        lines = [f'V{SOURCE_PREFIX}index {INDEX_NODE} 0 DC 0']
+        for name, node, column in zip(names, inputs, levels.T):
+            table = ', '.join(f'{x:.12g}, {y:.12g}' for x, y in zip(index, column))
+            lines.append(f'B{name} {node} 0 V = pwl(V({INDEX_NODE}), {table})')
+        card = f'.dc V{SOURCE_PREFIX}index 0 {rows - 1} 1'
+        positions = index
+    elif mode == TRANSIENT:
+        # Row r is applied from r * hold (+ edge) and read at (r + 1) * hold
+        starts = np.arange(1, rows) * hold
+        times = np.concatenate([[0.0], np.column_stack([starts, starts + edge]).ravel()])
+        lines = []
+        for name, node, column in zip(names, inputs, levels.T):
+            values = np.concatenate([[column[0]], np.column_stack([column[:-1], column[1:]]).ravel()])
+            points = ' '.join(f'{t:.12g} {v:.12g}' for t, v in zip(times, values))
+            lines.append(f'V{name} {node} 0 PWL({points})')
+        card = f'.tran {hold / 50:.12g} {rows * hold:.12g}'
+        positions = np.arange(1, rows + 1) * hold
+    else:
+        raise ValueError(f"Unknown stimulus mode {mode}")
+    return Stimulus(tuple(inputs), bits, float(supply), mode, lines, card, positions)
+
+
+def _voltage_sources_to_ground(netlist, node):
+    """Enabled voltage sources of a netlist between `node` and ground."""
+    node = str(node).lower()
+    for element in netlist.elements:
+        if type(element).PREFIX != 'V' or not element.enabled:
+            continue
+        pins = [str(pin).lower() for pin in element.nodes]
+        if len(pins) == 2 and pins[0] == node and pins[1] in ('0', 'gnd'):
+            yield element
+
+
+def _supply_source(circuit, name):
+    """Voltage source by netlist name or by the name given to circuit.V()."""
+    try:
+        return find_element(circuit, name)
+    except KeyError:
+        try:
+            return circuit['V' + name]
+        except (IndexError, KeyError):
+            pass
+        raise
+
+
+class TruthTableBench:
+    """Verifies the logic function of a PySpice circuit in one simulation."""
+
+    def __init__(self, circuit, inputs, outputs, supply, supply_level=None, mode=DC, hold=HOLD, edge=EDGE,
+                 low=LOGIC_LOW, high=LOGIC_HIGH):
+        """
+        Args:
+            circuit: PySpice Circuit
+            inputs: Input node names; sources the circuit has from them to
+                ground are replaced by the stimulus
+            outputs: Output node names
+            supply: Name of the supply voltage source, as in the netlist
+                ('Vdd') or as given to PySpice (circuit.V('dd', ...) -> 'dd')
+            supply_level: Logic high level (default: the supply's DC value);
+                if given, the supply is replaced by a DC source at this level,
+                e.g. for supplies that ramp up
+            mode: 'dc' or 'transient', see stimulus()
+            hold, edge: Transient row timing
+            low, high: Logic thresholds as fractions of the supply
+        """
+        self.circuit = circuit
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.supply = _supply_source(circuit, supply)
+        self.supply_level = float(self.supply.dc_value if supply_level is None else supply_level)
+        self.replace_supply = supply_level is not None
+        self.mode = mode
+        self.hold = hold
+        self.edge = edge
+        self.low = low
+        self.high = high
+
+    def _stimulus(self, bits):
+        return stimulus(self.inputs, bits, self.supply_level, self.mode, self.hold, self.edge)
+
+    def deck(self, table):
+        """
+        Deck that applies every row of `table` (see expand())
+
+        Returns:
+            Deck text
+        """
+        bits, _ = expand(table, len(self.inputs))
+        applied = self._stimulus(bits)
+        disabled = [source for node in self.inputs for source in _voltage_sources_to_ground(self.circuit, node)]
+        if self.replace_supply:
+            disabled.append(self.supply)
+        try:
+            for element in disabled:
+                element.enabled = False
+            netlist = str(self.circuit)
+        finally:
+            for element in disabled:
+                element.enabled = True
+        lines = [netlist.rstrip()] + applied.lines
+        if self.replace_supply:
+            pins = [str(pin) for pin in self.supply.nodes]
+            lines.append(f'{self.supply.name} {pins[0]} {pins[1]} DC {self.supply_level!r}')
+        lines += [applied.card, '.end']
+        return '\n'.join(lines) + '\n'
+
+    def result(self, table, results):
+        """TruthTableResult of a simulation of deck(table)."""
+        bits, expected = expand(table, len(self.inputs))
+        if expected.shape[1] != len(self.outputs):
+            raise ValueError(f"The table has {expected.shape[1]} outputs, the bench {len(self.outputs)}")
+        return self._stimulus(bits).read(results, self.outputs, expected, self.low, self.high)
+
+    def verify(self, table):
+        """
+        Simulate every row of `table` in one run and compare the outputs
+
+        Returns:
+            TruthTableResult
+        """
+        results = simulate_deck(self.deck(table))
+        if not results:
+            raise RuntimeError("Truth-table simulation failed")
+        return self.result(table, results)
+
+
+def format_truth_table(result):
+    """Return the table as text, one row per input combination, failed outputs marked with '!'."""
+    width = max([len(name) for name in result.inputs + result.outputs] + [5])
+    header = ' '.join(f'{name:>{width}s}' for name in result.inputs) + ' | ' + \
+        ' '.join(f'{name:>{width}s}' for name in result.outputs)
+    lines = [header, '-' * len(header)]
+    failed = result.failed
+    for row in range(result.bits.shape[0]):
+        cells = []
+        for column in range(len(result.outputs)):
+            text = f'{result.voltages[row, column]:.2f}' + ('!' if failed[row, column] else ' ')
+            cells.append(f'{text:>{width + 1}s}')
+        lines.append(' '.join(f'{bit:>{width}d}' for bit in result.bits[row]) + ' |' + ''.join(cells))
+    lines.append('-' * len(header))
+    lines.append(f"{'pass' if result.passed else 'fail'}: {len(result.mismatches)} mismatch(es) in "
+                 f"{result.bits.shape[0]} row(s) x {len(result.outputs)} output(s)")
+    return '\n'.join(lines)
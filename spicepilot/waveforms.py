@@ -0,0 +1,144 @@
+"""
+Waveform Container
+
+Plain-NumPy view of a simulation result: node voltages and branch currents
+keyed by name, plus the analysis abscissa (time, frequency or sweep). It is
+what the cache stores and returns, and it indexes like a PySpice analysis
+(`waveforms['vout']`, `waveforms.frequency`).
+
+Converting a PySpice analysis takes one call and no per-sample Python work:
+
+    waveforms = as_waveforms(analysis)
+    vq = waveforms['q']                      # contiguous float64 / complex128
+    outputs = waveforms.matrix(['q0', 'q1'])  # (vectors x samples)
+
+instead of `np.array([float(v) for v in analysis['q']])`.
+"""
+
+import numpy as np
+
+# Name of the abscissa attribute on each PySpice analysis type
+ABSCISSA = {
+    'operating_point': None,
+    'dc': 'sweep',
+    'ac': 'frequency',
+    'transient': 'time',
+    'noise': None,
+}
+
+# PySpice analysis class name -> analysis method name
+ANALYSIS_KINDS = {
+    'OperatingPoint': 'operating_point',
+    'DcAnalysis': 'dc',
+    'AcAnalysis': 'ac',
+    'TransientAnalysis': 'transient',
+    'NoiseAnalysis': 'noise',
+}
+
+
+class Waveforms:
+    """Simulation vectors as plain NumPy arrays."""
+
+    __slots__ = ('analysis', 'abscissa_name', 'abscissa', 'nodes', 'branches')
+
+    def __init__(self, analysis, nodes, branches=None, abscissa_name=None, abscissa=None):
+        self.analysis = analysis
+        self.nodes = dict(nodes)
+        self.branches = dict(branches or {})
+        self.abscissa_name = abscissa_name
+        self.abscissa = abscissa
+
+    @classmethod
+    def from_analysis(cls, analysis, kind=None):
+        """
+        Convert a PySpice analysis to plain arrays
+
+        Each vector becomes a contiguous float64 (or complex128) ndarray
+        sharing memory with the PySpice WaveForm; no per-sample conversion.
+
+        Args:
+            analysis: PySpice analysis object
+            kind: Analysis method name ('operating_point', 'ac', 'dc', 'transient',
+                'noise'); inferred from the analysis class if omitted
+        """
+        if kind is None:
+            kind = ANALYSIS_KINDS.get(type(analysis).__name__, 'unknown')
+
+        def convert(waveform):
+            array = np.ascontiguousarray(waveform.as_ndarray())
+            if kind == 'operating_point':
+                array = array.reshape(())
+            return array
+
+        nodes = {name: convert(w) for name, w in analysis.nodes.items()}
+        branches = {name: convert(w) for name, w in analysis.branches.items()}
+
+        abscissa_name = ABSCISSA.get(kind)
+        abscissa = None
+        if abscissa_name is not None:
+            abscissa = np.asarray(getattr(analysis, abscissa_name).as_ndarray()).real
+
+        return cls(kind, nodes, branches, abscissa_name, abscissa)
+
+    def __getitem__(self, name):
+        for vectors in (self.nodes, self.branches):
+            if name in vectors:
+                return vectors[name]
+            lower = str(name).lower()
+            if lower in vectors:
+                return vectors[lower]
+        raise IndexError(name)
+
+    def names(self):
+        """Return node names followed by branch names."""
+        return list(self.nodes) + list(self.branches)
+
+    def matrix(self, names=None):
+        """
+        Stack vectors into one 2-D array
+
+        Args:
+            names: Vector names (default: all nodes, in simulator order)
+
+        Returns:
+            (vectors x samples) array, complex128 if any vector is complex
+        """
+        if names is None:
+            names = list(self.nodes)
+        vectors = [self[name] for name in names]
+        if not vectors:
+            return np.empty((0, 0))
+        dtype = np.result_type(*vectors)
+        matrix = np.empty((len(vectors),) + np.shape(vectors[0]), dtype=dtype)
+        for row, vector in zip(matrix, vectors):
+            row[...] = vector
+        return matrix
+
+    def __getattr__(self, name):
+        # Only called for missing attributes; slots that are not set yet
+        # (e.g. while unpickling) must not recurse into __getitem__.
+        if name.startswith('_') or name in Waveforms.__slots__:
+            raise AttributeError(name)
+        if name == self.abscissa_name:
+            return self.abscissa
+        try:
+            return self[name]
+        except IndexError:
+            raise AttributeError(name) from None
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except IndexError:
+            return False
+        return True
+
+    def __repr__(self):
+        return f"Waveforms({self.analysis}, {len(self.nodes)} nodes, {len(self.branches)} branches)"
+
+
+def as_waveforms(analysis):
+    """Return `analysis` as Waveforms (PySpice analyses are converted, Waveforms passed through)."""
+    if isinstance(analysis, Waveforms):
+        return analysis
+    return Waveforms.from_analysis(analysis)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from spicepilot.ac_metrics import ac_metrics
+
+FREQUENCY = np.logspace(0, 9, 9001)
+
+
+def poles(a0, *frequencies):
+    """a0 / ((1 + jf/p1) (1 + jf/p2) ...) on FREQUENCY."""
+    response = np.full(FREQUENCY.shape, a0, dtype=np.complex128)
+    for pole in frequencies:
+        response /= 1 + 1j * FREQUENCY / pole
+    return response
+
+
+def two_pole_crossing(p1, p2, level):
+    """Frequency where |a0 / ((1 + jf/p1) (1 + jf/p2))| falls to a0 / level (a quadratic in f^2)."""
+    a, b = p1 ** 2, p2 ** 2
+    return np.sqrt(max(np.roots([1 / (a * b), 1 / a + 1 / b, 1 - level ** 2]).real))
+
+
+def test_two_pole():
+    a0, p1, p2 = 1e3, 1e3, 1e6
+    metrics = ac_metrics(FREQUENCY, poles(a0, p1, p2))
+    ugf = two_pole_crossing(p1, p2, a0)
+    assert metrics.dc_gain_db == pytest.approx(60.0)
+    # The bandwidth is where the gain is down 3 dB (not 3.01 dB)
+    assert metrics.bandwidth == pytest.approx(two_pole_crossing(p1, p2, 10 ** (3 / 20)), rel=1e-4)
+    assert metrics.ugf == pytest.approx(ugf, rel=1e-4)
+    assert metrics.phase_margin == pytest.approx(
+        180 - np.degrees(np.arctan(ugf / p1) + np.arctan(ugf / p2)), abs=0.01)
+    # Two poles never reach -180 degrees
+    assert np.isnan(metrics.gain_margin)
+
+
+def test_three_pole_gain_margin():
+    # Three equal poles: -180 degrees at f = p tan(60) = p sqrt(3), where |H| = a0 / 8
+    a0, p = 4.0, 1e4
+    metrics = ac_metrics(FREQUENCY, poles(a0, p, p, p))
+    ugf = p * np.sqrt(a0 ** (2 / 3) - 1)
+    assert metrics.gain_margin == pytest.approx(20 * np.log10(8 / a0), abs=1e-3)
+    assert metrics.ugf == pytest.approx(ugf, rel=1e-4)
+    assert metrics.phase_margin == pytest.approx(180 - 3 * np.degrees(np.arctan(ugf / p)), abs=0.01)
+    assert metrics.bandwidth == pytest.approx(p * np.sqrt(10 ** (2 / 20) - 1), rel=1e-4)
+
+
+def test_inverting_output_and_batches():
+    responses = np.stack([poles(1e3, 1e3, 1e6), -poles(1e3, 1e3, 1e6), poles(0.5, 1e3)])
+    metrics = ac_metrics(FREQUENCY, responses)
+    assert metrics.ugf.shape == (3,)
+    # Phase is referenced to DC, so the inverting copy has the same margins
+    assert metrics.phase_margin[1] == pytest.approx(metrics.phase_margin[0])
+    assert metrics.ugf[1] == pytest.approx(metrics.ugf[0])
+    # A gain below 1 has no unity-gain crossing
+    assert np.isnan(metrics.ugf[2]) and np.isnan(metrics.phase_margin[2])
+    assert metrics.row(0)['dc_gain_db'] == pytest.approx(60.0)
@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+from spicepilot.benchmark import headless_env
+
+PROBE = '''
+import sys
+import sitecustomize
+import matplotlib.figure
+print(getattr(sitecustomize, 'USER_HOOK', None))
+print(getattr(matplotlib.figure.Figure.savefig, '_spicepilot_headless', False))
+'''
+
+
+def _probe(env):
+    output = subprocess.run([sys.executable, '-c', PROBE], env=env, capture_output=True, text=True,
+                            check=True).stdout
+    return output.split()
+
+
+def test_headless_child_runs_own_sitecustomize(tmp_path, monkeypatch):
+    (tmp_path / 'sitecustomize.py').write_text("USER_HOOK = 'ran'\n")
+    monkeypatch.setenv('PYTHONPATH', str(tmp_path))
+    # The injected hook patches matplotlib and still runs the user's sitecustomize
+    assert _probe(headless_env(max_dpi=50)) == ['ran', 'True']
+
+
+def test_headless_child_without_own_sitecustomize(tmp_path, monkeypatch):
+    monkeypatch.setenv('PYTHONPATH', str(tmp_path))
+    assert _probe(headless_env(max_dpi=50)) == ['None', 'True']
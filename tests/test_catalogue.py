@@ -0,0 +1,189 @@
+import contextlib
+import io
+import runpy
+
+import numpy as np
+import pytest
+from PySpice.Spice.Netlist import Circuit
+
+from spicepilot.benchmark import REPO_ROOT, discover
+from spicepilot.catalogue import (AnyOf, Bench, Check, Grade, TruthTable, find_spec, load_catalogue,
+                                  parse_catalogue, source_levels, transistor_count)
+from spicepilot.truthtable import DC, TRANSIENT, stimulus
+from spicepilot.waveforms import Waveforms
+
+# Catalogue entry, flattened MOSFET count and supply level of every archived script
+ARCHIVE = {
+    'claude_easy1': ('CMOS Inverter (NOT Gate)', 2, 5.0),
+    'claude_easy2': ('CMOS NAND Gate', 4, 5.0),
+    'claude_easy3': ('CMOS NOR Gate', 4, 5.0),
+    'claude_easy4': ('SR Latch', 8, 3.3),
+    'claude_easy5': ('CMOS Buffer', 4, 5.0),
+    'claude_easy7': ('Ring Oscillator (3-stage)', 6, 3.3),
+    'claude_high_1': ('8-Bit Shift Register', 80, 3.3),
+    'claude_medium1': ('Full Adder', 22, 3.3),
+    'claude_medium2': ('2-to-4 Decoder', 28, 3.3),
+    'claude_medium4': ('D Flip-Flop', 14, 3.3),
+    'claude_medium_7': ('Voltage-Controlled Oscillator (VCO)', 11, 3.3),
+    'GPT_easy1': ('Voltage Follower (Source Follower)', 1, 5.0),
+    'GPT_easy2': ('CMOS NAND Gate', 4, 5.0),
+    'GPT_easy3': ('CMOS NOR Gate', 4, 5.0),
+    'GPT_easy4': ('SR Latch', 8, 5.0),
+    'GPT_easy5': ('CMOS Buffer', 4, 5.0),
+    'GPT_easy7': ('Ring Oscillator (3-stage)', 6, 5.0),
+    'gpt_high_1': ('8-Bit Shift Register', 128, 3.3),
+    'gpt_medium': ('Voltage-Controlled Oscillator (VCO)', 3, 5.0),
+    'gpt_medium1': ('Full Adder', 20, 5.0),
+    'gpt_medium2': ('2-to-4 Decoder', 20, 5.0),
+    'gpt_medium4': ('D Flip-Flop', 10, 5.0),
+    'gpt_medium_final': ('CMOS Multiplexer (4:1)', 12, 5.0),
+}
+
+
+class _Simulate(Exception):
+    pass
+
+
+@pytest.fixture(scope='module')
+def specs():
+    return load_catalogue()
+
+
+@pytest.fixture(scope='module')
+def netlists(tmp_path_factory):
+    """Netlist of the first circuit each archived script simulates (stopped before ngspice runs)."""
+    pytest.importorskip('matplotlib').use('Agg')
+    scripts = discover(REPO_ROOT / 'archive' / 'test_files')
+    circuits = []
+
+    def simulator(circuit, *args, **kwargs):
+        circuits.append(circuit)
+        raise _Simulate
+
+    netlists = {}
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(Circuit, 'simulator', simulator)
+        patch.chdir(tmp_path_factory.mktemp('scripts'))
+        for path in scripts:
+            circuits.clear()
+            with contextlib.suppress(_Simulate, SystemExit), contextlib.redirect_stdout(io.StringIO()):
+                runpy.run_path(str(path), run_name='__main__')
+            netlists[path.stem] = str(circuits[0])
+    return netlists
+
+
+def test_parse_catalogue():
+    entries = parse_catalogue()
+    tiers = [entry.tier for entry in entries]
+    assert [tiers.count(tier) for tier in ('easy', 'medium', 'hard', 'extreme')] == [30, 30, 30, 24]
+    assert (entries[0].tier, entries[0].number, entries[0].name) == ('easy', 1, 'CMOS Inverter (NOT Gate)')
+    assert all(entry.description for entry in entries)
+
+
+@pytest.mark.parametrize('value, levels', [
+    ('5V', (5.0, 5.0, 5.0)),
+    ('DC 1 AC 1', (1.0, 1.0, 1.0)),
+    ('2.5 AC 0.5', (2.5, 2.5, 2.5)),
+    ('AC 1', (0.0, 0.0, 0.0)),
+    ('DC 0V PULSE(0V 3.3V 0ns 1ns 1ns 5ns 10ns)', (0.0, 0.0, 3.3)),
+    ('PWL(0 0 1n 5 2n 2)', (0.0, 0.0, 5.0)),
+    ('SIN(1.65 0.1 1k)', (1.65, 1.55, 1.75)),
+])
+def test_source_levels(value, levels):
+    assert source_levels(value) == pytest.approx(levels)
+
+
+def test_transistor_count_flattens_subcircuits():
+    netlist = '\n'.join([
+        '.title count',
+        '.subckt inv a y vdd',
+        'M1 y a vdd vdd PMOS',
+        'M2 y a 0 0 NMOS',
+        '.ends inv',
+        '.subckt buf a y vdd',
+        'X1 a m vdd inv',
+        'X2 m y vdd inv',
+        '.ends buf',
+        'X1 in out vdd buf',
+        'X2 out out2 vdd inv',
+        'M9 out2 in 0 0 NMOS',
+        '.end',
+    ])
+    assert transistor_count(netlist) == 7
+
+
+def test_archive(netlists, specs):
+    assert set(netlists) == set(ARCHIVE)
+    for name, netlist in netlists.items():
+        entry, transistors, supply = ARCHIVE[name]
+        bench = Bench(netlist)
+        spec = find_spec(bench.title, specs)
+        assert spec is not None and spec.name == entry, name
+        assert transistor_count(netlist) == transistors, name
+        assert Bench(netlist, spec.ports).supply_level == supply, name
+
+
+def test_find_spec_rejects_unrelated_titles(specs):
+    assert find_spec('Bandgap Reference with Startup', specs[:5]) is None
+    assert find_spec('CMOS SR Latch using NAND Gates', specs).name == 'SR Latch'
+
+
+@pytest.mark.parametrize('script, ports', [
+    ('claude_easy2', {'A': 'inputA', 'B': 'inputB', 'out': 'output'}),
+    ('GPT_easy4', {'S': 'input_S', 'R': 'input_R', 'Q': 'Q', 'Qbar': 'Q_bar'}),
+    ('claude_medium2', {'A1': 'B', 'A0': 'A', 'Y0': 'Y0', 'Y1': 'Y1', 'Y2': 'Y2', 'Y3': 'Y3'}),
+    ('gpt_medium_final', {'I0': 'input_I0', 'I1': 'input_I1', 'I2': 'input_I2', 'I3': 'input_I3',
+                          'S1': 'select_S1', 'S0': 'select_S0', 'out': 'out'}),
+])
+def test_bench_ports(netlists, specs, script, ports):
+    spec = find_spec(Bench(netlists[script]).title, specs)
+    bench = Bench(netlists[script], spec.ports)
+    assert {name: node for name, node in bench.ports.items() if node} == ports
+    assert bench.supply_node.lower() == 'vdd'
+
+
+def _ideal(bench, table, invert=False):
+    """Outcome of a simulation whose outputs follow `table` exactly (or the opposite)."""
+    inputs, outputs, bits, expected = table.applicable(bench)
+    supply = bench.require_supply()[1]
+    applied = stimulus([bench.ports[port] for port in inputs], bits, supply,
+                       TRANSIENT if table.sequential else DC)
+    levels = np.where(expected < 0, 0, expected).T.astype(float)
+    if invert:
+        levels = 1 - levels
+    nodes = {bench.ports[port].lower(): supply * level for port, level in zip(outputs, levels)}
+    return {applied.mode: Waveforms(applied.mode, nodes, abscissa_name='x', abscissa=applied.positions)}
+
+
+def test_truth_tables(netlists, specs):
+    checked = 0
+    for name, netlist in netlists.items():
+        spec = find_spec(Bench(netlist).title, specs)
+        bench = Bench(netlist, spec.ports)
+        for criterion in spec.criteria:
+            if not isinstance(criterion, (TruthTable, AnyOf)):
+                continue
+            tables = criterion.options if isinstance(criterion, AnyOf) else (criterion,)
+            decks = criterion.decks(bench)
+            # One simulation per table, whatever its number of rows
+            assert len(decks) == len(tables), name
+            for deck, table in zip(decks, tables):
+                assert ('.tran ' if table.sequential else '.dc Vtt_index ') in deck, name
+                assert deck.rstrip().endswith('.end')
+            assert criterion.check(bench, [_ideal(bench, table) for table in tables]).passed, name
+            failed = criterion.check(bench, [_ideal(bench, table, invert=True) for table in tables])
+            assert not failed.passed and 'expected' in failed.detail, name
+            assert not criterion.check(bench, [None] * len(tables)).passed
+            checked += 1
+    assert checked == 14
+
+
+def test_grade_score():
+    grade = Grade('script', 'CMOS NAND Gate', 'easy', [
+        Check('runs', True, ''), Check('ports', True, ''), Check('truth-table', False, ''),
+        Check('transistors', False, '', required=False)])
+    assert grade.score == pytest.approx(2 / 3)
+    assert not grade.passed
+    grade.checks[2] = Check('truth-table', True, '')
+    assert grade.passed and grade.score == 1.0
+    assert not Grade('script', '', '', [Check('runs', True, '')]).passed
@@ -0,0 +1,94 @@
+import math
+
+import pytest
+from PySpice.Spice.Netlist import Circuit, SubCircuit
+from PySpice.Unit import u_kOhm, u_pF, u_uA, u_um, u_V
+
+from spicepilot.compact import CompactCircuit
+
+
+class Stage(SubCircuit):
+    NAME = 'stage'
+    NODES = ('inp', 'out', 'vdd')
+
+    def __init__(self):
+        super().__init__(self.NAME, *self.NODES)
+        self.R('load', 'vdd', 'out', 10@u_kOhm)
+        self.MOSFET(1, 'out', 'inp', self.gnd, self.gnd, model='nmos', w=2@u_um, l=1e-6)
+
+
+def _round_trip(circuit):
+    compact = CompactCircuit.from_circuit(circuit)
+    assert compact.to_spice() == str(compact.to_circuit()) == str(circuit)
+    return compact
+
+
+def test_string_values():
+    # As in examples/2_two_stage_opamp
+    circuit = Circuit('strings')
+    circuit.V('in_p', 'vin_p', circuit.gnd, '2.5 AC 0.5')
+    circuit.V('in', 'a', circuit.gnd, 'DC 1 AC 1')
+    circuit.R(1, 'a', circuit.gnd, '1k')
+    compact = _round_trip(circuit)
+    assert 'Vin_p vin_p 0 2.5 AC 0.5' in compact.to_spice()
+    assert math.isnan(compact['R1'].value)
+    with pytest.raises(ValueError):
+        compact.with_values({'R1': 2e3})
+
+
+def test_unit_values():
+    circuit = Circuit('units')
+    circuit.V('dd', 'vdd', circuit.gnd, 1.8@u_V)
+    circuit.R(1, 'vdd', 'a', 100@u_kOhm)
+    circuit.R(2, 'a', circuit.gnd, 1000)
+    circuit.C(1, 'a', circuit.gnd, 2.2@u_pF)
+    circuit.I(1, 'vdd', 'a', 10@u_uA)
+    compact = _round_trip(circuit)
+    assert compact['R1'].value == 100e3
+    assert compact['R2'].value == 1000.0
+
+
+def test_disabled_element():
+    circuit = Circuit('disabled')
+    circuit.V('dd', 'vdd', circuit.gnd, 1)
+    circuit.R(1, 'vdd', circuit.gnd, 1@u_kOhm)
+    circuit.R(2, 'vdd', circuit.gnd, 2@u_kOhm).enabled = False
+    compact = _round_trip(circuit)
+    assert 'R2' not in compact.to_spice()
+    assert len(compact) == 3
+    assert not compact.to_circuit()['R2'].enabled
+
+
+def test_subcircuits_and_models():
+    circuit = Circuit('hierarchy')
+    circuit.model('nmos', 'nmos', vto=0.7, kp=120e-6)
+    circuit.subcircuit(Stage())
+    circuit.V('dd', 'vdd', circuit.gnd, 3.3)
+    circuit.X(1, Stage.NAME, 'in', 'out', 'vdd')
+    _round_trip(circuit)
+
+
+def test_shortcuts_match_pyspice():
+    circuits = [Circuit('built'), CompactCircuit('built')]
+    for circuit in circuits:
+        circuit.V('dd', 'vdd', circuit.gnd, 3.3@u_V)
+        circuit.V('in', 'in', circuit.gnd, 'DC 0 AC 1')
+        for i in range(3):
+            circuit.R(i, 'vdd', f'n{i}', 10@u_kOhm)
+            circuit.MOSFET(i, f'n{i}', 'in', circuit.gnd, circuit.gnd, model='nmos', w=1e-6, l=1e-6)
+        circuit.model('nmos', 'nmos', vto=0.7)
+    reference, compact = circuits
+    assert compact.to_spice() == str(compact.to_circuit()) == str(reference)
+
+
+def test_with_values():
+    circuit = Circuit('variants')
+    circuit.V('dd', 'vdd', circuit.gnd, 1.8@u_V)
+    circuit.R('load', 'vdd', 'out', 10@u_kOhm)
+    compact = CompactCircuit.from_circuit(circuit)
+    variant = compact.with_values({'Rload': 20e3})
+    assert 'Rload vdd out 20000.0' in variant.to_spice()
+    assert variant.to_spice() == str(variant.to_circuit())
+    # The original keeps its values and their text
+    assert compact.to_spice() == str(circuit)
+    assert variant.values[0] == compact.values[0] == 1.8
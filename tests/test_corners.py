@@ -0,0 +1,75 @@
+import re
+
+import numpy as np
+import pytest
+from PySpice.Spice.Netlist import Circuit
+
+from spicepilot import corners
+from spicepilot.corners import CornerSweep, skew_corners
+from spicepilot.waveforms import Waveforms
+
+
+def inverter():
+    circuit = Circuit('inverter')
+    circuit.model('NMOS', 'nmos', level=1, vto=0.7, kp=120e-6)
+    circuit.model('PMOS', 'pmos', level=1, vto=-0.7)     # no kp: its kp skew does not apply
+    circuit.V('dd', 'vdd', circuit.gnd, 1.8)
+    circuit.V('in', 'inp', circuit.gnd, 0.9)
+    circuit.M(1, 'out', 'inp', circuit.gnd, circuit.gnd, model='NMOS', w=1e-6, l=1e-6)
+    circuit.M(2, 'out', 'inp', 'vdd', 'vdd', model='PMOS', w=2e-6, l=1e-6)
+    return circuit
+
+
+def _state(circuit):
+    return (str(circuit), circuit['Vdd'].dc_value,
+            {name: dict(model._parameters) for name, model in circuit._models.items()})
+
+
+def _sweep(circuit, **kwargs):
+    # Without a vto shift only NMOS kp changes: fs == ff and sf == ss
+    return CornerSweep(circuit, 'operating_point', kwargs.pop('metrics', None),
+                       temperature=[25, 85], supplies={'Vdd': [1.8, 2.0]},
+                       models=skew_corners('NMOS', 'PMOS', vto_shift=0), cache=False, **kwargs)
+
+
+def test_decks_deduplicate():
+    unique, keys = _sweep(inverter()).decks()
+    assert len(keys) == 2 * 2 * 5
+    assert len(unique) == 2 * 2 * 3
+    assert len(set(keys)) == len(unique)
+
+    # The first five corners are the models at 25 C and Vdd = 1.8
+    by_model = dict(zip(_sweep(inverter()).axes['model'], keys))
+    assert by_model['fs'] == by_model['ff'] != by_model['tt']
+    assert by_model['sf'] == by_model['ss'] != by_model['tt']
+    assert 'kp=0.000132' in unique[by_model['ff']]
+
+
+def test_decks_leave_circuit_unchanged():
+    circuit = inverter()
+    before = _state(circuit)
+    models = {'tt': {}, 'slow': {'NMOS': {'vto': 0.8, 'lambda': 0.02}, 'PMOS': {'vto': lambda vto: vto - 0.1}}}
+    sweep = CornerSweep(circuit, 'operating_point', None, temperature=[-40, 125],
+                        supplies={'Vdd': [1.6, 2.0]}, models=models, cache=False)
+    unique, keys = sweep.decks()
+    assert len(unique) == len(keys) == 8
+    assert any('lambda=0.02' in deck for deck in unique.values())
+    assert _state(circuit) == before
+
+
+def test_run_simulates_each_distinct_deck_once(monkeypatch):
+    decks = []
+
+    def simulate_deck(deck):
+        decks.append(deck)
+        vdd = float(re.search(r'^Vdd vdd 0 (\S+)$', deck, re.MULTILINE).group(1))
+        return {'operating_point': Waveforms('operating_point', {'vdd': np.array(vdd)})}
+
+    monkeypatch.setattr(corners, 'simulate_deck', simulate_deck)
+    circuit = inverter()
+    before = _state(circuit)
+    result = _sweep(circuit, metrics=lambda outcome: {'vdd': float(outcome['operating_point']['vdd'])}).run(jobs=1)
+    assert len(decks) == len(set(decks)) == 12
+    assert result.values.shape == (2, 2, 5, 1)
+    assert result.sel('vdd', Vdd=2.0) == pytest.approx(np.full((2, 5), 2.0))
+    assert _state(circuit) == before
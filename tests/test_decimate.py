@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from spicepilot.decimate import decimate, lttb, minmax_indices
+
+N = 100_000
+X = np.linspace(0, 1e-3, N)
+
+
+def test_ramp_keeps_two_points_per_bin():
+    index = minmax_indices(X, X * 2, bins=1000)
+    # 100 samples per bin: its first (minimum) and last (maximum) sample
+    assert len(index) == 2000
+    assert index[0] == 0 and index[-1] == N - 1
+    assert np.all(np.diff(index) > 0)
+    # Short traces are returned whole
+    assert minmax_indices(X[:2002], X[:2002], bins=1000).tolist() == list(range(2002))
+
+
+def test_single_sample_spike_survives():
+    y = np.sin(2 * np.pi * 5e3 * X)
+    y[54_321] = 7.0
+    y[12_345] = -7.0
+    index = minmax_indices(X, y, bins=500)
+    assert 54_321 in index and 12_345 in index
+    assert len(index) <= 2 * 500 + 2
+    x, (decimated,) = decimate(X, [y], bins=500)
+    assert decimated.max() == 7.0 and decimated.min() == -7.0
+    assert len(x) == len(decimated) == len(index)
+
+
+def test_nan_next_to_spike():
+    y = np.zeros(N)
+    y[50_000] = np.nan
+    y[50_001] = 5.0
+    y[50_002] = -5.0
+    index = minmax_indices(X, y, bins=1000)
+    # The finite extrema of the bin and the NaN (a gap in the plot) are all kept
+    assert {50_000, 50_001, 50_002} <= set(index)
+    # A bin of NaN only keeps its first sample
+    y[:100] = np.nan
+    index = minmax_indices(X, y, bins=1000)
+    assert 0 in index and not set(range(1, 99)) & set(index)
+
+
+def test_nan_in_complex_response():
+    frequency = np.logspace(0, 9, N)
+    response = 1 / (1 + 1j * frequency / 1e4) ** 3
+    clean = minmax_indices(frequency, response, bins=300, log=True)
+    response[1000] = np.nan
+    index = minmax_indices(frequency, response, bins=300, log=True)
+    # The phase after the NaN is still unwrapped and reduced
+    assert index[index > 2000].tolist() == clean[clean > 2000].tolist()
+    assert 1000 in index
+
+
+def test_traces_and_log_bins():
+    frequency = np.logspace(0, 9, N)
+    response = 1 / (1 + 1j * frequency / 1e4)
+    x, traces = decimate(frequency, {'vout': response, 'both': np.stack([response, 2 * response])},
+                         bins=300, log=True)
+    assert list(traces) == ['vout', 'both']
+    assert traces['both'].shape == (2, len(x))
+    assert x[0] == 1 and x[-1] == 1e9
+    # Log bins: every decade keeps about the same number of points
+    per_decade = np.histogram(np.log10(x), bins=9, range=(0, 9))[0]
+    assert per_decade.max() <= 2 * per_decade.min()
+
+
+def test_lttb():
+    y = np.sin(2 * np.pi * 5e3 * X)
+    y[54_321] = 7.0
+    index = lttb(X, y, points=400)
+    assert len(index) == 400
+    assert index[0] == 0 and index[-1] == N - 1
+    assert np.all(np.diff(index) > 0)
+    assert 54_321 in index
+    assert lttb(X[:10], y[:10], points=20).tolist() == list(range(10))
+
@@ -0,0 +1,88 @@
+from PySpice.Spice.Netlist import Circuit, SubCircuit
+
+from spicepilot.catalogue import transistor_count
+from spicepilot.hierarchy import Hierarchy, deduplicate, device_counts, instance_counts, structural_key
+
+BITS = 8
+
+
+class Nand(SubCircuit):
+    NAME = 'nand'
+    NODES = ('a', 'b', 'y', 'vdd')
+
+    def __init__(self):
+        super().__init__(self.NAME, *self.NODES)
+        self.MOSFET(1, 'y', 'a', 'vdd', 'vdd', model='pmos')
+        self.MOSFET(2, 'y', 'b', 'vdd', 'vdd', model='pmos')
+        self.MOSFET(3, 'y', 'a', 'mid', self.gnd, model='nmos')
+        self.MOSFET(4, 'mid', 'b', self.gnd, self.gnd, model='nmos')
+
+
+class FlipFlop(SubCircuit):
+    """One copy per bit with its own names, as claude_high_1.py registers FF0..FF7."""
+
+    def __init__(self, i, width=1e-6):
+        super().__init__(f'FF{i}', 'd', 'clk', 'q', 'vdd')
+        self.X(f'g{i}_1', 'nand', 'd', 'clk', f'set{i}', 'vdd')
+        self.X(f'g{i}_2', 'nand', f'set{i}', 'clk', f'reset{i}', 'vdd')
+        self.X(f'g{i}_3', 'nand', f'set{i}', f'qb{i}', 'q', 'vdd')
+        self.X(f'g{i}_4', 'nand', f'reset{i}', 'q', f'qb{i}', 'vdd')
+        self.C(f'load{i}', 'q', self.gnd, 1e-15)
+        self.M(f'keeper{i}', 'q', f'qb{i}', self.gnd, self.gnd, model='nmos', w=width)
+
+
+def shift_register(widths=None):
+    circuit = Circuit('shift register')
+    circuit.model('nmos', 'nmos', vto=0.7, kp=120e-6)
+    circuit.model('pmos', 'pmos', vto=-0.7, kp=60e-6)
+    circuit.subcircuit(Nand())
+    for i in range(BITS):
+        circuit.subcircuit(FlipFlop(i, (widths or {}).get(i, 1e-6)))
+        circuit.X(i, f'FF{i}', f'q{i - 1}' if i else 'din', 'clk', f'q{i}', 'vdd')
+    circuit.V('dd', 'vdd', circuit.gnd, 3.3)
+    return circuit
+
+
+def test_structural_key_ignores_names():
+    keys = {'nand': structural_key(Nand())}
+    assert len({structural_key(FlipFlop(i), keys) for i in range(BITS)}) == 1
+    assert structural_key(FlipFlop(0, width=2e-6), keys) != structural_key(FlipFlop(0), keys)
+
+
+def test_deduplicate_shift_register():
+    circuit = shift_register()
+    devices = device_counts(circuit)
+    netlist = str(circuit)
+    assert devices['M'] == BITS * (4 * 4 + 1) == transistor_count(netlist)
+    assert netlist.count('.subckt') == BITS + 1
+
+    renamed = deduplicate(circuit)
+    assert renamed == {f'FF{i}': 'FF0' for i in range(1, BITS)}
+    merged = str(circuit)
+    assert merged.count('.subckt') == 2
+    assert merged.count('.subckt FF0 ') == 1
+    assert all(f'X{i} ' in merged and f' FF0\n' in merged for i in range(BITS))
+    # Same flattened circuit
+    assert device_counts(circuit) == devices
+    assert transistor_count(merged) == devices['M']
+    assert instance_counts(circuit) == {'FF0': BITS, 'nand': 4 * BITS}
+
+
+def test_different_definitions_stay():
+    circuit = shift_register(widths={3: 2e-6})
+    renamed = deduplicate(circuit)
+    assert 'FF3' not in renamed and len(renamed) == BITS - 2
+    assert str(circuit).count('.subckt') == 3
+    assert device_counts(circuit)['M'] == BITS * 17
+
+
+def test_hierarchy_emits_each_cell_once():
+    circuit = Circuit('built')
+    hierarchy = Hierarchy(circuit)
+    nand = hierarchy.add(Nand())
+    cells = [hierarchy.add(FlipFlop(i)) for i in range(BITS)]
+    assert all(cell is cells[0] for cell in cells)
+    hierarchy.array(cells[0], 'FF', BITS, lambda i: (f'q{i - 1}' if i else 'din', 'clk', f'q{i}', 'vdd'))
+    assert str(circuit).count('.subckt') == 2
+    assert hierarchy.counts() == {'FF0': BITS, nand.name: 4 * BITS}
+    assert hierarchy.device_counts()['M'] == BITS * 17
@@ -0,0 +1,91 @@
+import io
+
+import pytest
+from PySpice.Spice.Netlist import Circuit, SubCircuit
+
+from spicepilot.kicad import SIMULATION_COMMANDS, add_simulation_commands, find_final_end, write_kicad
+
+
+class Inverter(SubCircuit):
+    NAME = 'inv'
+    NODES = ('a', 'y', 'vdd')
+
+    def __init__(self):
+        super().__init__(self.NAME, *self.NODES)
+        self.MOSFET(1, 'y', 'a', 'vdd', 'vdd', model='pmos')
+        self.MOSFET(2, 'y', 'a', self.gnd, self.gnd, model='nmos')
+
+
+def chain():
+    circuit = Circuit('inverter chain')
+    circuit.subcircuit(Inverter())
+    circuit.model('nmos', 'nmos', vto=0.7, kp=120e-6)
+    circuit.model('pmos', 'pmos', vto=-0.7, kp=60e-6)
+    circuit.V('dd', 'vdd', circuit.gnd, 3.3)
+    circuit.V('in', 'vin', circuit.gnd, 'DC 0 AC 1')
+    circuit.X(1, 'inv', 'vin', 'mid', 'vdd')
+    circuit.X(2, 'inv', 'mid', 'vout', 'vdd')
+    circuit.R('off', 'vout', circuit.gnd, '1k').enabled = False
+    return circuit
+
+
+# Lines that look like the final .end without being it
+DECOY = ('.subckt inv a y\n.ends inv\n.control\nop\n.endc\n* .end in a comment\n.end\n'
+         '.endc\n.ends\n  .END  \n.endfoo\n')
+
+
+def test_find_final_end_every_chunk_size():
+    data = DECOY.encode()
+    expected = data.rindex(b'  .END  ')
+    for chunk_size in range(1, len(data) + 2):
+        assert find_final_end(io.BytesIO(data), chunk_size) == expected, chunk_size
+
+
+def test_find_final_end_without_end():
+    data = b'.title x\n.endc\n.ends inv\n'
+    assert all(find_final_end(io.BytesIO(data), size) is None for size in range(1, len(data) + 1))
+    assert find_final_end(io.BytesIO(b'')) is None
+    assert find_final_end(io.BytesIO(b'.end')) == 0
+
+
+def test_streamed_netlist_matches_pyspice():
+    circuit = chain()
+    buffer = io.StringIO()
+    count = write_kicad(circuit, buffer)
+    text = buffer.getvalue()
+    assert count == text.count('\n') and text.endswith('\n.end\n')
+    body = text[:text.index('* SIMULATION COMMANDS')]
+    netlist = [line for line in body.splitlines() if line and not line.startswith('*')]
+    assert netlist == str(circuit).splitlines()
+    assert 'Roff' not in text
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 7, 64, 1 << 16])
+def test_add_simulation_commands(tmp_path, chunk_size):
+    circuit = chain()
+    path = tmp_path / 'chain.cir'
+    # str(circuit) stops before the .end PySpice's simulators append
+    path.write_bytes((str(circuit) + '.end\n').encode())
+    add_simulation_commands(path, ['ac', 'tran'], chunk_size=chunk_size)
+    block = '\n'.join(SIMULATION_COMMANDS['ac']) + '\n\n' + '\n'.join(SIMULATION_COMMANDS['tran'])
+    assert path.read_text() == str(circuit) + block + '\n\n.end\n'
+
+
+def test_add_simulation_commands_after_streamed_netlist(tmp_path):
+    paths = [tmp_path / f'{name}.cir' for name in ('a', 'b')]
+    for path in paths:
+        write_kicad(chain(), path)
+    streamed = paths[0].read_text()
+    add_simulation_commands(paths, 'dc', chunk_size=5)
+    final = streamed.rindex('\n.end\n') + 1
+    expected = streamed[:final] + '\n'.join(SIMULATION_COMMANDS['dc']) + '\n\n' + streamed[final:]
+    assert [path.read_text() for path in paths] == [expected, expected]
+    # The .endc of the control block stays where it was
+    assert expected.count('.endc') == 2
+
+
+def test_add_simulation_commands_without_end(tmp_path):
+    path = tmp_path / 'open.cir'
+    path.write_text('.title open\nR1 a 0 1k\n')
+    add_simulation_commands(path, 'unknown')
+    assert path.read_text() == '.title open\nR1 a 0 1k\n\n\n' + '\n'.join(SIMULATION_COMMANDS['all']) + '\n\n.end\n'
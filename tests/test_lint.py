@@ -0,0 +1,53 @@
+from PySpice.Spice.Netlist import Circuit, SubCircuit
+
+from spicepilot.lint import ERROR, has_errors, lint
+
+
+class GroundedCell(SubCircuit):
+    """Subcircuit whose second port is called GND (lint() maps gnd to ground)."""
+    NAME = 'grounded_cell'
+    NODES = ('a', 'GND')
+
+    def __init__(self):
+        super().__init__(self.NAME, *self.NODES)
+        self.R(1, 'a', 'GND', '1k')
+
+
+def _checks(issues):
+    return {issue.check for issue in issues}
+
+
+def test_subcircuit_port_named_gnd():
+    circuit = Circuit('gnd port')
+    circuit.subcircuit(GroundedCell())
+    circuit.X(1, GroundedCell.NAME, 'a', circuit.gnd)
+    circuit.V('a', 'a', circuit.gnd, 1)
+    assert lint(circuit) == []
+
+
+def test_floating_node():
+    circuit = Circuit('floating')
+    circuit.V('dd', 'vdd', circuit.gnd, 1)
+    circuit.R(1, 'vdd', 'mid', '1k')
+    circuit.C(1, 'mid', 'top', '1p')
+    circuit.C(2, 'top', circuit.gnd, '1p')
+    issues = lint(circuit)
+    assert has_errors(issues)
+    assert [issue.node for issue in issues if issue.check == 'no-dc-path'] == ['top']
+
+
+def test_voltage_loop():
+    circuit = Circuit('loop')
+    circuit.V(1, 'a', circuit.gnd, 1)
+    circuit.V(2, 'a', circuit.gnd, 2)
+    circuit.R(1, 'a', circuit.gnd, '1k')
+    issues = lint(circuit)
+    assert 'voltage-loop' in _checks(issues)
+    assert issues[0].severity == ERROR
+
+
+def test_undefined_subcircuit():
+    circuit = Circuit('missing')
+    circuit.V(1, 'a', circuit.gnd, 1)
+    circuit.X(1, 'nowhere', 'a', circuit.gnd)
+    assert 'undefined-subcircuit' in _checks(lint(circuit))
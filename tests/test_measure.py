@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from spicepilot.measure import (FALLING, RISING, crossings, duty_cycle, fall_time, frequency, period,
+                                propagation_delay, rise_time)
+
+T = np.linspace(0, 40, 4001)
+
+
+def trapezoid(t, period=10.0, rise=1.0, high=4.0, fall=2.0, delay=0.0, amplitude=1.0):
+    """Pulse train from 0 to `amplitude`: rising at delay + k * period, then high, falling, low."""
+    phase = np.mod(t - delay, period)
+    corners = [0, rise, rise + high, rise + high + fall, period]
+    return amplitude * np.interp(phase, corners, [0, 1, 1, 0, 0])
+
+
+def test_crossings_of_ramp():
+    ramp = T / 40
+    assert crossings(T, ramp, 0.25) == pytest.approx([10.0])
+    assert crossings(T, ramp, 0.25, FALLING).size == 0
+    with pytest.raises(ValueError):
+        crossings(T, ramp, 0.25, 'up')
+
+
+def test_square_wave():
+    y = trapezoid(T, amplitude=3.3)
+    # Mid-swing crossings: rising at 0.5 + 10k, falling at 6 + 10k
+    assert crossings(T, y, direction=RISING) == pytest.approx([0.5, 10.5, 20.5, 30.5])
+    assert crossings(T, y, direction=FALLING) == pytest.approx([6.0, 16.0, 26.0, 36.0])
+    assert period(T, y) == pytest.approx([10.0] * 3)
+    assert frequency(T, y) == pytest.approx(0.1)
+    assert duty_cycle(T, y) == pytest.approx([0.55] * 3)
+
+
+def test_rise_and_fall_time():
+    y = trapezoid(T, amplitude=5.0)
+    assert rise_time(T, y) == pytest.approx([0.8] * 4)
+    assert fall_time(T, y) == pytest.approx([1.6] * 4)
+    # Absolute levels instead of fractions of the swing
+    assert rise_time(T, y, v_low=1.0, v_high=4.0) == pytest.approx([0.6] * 4)
+
+
+def test_propagation_delay():
+    vin = trapezoid(T)
+    vout = 1 - trapezoid(T, delay=1.5)
+    delays = propagation_delay(T, vin, vout, threshold=0.5, input_edge=RISING, output_edge=FALLING)
+    assert delays == pytest.approx([1.5] * 4)
+    # Input edges the output never answers are dropped
+    assert propagation_delay(T, vin, np.zeros_like(T), threshold=0.5).size == 0
+
+
+def test_matrix_rows():
+    y = np.stack([trapezoid(T), trapezoid(T, period=5.0, rise=0.5, high=2.0, fall=0.5), np.full(T.size, 0.3)])
+    periods = period(T, y, threshold=0.5)
+    assert len(periods) == 3
+    assert periods[0] == pytest.approx([10.0] * 3)
+    assert periods[1] == pytest.approx([5.0] * 7)
+    assert periods[2].size == 0
+    frequencies = frequency(T, y, threshold=0.5)
+    assert frequencies[:2] == pytest.approx([0.1, 0.2])
+    # No crossing, no frequency
+    assert np.isnan(frequencies[2])
+    assert [d.size for d in duty_cycle(T, y, threshold=0.5)] == [3, 7, 0]
+    assert rise_time(T, y)[1] == pytest.approx([0.4] * 8)
+    delays = propagation_delay(T, y[0], y[:2], threshold=0.5, input_edge=RISING, output_edge=RISING)
+    assert delays[0] == pytest.approx([0.0] * 4)
+    # Row 1 rises at 0.25 + 5k: the first edge after each input edge is 4.75 later
+    assert delays[1] == pytest.approx([4.75] * 4)
+
+
+def test_no_crossing():
+    flat = np.ones_like(T)
+    assert np.isnan(frequency(T, flat))
+    assert period(T, flat).size == 0
+    assert duty_cycle(T, flat).size == 0
+    assert rise_time(T, flat).size == 0
@@ -0,0 +1,122 @@
+import re
+
+import numpy as np
+import pytest
+from PySpice.Spice.Netlist import Circuit
+from PySpice.Unit import u_kOhm
+
+from spicepilot import optimize
+from spicepilot.optimize import CMAES, INFEASIBLE, DesignVariable, SizingOptimizer, violation
+from spicepilot.waveforms import Waveforms
+
+
+def divider():
+    circuit = Circuit('divider')
+    circuit.V('dd', 'vdd', circuit.gnd, 2)
+    circuit.R(1, 'vdd', 'out', 10@u_kOhm)
+    circuit.R(2, 'out', circuit.gnd, 10@u_kOhm)
+    return circuit
+
+
+def _value(deck, name):
+    text = re.search(rf'^{name} \S+ \S+ (\S+)$', deck, re.MULTILINE).group(1)
+    return float(text.replace('kOhm', 'e3'))
+
+
+def solve(deck):
+    """Stand-in for ngspice: the divider's operating point, worked out from the deck."""
+    r1, r2 = _value(deck, 'R1'), _value(deck, 'R2')
+    if r1 > 90e3:
+        return None
+    return {'operating_point': Waveforms('operating_point', {'out': np.array(2 * r2 / (r1 + r2))})}
+
+
+def output(outcome):
+    return {'out': float(outcome['operating_point']['out'])}
+
+
+@pytest.fixture
+def simulations(monkeypatch):
+    decks = []
+
+    def simulate_deck(deck):
+        decks.append(deck)
+        return solve(deck)
+
+    monkeypatch.setattr(optimize, 'simulate_deck', simulate_deck)
+    return decks
+
+
+def _optimizer(**kwargs):
+    return SizingOptimizer(divider(), [DesignVariable('R1', 1e3, 100e3, log=True)], 'operating_point',
+                           kwargs.pop('metrics', output), {'out': (0.9, 1.1)}, cache=False, **kwargs)
+
+
+def test_cmaes_converges_on_quadratic():
+    optimum = np.array([0.3, -0.2, 0.5])
+    strategy = CMAES(np.zeros(3), sigma=0.5, seed=1)
+    for _ in range(150):
+        batch = strategy.ask()
+        cost = np.sum((batch - optimum) ** 2, axis=1)
+        strategy.tell(batch, np.argsort(np.argsort(cost)))
+    assert strategy.mean == pytest.approx(optimum, abs=1e-4)
+    assert strategy.sigma < 1e-3
+
+
+def test_violation():
+    targets = {'gain': (60, None), 'power': (None, 1e-3)}
+    assert violation({'gain': 70, 'power': 5e-4}, targets) == 0
+    assert violation({'gain': 30, 'power': 2e-3}, targets) == pytest.approx(0.5 + 1.0)
+    assert violation({'gain': np.nan, 'power': 0}, targets) == 10.0
+    assert violation(None, targets) == INFEASIBLE
+
+
+def test_evaluate_ranks_by_violation(simulations):
+    optimizer = _optimizer()
+    # R1 = 1k, 10k (out = 1 V), 100k (simulation fails)
+    evaluated = optimizer.evaluate(np.array([[0.0], [0.5], [1.0]]))
+    violations = [row[0] for row in evaluated]
+    assert violations[1] == 0
+    assert 0 < violations[0] < violations[2] == INFEASIBLE
+    assert evaluated[1][2]['out'] == pytest.approx(1.0)
+    assert evaluated[2][2] is None
+    assert len(simulations) == 3
+
+
+def test_metrics_errors_propagate(simulations):
+    optimizer = _optimizer(metrics=lambda outcome: {'out': float(outcome['operating_point']['vout'])})
+    # A typo in the metrics must surface, not turn every candidate infeasible
+    with pytest.raises(IndexError):
+        optimizer.evaluate(np.array([[0.5]]))
+
+
+def test_prescreen_rejects_candidates(simulations):
+    screened = []
+
+    def prescreen(candidates):
+        screened.extend(candidates)
+        return [2 if values['R1'] < 5e3 else 0 for values in candidates]
+
+    optimizer = _optimizer(prescreen=prescreen)
+    evaluated = optimizer.evaluate(np.array([[0.0], [0.5]]))
+    assert len(screened) == 2
+    # Rejected candidates are never simulated
+    assert len(simulations) == 1 and 'R1 vdd out 10000.0' in simulations[0]
+    assert evaluated[0][0] == INFEASIBLE + 2
+    assert evaluated[1][0] == 0
+
+
+def test_run_finds_feasible_sizing(simulations):
+    result = _optimizer().run(budget=60, jobs=1, x0={'R1': 80e3}, seed=3)
+    assert result.feasible
+    assert 0.9 <= result.metrics['out'] <= 1.1
+    assert result.simulations == len(simulations) <= result.evaluations
+
+
+def test_prescreen_errors_fall_back_to_simulation(simulations):
+    def prescreen(candidates):
+        raise ValueError('only level-1 models are supported')
+
+    evaluated = _optimizer(prescreen=prescreen).evaluate(np.array([[0.0], [0.5]]))
+    assert len(simulations) == 2
+    assert evaluated[1][0] == 0
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from spicepilot import plotting
+from spicepilot.plotting import FigureSpec, Plotter, _draw_bode, _draw_lines
+
+
+def _plotter():
+    return Plotter(enabled=True, dpi_cap=50, decimation=False)
+
+
+def _figure(spec):
+    figure = Figure(figsize=spec.figsize)
+    FigureCanvasAgg(figure)
+    (_draw_bode if spec.kind == 'bode' else _draw_lines)(figure, spec)
+    return figure
+
+
+def test_render_inline_by_default(tmp_path, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError('render() started a process pool')
+
+    monkeypatch.setattr(plotting, 'ProcessPoolExecutor', no_pool)
+    plots = _plotter()
+    time = np.linspace(0, 1, 50)
+    for k in range(3):
+        plots.transient(str(tmp_path / f'tran{k}.png'), time, {'out': np.sin(time * k)})
+    written = plots.render()
+    assert written == [str(tmp_path / f'tran{k}.png') for k in range(3)]
+    assert all((tmp_path / f'tran{k}.png').exists() for k in range(3))
+    assert len(plots) == 0
+
+
+def test_render_pool_only_when_asked(tmp_path, monkeypatch):
+    pools = []
+
+    class Pool:
+        def __init__(self, max_workers):
+            pools.append(max_workers)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def map(self, function, specs):
+            return map(function, specs)
+
+    monkeypatch.setattr(plotting, 'ProcessPoolExecutor', Pool)
+    plots = _plotter()
+    for k in range(2):
+        plots.sweep(str(tmp_path / f'sweep{k}.png'), np.arange(10.0), {'out': np.arange(10.0)})
+    plots.render(jobs=8)
+    assert pools == [2]
+
+
+def test_bode_limits_and_styles():
+    frequency = np.logspace(0, 6, 200)
+    response = 1000 / (1 + 1j * frequency / 1e3)
+    spec = FigureSpec('bode', 'unused.png', frequency, {'Gain': response}, figsize=(6, 4),
+                      ylim=(-20, 80), phase_ylim=(-200, 50),
+                      styles={'Gain': dict(color='b', linewidth=2.5)},
+                      phase_styles={'Gain': dict(color='r', linewidth=2.5, label='Phase')})
+    magnitude_axis, phase_axis = _figure(spec).get_axes()
+    assert magnitude_axis.get_ylim() == (-20, 80)
+    assert phase_axis.get_ylim() == (-200, 50)
+    magnitude, = [line for line in magnitude_axis.get_lines() if line.get_label() == 'Gain']
+    phase, = [line for line in phase_axis.get_lines() if line.get_label() == 'Phase']
+    assert magnitude.get_color() == 'b' and magnitude.get_linewidth() == 2.5
+    assert phase.get_color() == 'r' and phase.get_linewidth() == 2.5
+
+
+def test_lines_default_style():
+    spec = FigureSpec('transient', 'unused.png', np.arange(5.0), {'in': np.zeros(5), 'out': np.ones(5)},
+                      styles={'out': dict(linestyle='--')}, ylim=(-1, 2))
+    axis, = _figure(spec).get_axes()
+    lines = {line.get_label(): line for line in axis.get_lines()}
+    assert lines['in'].get_linewidth() == pytest.approx(1.5)
+    assert lines['out'].get_linestyle() == '--'
+    assert axis.get_ylim() == (-1, 2)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from PySpice.Spice.Netlist import Circuit
+from PySpice.Unit import u_kOhm, u_uA, u_V
+
+from spicepilot.prescreen import CUTOFF, SATURATION, Prescreen, spice_float
+
+
+def mirror():
+    """
+    NMOS mirror worked out by hand: Iref = kp/2 * W/L * (vg - vto)^2 gives
+    vg = 0.5 + sqrt(0.05) = 0.7236 V, and out = 1.8 V - 50 uA * 10 kOhm = 1.3 V.
+    """
+    circuit = Circuit('mirror')
+    circuit.model('NMOS', 'nmos', kp=200e-6, vto=0.5)
+    circuit.V('dd', 'vdd', circuit.gnd, 1.8@u_V)
+    circuit.I('ref', 'vdd', 'g', 50@u_uA)
+    circuit.MOSFET(1, 'g', 'g', circuit.gnd, circuit.gnd, model='NMOS', w=10e-6, l=1e-6)
+    circuit.MOSFET(2, 'out', 'g', circuit.gnd, circuit.gnd, model='NMOS', w=10e-6, l=1e-6)
+    circuit.R(1, 'vdd', 'out', 10@u_kOhm)
+    return circuit
+
+
+def test_spice_float():
+    assert spice_float('2.5 AC 0.5') == 2.5
+    assert spice_float('DC 1') == 1.0
+    assert spice_float('45u') == pytest.approx(45e-6)
+    assert spice_float('1meg') == 1e6
+    assert spice_float(None) == 0.0
+
+
+def test_current_mirror():
+    op = Prescreen(mirror()).solve()
+    assert op.converged.all()
+    assert op['g'][0] == pytest.approx(0.5 + np.sqrt(0.05), abs=1e-6)
+    assert op['out'][0] == pytest.approx(1.3, abs=1e-6)
+    assert op.device('M2')['id'] == pytest.approx(50e-6)
+    assert (op.region == SATURATION).all()
+
+
+def test_batched_candidates():
+    screen = Prescreen(mirror())
+    op = screen.solve({'Iref': [20e-6, 50e-6, 80e-6], 'M2.w': [10e-6, 20e-6, 10e-6]})
+    beta = 200e-6 * 10
+    expected_g = 0.5 + np.sqrt(2 * np.array([20e-6, 50e-6, 80e-6]) / beta)
+    assert op['g'] == pytest.approx(expected_g, abs=1e-6)
+    assert op['out'] == pytest.approx(1.8 - 1e4 * np.array([20e-6, 100e-6, 80e-6]), abs=1e-6)
+
+
+def test_check_flags_railed_output_and_cutoff():
+    screen = Prescreen(mirror(), outputs=['out'])
+    values = {'Iref': np.array([50e-6, 50e-6, 0.0]), 'R1': np.array([10e3, 1e6, 10e3])}
+    op = screen.solve(values)
+    # Too large a load drives the output to ground; no reference current turns both devices off
+    assert op['out'][1] < 0.1 and op['out'][2] == pytest.approx(1.8)
+    assert (op.region[2] == CUTOFF).all()
+    assert screen.check(op, values).tolist() == [0, 1, 3]
+    # The optimizer hook takes one {target: value} dict per candidate
+    candidates = [{'Iref': i, 'R1': r} for i, r in zip(values['Iref'], values['R1'])]
+    assert screen(candidates).tolist() == [0, 1, 3]
+
+
+def test_unsupported_circuits():
+    circuit = mirror()
+    circuit.D(1, 'out', circuit.gnd, model='D')
+    with pytest.raises(TypeError):
+        Prescreen(circuit)
+    circuit = mirror()
+    circuit.MOSFET(3, 'out', 'g', circuit.gnd, circuit.gnd, model='PMOS')
+    with pytest.raises(ValueError):
+        Prescreen(circuit)
+    circuit = mirror()
+    circuit.model('BSIM', 'nmos', level=8)
+    circuit.MOSFET(3, 'out', 'g', circuit.gnd, circuit.gnd, model='BSIM')
+    with pytest.raises(ValueError):
+        Prescreen(circuit)
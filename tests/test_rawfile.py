@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from spicepilot.rawfile import read_ascii_log, read_rawfile, write_rawfile
+from spicepilot.waveforms import Waveforms
+
+LOG = Path(__file__).resolve().parent.parent / 'results' / 'logs' / 'opamp_kicad_test.log'
+
+
+def _plots():
+    rng = np.random.default_rng(0)
+    frequency = np.logspace(0, 9, 91)
+    time = np.linspace(0, 1e-6, 257)
+    return [
+        Waveforms('operating_point', {'vout': np.array(1.25), 'n1': np.array(-3.5e-9)},
+                  {'vdd': np.array(-1.98547e-3)}),
+        Waveforms('ac', {'vout': rng.normal(size=91) + 1j * rng.normal(size=91)},
+                  {'vdd': rng.normal(size=91) * 1j}, 'frequency', frequency),
+        Waveforms('transient', {'vout': np.sin(time * 1e7), 'vin': rng.normal(size=257)}, {},
+                  'time', time),
+        Waveforms('dc', {'vout': rng.normal(size=11)}, {'vdd': rng.normal(size=11)},
+                  'sweep', np.linspace(0, 5, 11)),
+    ]
+
+
+def _assert_same(read, written):
+    assert [plot.analysis for plot in read] == [plot.analysis for plot in written]
+    for got, expected in zip(read, written):
+        assert got.abscissa_name == expected.abscissa_name
+        if expected.abscissa is None:
+            assert got.abscissa is None
+        else:
+            assert np.array_equal(got.abscissa, expected.abscissa)
+        for mine, theirs in ((got.nodes, expected.nodes), (got.branches, expected.branches)):
+            assert list(mine) == list(theirs)
+            for name in theirs:
+                assert mine[name].shape == theirs[name].shape
+                assert np.array_equal(mine[name], theirs[name])
+
+
+def test_rawfile_round_trip_is_exact(tmp_path):
+    plots = _plots()
+    write_rawfile(tmp_path / 'all.raw', plots)
+    _assert_same(read_rawfile(tmp_path / 'all.raw'), plots)
+
+
+def test_read_ascii_rawfile(tmp_path):
+    path = tmp_path / 'ascii.raw'
+    path.write_text('Title: divider\n'
+                    'Plotname: DC transfer characteristic\n'
+                    'Flags: real\n'
+                    'No. Variables: 3\n'
+                    'No. Points: 2\n'
+                    'Variables:\n'
+                    '\t0\tv-sweep\tvoltage\n'
+                    '\t1\tv(out)\tvoltage\n'
+                    '\t2\tvdd#branch\tcurrent\n'
+                    'Values:\n'
+                    ' 0\t0.000000e+00\n\t0.000000e+00\n\t0.000000e+00\n'
+                    ' 1\t2.000000e+00\n\t1.000000e+00\n\t-1.000000e-04\n')
+    plot, = read_rawfile(path)
+    assert plot.analysis == 'dc'
+    assert np.array_equal(plot.abscissa, [0, 2])
+    assert np.array_equal(plot.nodes['out'], [0, 1])
+    assert np.array_equal(plot.branches['vdd'], [0, -1e-4])
+
+
+def test_read_ascii_log():
+    operating_point, ac = read_ascii_log(LOG)
+
+    assert operating_point.analysis == 'operating_point'
+    assert len(operating_point.nodes) == 10
+    assert len(operating_point.branches) == 5
+    assert operating_point.nodes['vout'] == pytest.approx(9.054408e-02)
+    assert operating_point.branches['vdd'] == pytest.approx(-1.98547e-03)
+
+    assert ac.analysis == 'ac'
+    assert ac.abscissa_name == 'frequency'
+    assert len(ac.abscissa) == len(ac.nodes['vout']) == 1001
+    assert ac.abscissa[[0, -1]] == pytest.approx([0.1, 1e9])
+    assert ac.nodes['vout'][0] == pytest.approx(-1.17013 + 1.184633e-07j)
+
+
+def test_log_converts_to_rawfile(tmp_path):
+    plots = read_ascii_log(LOG)
+    write_rawfile(tmp_path / 'opamp.raw', plots)
+    _assert_same(read_rawfile(tmp_path / 'opamp.raw'), plots)
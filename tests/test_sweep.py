@@ -0,0 +1,35 @@
+import pytest
+from PySpice.Spice.Netlist import Circuit
+from PySpice.Unit import u_kOhm
+
+from spicepilot.sweep import OperatingPointSequence
+
+
+class FailingSession:
+    """Session whose every call fails, as when ngspice does not converge."""
+
+    def __getattr__(self, name):
+        raise RuntimeError('ngspice failed')
+
+
+def divider():
+    circuit = Circuit('divider')
+    circuit.V('dd', 'vdd', circuit.gnd, 1)
+    circuit.R(1, 'vdd', 'out', 1@u_kOhm)
+    circuit.R(2, 'out', circuit.gnd, 1@u_kOhm)
+    return circuit
+
+
+def test_unknown_element_is_not_a_convergence_failure():
+    sequence = OperatingPointSequence(divider(), session=FailingSession())
+    with pytest.raises(KeyError):
+        sequence.solve({'Vcc': 1.2})
+    with pytest.raises(KeyError):
+        sequence.solve({'M1.w': 1e-6})
+
+
+def test_failed_point():
+    sequence = OperatingPointSequence(divider(), session=FailingSession())
+    with pytest.raises(RuntimeError, match='Operating point failed'):
+        sequence.solve({'Vdd': 1.2})
+    assert sequence.fallbacks == 0
@@ -0,0 +1,104 @@
+import pytest
+from PySpice.Spice.Netlist import Circuit
+from PySpice.Unit import u_kOhm, u_pF, u_V
+
+from spicepilot.cache import analysis_deck
+from spicepilot.template import DeckTemplate, LiveTemplate
+
+ANALYSES = {'operating_point': {}, 'ac': dict(start_frequency=1, stop_frequency=1e6, number_of_points=10,
+                                              variation='dec')}
+
+
+def amplifier(vdd=1.8@u_V, vin='0.9 AC 1', w1=10e-6, w2=None, vto=0.5, ca=1@u_pF):
+    circuit = Circuit('amplifier')
+    circuit.model('NMOS', 'nmos', kp=200e-6, vto=vto)
+    circuit.V('dd', 'vdd', circuit.gnd, vdd)
+    circuit.V('in', 'inp', circuit.gnd, vin)
+    circuit.R('load', 'vdd', 'out', 10@u_kOhm)
+    circuit.MOSFET(1, 'out', 'inp', 'tail', circuit.gnd, model='NMOS', w=w1, l=1e-6)
+    # No w: ngspice takes it from the model, so the nominal deck has no 'w=' for M2
+    circuit.MOSFET(2, 'tail', 'inp', circuit.gnd, circuit.gnd, model='NMOS', w=w2)
+    circuit.C('A', 'out', circuit.gnd, ca)
+    return circuit
+
+
+def reference(circuit, temperature=25, node_set=None):
+    """The deck PySpice writes for `circuit`."""
+    simulator = circuit.simulator(temperature=temperature, nominal_temperature=25, simulator='ngspice-subprocess')
+    if node_set:
+        simulator.node_set(**node_set)
+    return analysis_deck(simulator, ANALYSES)
+
+
+TARGETS = ['Vdd', 'Vin', 'M1.w', 'M2.w', 'NMOS.vto', 'CA', 'temp']
+
+
+def test_nominal_render_is_pyspice_text():
+    circuit = amplifier()
+    before = str(circuit)
+    template = DeckTemplate(circuit, TARGETS, ANALYSES, node_set=True)
+    assert template.render() == reference(amplifier())
+    assert 'M2 tail inp 0 0 NMOS\n' in template.render()
+    # The circuit is restored after rendering the markers
+    assert str(circuit) == before
+
+
+def test_render_matches_edited_circuit():
+    template = DeckTemplate(amplifier(), TARGETS, ANALYSES, node_set=True)
+    values = {'Vdd': 1.2, 'Vin': 0.6, 'M1.w': 22e-6, 'M2.w': 4e-6, 'NMOS.vto': 0.45, 'CA': 3e-12, 'temp': 85}
+    hints = {'out': 0.9, 'tail': 0.1}
+    expected = reference(amplifier(vdd=1.2, vin=0.6, w1=22e-6, w2=4e-6, vto=0.45, ca=3e-12), temperature=85,
+                         node_set=hints)
+    assert template.render(values, node_set=hints) == expected
+    # Some values changed, the rest nominal
+    assert template.render({'M2.w': 4e-6, 'CA': 3e-12}) == reference(amplifier(w2=4e-6, ca=3e-12))
+
+
+def test_alterations():
+    template = DeckTemplate(amplifier(), TARGETS, ANALYSES)
+    assert template.alterations({'Vdd': 1.2, 'M1.w': 2e-6, 'NMOS.vto': 0.4, 'CA': 3e-12, 'temp': 85}) == [
+        'alter vdd = 1.2', 'alter m1 w = 2e-06', 'altermod NMOS vto = 0.4', 'alter ca = 3e-12',
+        'option temp=85.0']
+
+
+def test_unknown_targets():
+    with pytest.raises(KeyError):
+        DeckTemplate(amplifier(), ['Vcc'], ANALYSES)
+    with pytest.raises(KeyError):
+        DeckTemplate(amplifier(), ['M1.nonsense'], ANALYSES)
+
+
+class RecordingSession:
+    """Stand-in for an NgSpiceShared instance that records the commands it gets."""
+
+    plot_names = ['const']
+
+    def __init__(self):
+        self.circuits = []
+        self.commands = []
+        self.runs = 0
+
+    def destroy(self):
+        pass
+
+    def remove_circuit(self):
+        pass
+
+    def load_circuit(self, deck):
+        self.circuits.append(deck)
+
+    def exec_command(self, command):
+        self.commands.append(command)
+
+    def run(self):
+        self.runs += 1
+
+
+def test_live_template_sends_only_changes():
+    session = RecordingSession()
+    live = LiveTemplate(DeckTemplate(amplifier(), TARGETS, ANALYSES), session)
+    live.run({'Vdd': 1.2, 'CA': 3e-12})
+    live.run({'Vdd': 1.2, 'CA': 4e-12})
+    assert session.circuits == [reference(amplifier())]
+    assert session.commands == ['alter vdd = 1.2', 'alter ca = 3e-12', 'alter ca = 4e-12']
+    assert session.runs == 2
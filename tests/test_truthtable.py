@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from PySpice.Spice.Netlist import Circuit
+
+from spicepilot.truthtable import (DC, TRANSIENT, TruthTableBench, expand, format_truth_table, logic_levels,
+                                   sample, stimulus)
+from spicepilot.waveforms import Waveforms
+
+
+def nand(a, b):
+    return 1 - (a & b)
+
+
+def nand_circuit():
+    circuit = Circuit('CMOS NAND Gate')
+    circuit.model('NMOS', 'nmos', vto=1, kp=120e-6)
+    circuit.model('PMOS', 'pmos', vto=-1, kp=60e-6)
+    circuit.V('dd', 'vdd', circuit.gnd, 5)
+    circuit.V('A', 'inputA', circuit.gnd, 'DC 0 PULSE(0 5 0 1n 1n 10n 20n)')
+    circuit.V('B', 'inputB', circuit.gnd, 'DC 0 PULSE(0 5 0 1n 1n 20n 40n)')
+    circuit.MOSFET('P1', 'output', 'inputA', 'vdd', 'vdd', model='PMOS')
+    circuit.MOSFET('P2', 'output', 'inputB', 'vdd', 'vdd', model='PMOS')
+    circuit.MOSFET('N1', 'output', 'inputA', 'n1', circuit.gnd, model='NMOS')
+    circuit.MOSFET('N2', 'n1', 'inputB', circuit.gnd, circuit.gnd, model='NMOS')
+    return circuit
+
+
+def test_expand_function():
+    bits, expected = expand(nand, 2)
+    assert bits.tolist() == [[0, 0], [0, 1], [1, 0], [1, 1]]
+    assert expected.tolist() == [[1], [1], [1], [0]]
+    assert bits.dtype == expected.dtype == np.int8
+
+
+def test_expand_rows():
+    bits, expected = expand([((1, 0), (1, None)), ((0, 1), (0, 1))], 2)
+    assert bits.tolist() == [[1, 0], [0, 1]]
+    assert expected.tolist() == [[1, -1], [0, 1]]
+    _, single = expand(lambda a: (a, 1 - a), 1)
+    assert single.tolist() == [[0, 1], [1, 0]]
+    with pytest.raises(ValueError):
+        expand([((1,), 0)], 2)
+
+
+def test_logic_levels():
+    levels = logic_levels([0.0, 1.5, 2.5, 3.5, 5.0], 5.0)
+    assert levels.tolist() == [0, 0, -1, 1, 1]
+    assert logic_levels([1.0, 4.0], 5.0, low=0.1, high=0.9).tolist() == [-1, -1]
+
+
+def test_sample():
+    abscissa = np.array([0.0, 1.0, 2.0, 4.0])
+    matrix = np.array([[0.0, 1.0, 2.0, 4.0], [5.0, 5.0, 0.0, 0.0]])
+    values = sample(abscissa, matrix, np.array([0.0, 0.5, 3.0, 4.0, 9.0]))
+    assert values.shape == (2, 5)
+    assert values[0].tolist() == [0.0, 0.5, 3.0, 4.0, 4.0]
+    assert values[1].tolist() == [5.0, 5.0, 0.0, 0.0, 0.0]
+    # Operating points have a single sample
+    assert sample(np.array([0.0]), np.array([[2.0]]), np.arange(3.0)).tolist() == [[2.0, 2.0, 2.0]]
+
+
+def test_dc_stimulus():
+    bits, _ = expand(nand, 2)
+    applied = stimulus(['a', 'b'], bits, 5.0)
+    assert applied.mode == DC
+    assert applied.card == '.dc Vtt_index 0 3 1'
+    assert applied.lines == ['Vtt_index tt_index 0 DC 0',
+                             'Btt_0 a 0 V = pwl(V(tt_index), 0, 0, 1, 0, 2, 5, 3, 5)',
+                             'Btt_1 b 0 V = pwl(V(tt_index), 0, 0, 1, 5, 2, 0, 3, 5)']
+    assert applied.positions.tolist() == [0.0, 1.0, 2.0, 3.0]
+
+
+def test_transient_stimulus():
+    applied = stimulus(['s'], np.array([[1], [0], [1]]), 3.3, TRANSIENT, hold=10e-9, edge=1e-9)
+    assert applied.card == '.tran 2e-10 3e-08'
+    assert applied.lines == ['Vtt_0 s 0 PWL(0 3.3 1e-08 3.3 1.1e-08 0 2e-08 0 2.1e-08 3.3)']
+    assert applied.positions == pytest.approx([10e-9, 20e-9, 30e-9])
+    with pytest.raises(ValueError):
+        stimulus(['s'], np.array([[1]]), 3.3, 'ac')
+
+
+def test_read():
+    bits, expected = expand(nand, 2)
+    applied = stimulus(['a', 'b'], bits, 5.0)
+    output = Waveforms(DC, {'y': np.array([5.0, 4.9, 2.5, 4.0])}, abscissa_name='sweep',
+                       abscissa=np.arange(4.0))
+    result = applied.read({DC: output}, ['y'], expected)
+    assert result.measured.tolist() == [[1], [1], [-1], [1]]
+    assert result.voltages[:, 0].tolist() == [5.0, 4.9, 2.5, 4.0]
+    assert not result.passed
+    assert result.mismatches == [(2, 'y'), (3, 'y')]
+    # Don't-care outputs never fail
+    expected[2:] = -1
+    assert applied.read({DC: output}, ['y'], expected).passed
+
+
+@pytest.mark.parametrize('supply', ['Vdd', 'dd'])
+def test_bench_deck(supply):
+    circuit = nand_circuit()
+    before = str(circuit)
+    bench = TruthTableBench(circuit, ['inputA', 'inputB'], ['output'], supply)
+    assert bench.supply_level == 5.0
+    deck = bench.deck(nand)
+    assert 'VA ' not in deck and 'VB ' not in deck
+    assert 'Vdd vdd 0 5' in deck
+    assert deck.endswith('.dc Vtt_index 0 3 1\n.end\n')
+    assert str(circuit) == before
+
+
+def test_bench_transient_deck_replaces_supply():
+    circuit = nand_circuit()
+    bench = TruthTableBench(circuit, ['inputA', 'inputB'], ['output'], 'Vdd', supply_level=3.3,
+                            mode=TRANSIENT, hold=10e-9)
+    deck = bench.deck(nand)
+    assert 'Vdd vdd 0 5' not in deck
+    assert 'Vdd vdd 0 DC 3.3' in deck
+    assert '.tran 2e-10 4e-08' in deck
+    with pytest.raises(KeyError):
+        TruthTableBench(circuit, ['inputA'], ['output'], 'Vcc')
+
+
+def test_bench_result():
+    bench = TruthTableBench(nand_circuit(), ['inputA', 'inputB'], ['output'], 'Vdd', mode=TRANSIENT,
+                            hold=10e-9)
+    time = np.linspace(0, 40e-9, 4001)
+    output = Waveforms(TRANSIENT, {'output': np.where(time < 31e-9, 5.0, 0.0)}, abscissa_name='time',
+                       abscissa=time)
+    result = bench.result(nand, {TRANSIENT: output})
+    assert result.passed
+    assert 'pass: 0 mismatch(es) in 4 row(s) x 1 output(s)' in format_truth_table(result)
+    with pytest.raises(ValueError):
+        bench.result(lambda a, b: (a, b), {TRANSIENT: output})